@@ -1,7 +1,18 @@
 
 import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
 import numpy as np
-import pdfplumber
+
+from services.parsed_document import ParsedDocument, iter_document_pages
+from services.spatial_index import BBoxIndex
+from services.char_index import PageChars
+from services.image_store import ImageStore
+from services.layout_profiles import header_columns, is_profile_header
+from services.question_tables import make_table
 
 # Robust Imports for Optional Dependencies
 try:
@@ -33,425 +44,649 @@ except ImportError:
     LatexOCR = None
     print("Warning: LatexOCR (pix2tex) not found. Math OCR disabled.")
 
+# Pages without a text layer are rendered at this resolution for OCR
+OCR_DPI = int(os.getenv('PARSER_OCR_DPI', '200'))
+# OCR results kept per rendered page hash (re-uploads of a scanned bank skip inference)
+OCR_CACHE_SIZE = int(os.getenv('PARSER_OCR_CACHE_SIZE', '128'))
 
 class AdvancedParser:
     def __init__(self):
         print("Initializing Advanced Parser...")
         
-        # Initialize EasyOCR reader ONLY if available
-        if easyocr:
-            try:
-                self.reader = easyocr.Reader(['en'], gpu=False) # Set gpu=True if CUDA is available
-            except Exception as e:
-                print(f"Error initializing EasyOCR: {e}")
-                self.reader = None
-        else:
-            self.reader = None
-        
-        # Initialize Math OCR ONLY if available
-        if LatexOCR:
-            try:
-                self.math_model = LatexOCR()
-                print("Math OCR model loaded.")
-            except Exception as e:
-                print(f"Warning: Could not load Math OCR model: {e}")
-                self.math_model = None
+        # OCR models are loaded on first use: born-digital banks never need them
+        self._reader = None
+        self._reader_loaded = False
+        self._math_model = None
+        self._math_model_loaded = False
+        self._model_lock = threading.Lock()
+
+        self._ocr_cache = OrderedDict() # page image hash -> OCR lines
+        self._ocr_cache_lock = threading.Lock()
+
+    @property
+    def reader(self):
+        """EasyOCR reader, or None if EasyOCR is unavailable"""
+        if not self._reader_loaded:
+            with self._model_lock:
+                if not self._reader_loaded:
+                    if easyocr:
+                        try:
+                            print("Loading EasyOCR model...")
+                            self._reader = easyocr.Reader(['en'], gpu=False) # Set gpu=True if CUDA is available
+                        except Exception as e:
+                            print(f"Error initializing EasyOCR: {e}")
+                    self._reader_loaded = True
+        return self._reader
+
+    @property
+    def math_model(self):
+        """LatexOCR model, or None if pix2tex is unavailable"""
+        if not self._math_model_loaded:
+            with self._model_lock:
+                if not self._math_model_loaded:
+                    if LatexOCR:
+                        try:
+                            self._math_model = LatexOCR()
+                            print("Math OCR model loaded.")
+                        except Exception as e:
+                            print(f"Warning: Could not load Math OCR model: {e}")
+                    self._math_model_loaded = True
+        return self._math_model
+
+    def ocr_page_lines(self, pdf_path, page):
+        """
+        OCRs a page that has no text layer. The page is rendered once; the
+        regions to read (the scanned images on it, or the whole page) are run
+        through EasyOCR in a single batched call. Returns text lines as
+        [{'text', 'top', 'bottom', 'x0'}] in PDF coordinates, or [] if OCR is
+        unavailable. Results are cached by a hash of the rendered page.
+        """
+        if fitz is None or self.reader is None:
+            print(f"Page {page.page_number} has no text layer and OCR is unavailable; skipping.")
+            return []
+
+        doc = fitz.open(pdf_path)
+        try:
+            pixmap = doc[page.page_number - 1].get_pixmap(dpi=OCR_DPI)
+            page_image = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+            if pixmap.n > 3:
+                page_image = page_image[:, :, :3]
+        finally:
+            doc.close()
+
+        page_hash = hashlib.sha256(pixmap.samples).hexdigest()
+        with self._ocr_cache_lock:
+            if page_hash in self._ocr_cache:
+                self._ocr_cache.move_to_end(page_hash)
+                print(f"OCR cache hit for page {page.page_number}")
+                return self._ocr_cache[page_hash]
+
+        scale = OCR_DPI / 72.0
+        regions = []
+        for img in page.images:
+            left, top, right, bottom = (int(round(v * scale)) for v in img["bbox"])
+            left, top = max(left, 0), max(top, 0)
+            right, bottom = min(right, pixmap.width), min(bottom, pixmap.height)
+            if right - left > 20 and bottom - top > 20:
+                regions.append((left, top, right, bottom))
+        if not regions:
+            regions = [(0, 0, pixmap.width, pixmap.height)]
+
+        # Pad the crops onto same-sized white canvases so they go through one batched call
+        crops = [page_image[top:bottom, left:right] for left, top, right, bottom in regions]
+        max_h = max(crop.shape[0] for crop in crops)
+        max_w = max(crop.shape[1] for crop in crops)
+        batch = []
+        for crop in crops:
+            canvas = np.full((max_h, max_w, 3), 255, dtype=np.uint8)
+            canvas[:crop.shape[0], :crop.shape[1]] = crop
+            batch.append(canvas)
+
+        print(f"OCR: page {page.page_number}, {len(batch)} region(s)")
+        if len(batch) == 1:
+            results = [self.reader.readtext(batch[0])]
         else:
-            self.math_model = None
+            results = self.reader.readtext_batched(batch)
+
+        words = []
+        for (left, top, _, _), detections in zip(regions, results):
+            for box, text, confidence in detections:
+                xs = [pt[0] for pt in box]
+                ys = [pt[1] for pt in box]
+                words.append({
+                    "text": text,
+                    "x0": (left + min(xs)) / scale,
+                    "top": (top + min(ys)) / scale,
+                    "bottom": (top + max(ys)) / scale
+                })
+        lines = group_ocr_words_into_lines(words)
+
+        with self._ocr_cache_lock:
+            self._ocr_cache[page_hash] = lines
+            while len(self._ocr_cache) > OCR_CACHE_SIZE:
+                self._ocr_cache.popitem(last=False)
+        return lines
 
     def format_table_as_string(self, table):
         """Formats a pdfplumber table as a string with Table: marker."""
-        data = table.extract()
-        if not data: return ""
-        
-        formatted = "Table:\n"
-        for row in data:
-            # Clean cells: remove newlines within cells to keep structure clean
-            clean_row = [str(cell).replace('\n', ' ').strip() if cell else "" for cell in row]
-            formatted += " | ".join(clean_row) + "\n"
-        return formatted
+        return format_table_data_as_string(table.extract())
 
     def extract_text_excluding_areas(self, page, cell_bbox, exclusion_bboxes):
         """
         Extracts text from a specific cell bbox, excluding text that falls within exclusion_bboxes.
         Returns None on error, so caller can distinguish between empty text and error.
+
+        Chars are selected with boolean masks over the page's char coordinates
+        (a char is excluded when its centre is inside an exclusion bbox, with a
+        1px buffer); only the selected chars are reassembled into text.
         """
         try:
-            # Filter objects on the ORIGINAL page first (using absolute coordinates)
-            # This avoids coordinate shifting issues with crop()
-            
-            def not_inside_exclusion(obj):
-                # obj is a char dict with 'x0', 'top', 'x1', 'bottom' (absolute page coordinates)
-                
-                obj_x0 = obj.get('x0', 0)
-                obj_top = obj.get('top', 0)
-                obj_x1 = obj.get('x1', 0)
-                obj_bottom = obj.get('bottom', 0)
-                
-                obj_center_x = (obj_x0 + obj_x1) / 2
-                obj_center_y = (obj_top + obj_bottom) / 2
-                
-                for bbox in exclusion_bboxes:
-                    # bbox is (x0, top, x1, bottom)
-                    # Add a small buffer (e.g. 1px) to ensure we catch edge cases
-                    buffer = 1
-                    if (bbox[0] - buffer <= obj_center_x <= bbox[2] + buffer and 
-                        bbox[1] - buffer <= obj_center_y <= bbox[3] + buffer):
-                        return False
-                return True
-
-            # Filter the whole page first
-            filtered_page = page.filter_objects(not_inside_exclusion)
-            
-            # THEN crop to the specific cell/row area
-            # cell_bbox is (x0, top, x1, bottom)
-            final_cell_page = filtered_page.crop(cell_bbox)
-            
-            return final_cell_page.extract_text()
+            char_index = page.char_index if hasattr(page, 'char_index') else PageChars(page.chars)
+            return char_index.text_in(cell_bbox, exclusion_bboxes, buffer=1)
         except Exception as e:
             print(f"Error in extract_text_excluding_areas: {e}")
             return None
 
-    def extract_images_from_pdf(self, pdf_path, output_folder):
-        """Extracts images from a PDF and returns metadata including bbox."""
-        doc = fitz.open(pdf_path)
+    def _question_cell_text(self, layout, table, r_idx, q_idx):
+        """Question cell text of a row without the tables nested in it, or None."""
+        cells = table['cell_bboxes'][r_idx] if r_idx < len(table['cell_bboxes']) else []
+        cell_bbox = cells[q_idx] if q_idx < len(cells) else None
+        if not cell_bbox or 'parsed_page' not in layout:
+            return None
+        return self.extract_text_excluding_areas(
+            layout['parsed_page'], cell_bbox, table['nested_bboxes_by_row'].get(r_idx, [])
+        )
+
+    def extract_images_from_pdf(self, pdf_path, output_folder, document=None):
+        """
+        Extracts images from a PDF and returns metadata including bbox.
+        Image bytes and rects come from the shared ParsedDocument when one is given.
+        """
+        if document is None:
+            document = ParsedDocument.load_images(pdf_path)
         image_metadata = []
-        
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
+        with ImageStore(output_folder) as store:
+            for page in document:
+                image_metadata.extend(self.write_page_images(page, store))
+        return image_metadata
 
-        for i, page in enumerate(doc):
-            image_list = page.get_images(full=True)
+    def write_page_images(self, page, store):
+        """
+        Queues one ParsedPage's images in an ImageStore and returns their metadata.
+        Files are named by content hash, so repeated images are written once;
+        page furniture (logos, headers repeated across pages) is skipped.
+        """
+        image_metadata = []
+
+        for img in page.images:
+            if img.get("furniture"):
+                continue
+
+            image_filename, image_path = store.add(img["data"], img["ext"], img.get("sha256"))
             
-            for img_index, img in enumerate(image_list):
-                xref = img[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                
-                image_filename = f"page{i+1}_img{img_index+1}.{image_ext}"
-                image_path = os.path.join(output_folder, image_filename)
-                
-                # Get bounding box(es) of the image on the page
-                # An image can appear multiple times, we'll take the first occurrence for now
-                rects = page.get_image_rects(xref)
-                bbox = rects[0] if rects else fitz.Rect(0, 0, 0, 0)
-                
-                with open(image_path, "wb") as f:
-                    f.write(image_bytes)
-                
-                image_metadata.append({
-                    "path": image_path,
-                    "filename": image_filename,
-                    "page": i + 1,
-                    "bbox": (bbox.x0, bbox.y0, bbox.x1, bbox.y1) # (left, top, right, bottom)
-                })
-                print(f"Extracted image: {image_filename} at {bbox}")
+            image_metadata.append({
+                "path": image_path,
+                "filename": image_filename,
+                "page": page.page_number,
+                "bbox": img["bbox"] # (left, top, right, bottom)
+            })
+            print(f"Extracted image: {image_filename} at {img['bbox']}")
                 
         return image_metadata
 
-    def parse_pdf(self, pdf_path, output_image_folder="extracted_images"):
+    def parse_pdf(self, pdf_path, output_image_folder="extracted_images", workers=None, document=None):
         """
         Parses PDF using pdfplumber for text/tables and PyMuPDF for images.
         Falls back to OCR if no text is found.
+
+        Reads from a shared ParsedDocument (built here if not supplied), whose
+        pages are parsed concurrently for large banks; questions are always
+        assembled in page order.
         """
         print(f"Parsing PDF: {pdf_path}")
-        parsed_content = []
         
-        # Extract images first using PyMuPDF (it's faster/better for images)
-        # Returns list of dicts: {'path': ..., 'filename': ..., 'page': ..., 'bbox': (x0, y0, x1, y1)}
-        extracted_images = self.extract_images_from_pdf(pdf_path, output_image_folder)
+        if document is None:
+            document = ParsedDocument.load(pdf_path, workers)
+
+        parsed_content = []
+        for _, page_questions in self.iter_parse_pdf(pdf_path, output_image_folder, pages=document):
+            parsed_content.extend(page_questions)
+
+        return parsed_content
+
+    def iter_parse_pdf(self, pdf_path, output_image_folder="extracted_images", workers=None, pages=None):
+        """
+        Generator version of parse_pdf: yields (page_number, questions) as soon
+        as each page is assembled, so callers can stream results.
+
+        The last question of a page is held back until the next page has been
+        seen, because a row without an SL number continues it; every yielded
+        question is therefore final.
+        """
+        if pages is None:
+            pages = iter_document_pages(pdf_path, workers)
+
+        # Persist column indices across pages
+        last_known_indices = {
+            "question": -1, "sl": -1, "marks": -1, "co": -1, "level": -1, "module": -1
+        }
+        pending = None
+        page_number = 0
+
+        with ImageStore(output_image_folder) as store:
+            for page in pages:
+                page_number = page.page_number
+                print(f"Processing page {page_number}...")
+                
+                # Queue this page's images (bytes and rects were read with PyMuPDF);
+                # the files are written in the background while the page is assembled
+                # List of dicts: {'path': ..., 'filename': ..., 'page': ..., 'bbox': (x0, y0, x1, y1)}
+                page_images = self.write_page_images(page, store)
+                
+                layout = extract_page_layout(page)
+                layout['pdf_path'] = pdf_path
+                page_questions, last_known_indices = self._assemble_page_questions(
+                    layout, page_images, last_known_indices, [pending] if pending else []
+                )
+                if not page_questions:
+                    continue
+
+                ready = ([pending] if pending else []) + page_questions[:-1]
+                pending = page_questions[-1]
+                if ready:
+                    # Images referenced by yielded questions must be on disk
+                    store.flush()
+                    yield page_number, ready
+
+            store.flush()
+            if pending:
+                yield page_number, [pending]
+
+    def _assemble_page_questions(self, layout, page_images, last_known_indices, parsed_content):
+        """
+        Turns one page layout into questions. Runs in page order because header
+        indices and continuation rows carry over from the previous page.
+        Returns (page_questions, last_known_indices).
+        """
+        page_questions = []
+        profile = layout['parsed_page'].layout_profile
         
-        # Try parsing with pdfplumber first (best for tables)
-        with pdfplumber.open(pdf_path) as pdf:
-            # Persist column indices across pages
-            last_known_indices = {
-                "question": -1, "sl": -1, "marks": -1, "co": -1, "level": -1, "module": -1
-            }
+        # Strategy 1: Table Extraction
+        for table in layout['tables']:
+            table_data = table['data']
+            
+            # Identify columns based on headers; a matched layout profile already knows them
+            header_row_index = -1
+            columns = None
+            header_row = profile["header_row"] if profile else -1
+            if profile and len(table_data) > header_row and is_profile_header(table_data[header_row], profile):
+                header_row_index = header_row
+                columns = profile["columns"]
+            else:
+                # Check for header in this table (a table of another layout than the profile's
+                # may have its header in any row, e.g. under a caption row)
+                for r_idx, row_data in enumerate(table_data):
+                    columns = header_columns(row_data)
+                    if columns:
+                        header_row_index = r_idx
+                        break
+            
+            # Update last known indices if header found
+            if header_row_index != -1 and columns["question"] != -1:
+                last_known_indices = dict(columns)
+            
+            # Determine start row and indices to use
+            start_row = 0
+            use_indices = None
             
-            for i, page in enumerate(pdf.pages):
-                print(f"Processing page {i+1}...")
-                page_questions = []
+            if header_row_index != -1:
+                start_row = header_row_index + 1
+                use_indices = last_known_indices
+            elif last_known_indices["question"] != -1:
+                # No header found, but we have indices from previous page/table
+                print("No header found, using indices from previous page.")
+                start_row = 0
+                use_indices = last_known_indices
+            
+            # Extract data if we have valid indices
+            if not use_indices or use_indices["question"] == -1:
+                continue
                 
-                # Get images for this page
-                page_images = [img for img in extracted_images if img['page'] == i + 1]
+            q_idx = use_indices["question"]
+            m_idx = use_indices["marks"]
+            c_idx = use_indices["co"]
+            l_idx = use_indices["level"]
+            s_idx = use_indices["sl"]
+            mod_idx = use_indices["module"]
+            
+            for r_idx in range(start_row, len(table_data)):
+                row_data = table_data[r_idx]
+                # Clean row items
+                row_data = [str(cell).strip() if cell else "" for cell in row_data]
                 
-                # Strategy 1: Table Extraction
-                # find_tables() returns Table objects with .bbox attribute
-                tables = page.find_tables()
+                # Ensure row has enough columns
+                if len(row_data) <= q_idx: continue
                 
-                # Identify nested tables (tables inside other tables)
-                nested_tables = {} # child_idx -> parent_idx
-                for t_idx1, t1 in enumerate(tables):
-                    for t_idx2, t2 in enumerate(tables):
-                        if t_idx1 == t_idx2: continue
-                        # Check if t1 is inside t2
-                        # We use a tolerance of 5 pixels
-                        if (t1.bbox[0] >= t2.bbox[0] - 5 and t1.bbox[1] >= t2.bbox[1] - 5 and 
-                            t1.bbox[2] <= t2.bbox[2] + 5 and t1.bbox[3] <= t2.bbox[3] + 5):
-                            nested_tables[t_idx1] = t_idx2
-                            print(f"Table {t_idx1+1} is nested inside Table {t_idx2+1}")
-
-                if tables:
-                    print(f"Found {len(tables)} tables on page {i+1}")
-                    for t_idx, table in enumerate(tables):
-                        # Skip if this table is nested inside another
-                        if t_idx in nested_tables:
-                            continue
-
-                        # Get the table data (text content)
-                        table_data = table.extract()
-                        
-                        # Identify columns based on headers
-                        header_row_index = -1
-                        question_col_index = -1
-                        sl_col_index = -1
-                        marks_col_index = -1
-                        co_col_index = -1
-                        level_col_index = -1
-                        module_col_index = -1
-                        
-                        # Check for header in this table
-                        for r_idx, row_data in enumerate(table_data):
-                            # Clean row items
-                            row_data = [str(cell).strip() if cell else "" for cell in row_data]
-                            
-                            # Check for header
-                            if any("Question" in cell for cell in row_data) or any("Marks" in cell for cell in row_data):
-                                header_row_index = r_idx
-                                for c_idx, cell in enumerate(row_data):
-                                    if "Question" in cell: question_col_index = c_idx
-                                    if "SL" in cell or "Sl" in cell or "No" in cell: sl_col_index = c_idx
-                                    if "Marks" in cell: marks_col_index = c_idx
-                                    if "CO" in cell: co_col_index = c_idx
-                                    if "Level" in cell or "RBT" in cell: level_col_index = c_idx
-                                    if "Module" in cell: module_col_index = c_idx
-                                break
-                        
-                        # Update last known indices if header found
-                        if header_row_index != -1 and question_col_index != -1:
-                            last_known_indices = {
-                                "question": question_col_index,
-                                "sl": sl_col_index,
-                                "marks": marks_col_index,
-                                "co": co_col_index,
-                                "level": level_col_index,
-                                "module": module_col_index
-                            }
-                        
-                        # Determine start row and indices to use
-                        start_row = 0
-                        use_indices = None
-                        
-                        if header_row_index != -1:
-                            start_row = header_row_index + 1
-                            use_indices = last_known_indices
-                        elif last_known_indices["question"] != -1:
-                            # No header found, but we have indices from previous page/table
-                            print("No header found, using indices from previous page.")
-                            start_row = 0
-                            use_indices = last_known_indices
-                        
-                        # Extract data if we have valid indices
-                        if use_indices and use_indices["question"] != -1:
-                            q_idx = use_indices["question"]
-                            m_idx = use_indices["marks"]
-                            c_idx = use_indices["co"]
-                            l_idx = use_indices["level"]
-                            s_idx = use_indices["sl"]
-                            mod_idx = use_indices["module"]
-                            
-                            for r_idx in range(start_row, len(table_data)):
-                                row_data = table_data[r_idx]
-                                # Clean row items
-                                row_data = [str(cell).strip() if cell else "" for cell in row_data]
-                                
-                                # Ensure row has enough columns
-                                if len(row_data) <= q_idx: continue
-                                
-                                # Get Row BBox first (needed for nested table detection)
-                                try:
-                                    row_obj = table.rows[r_idx]
-                                    row_bbox = row_obj.bbox # (x0, top, x1, bottom)
-                                    row_bottom = row_bbox[3]
-                                    row_top = row_bbox[1]
-                                except:
-                                    row_bottom = 0
-                                    row_top = 0
-                                    row_bbox = None
-
-                                # Check for nested tables inside this row BEFORE extracting text
-                                nested_tables_in_row = []
-                                for child_idx, parent_idx in nested_tables.items():
-                                    if parent_idx == t_idx:
-                                        child_table = tables[child_idx]
-                                        # Check if child is in this row (vertically)
-                                        ct_bbox = child_table.bbox
-                                        ct_center_y = (ct_bbox[1] + ct_bbox[3]) / 2
-                                        
-                                        if row_top <= ct_center_y <= row_bottom:
-                                            nested_tables_in_row.append(child_table)
-
-                                # Extract question text
-                                # If we have nested tables, we'll clean up the text after extraction
-                                question_text = row_data[q_idx]
-                                
-                                if not question_text: continue
-                                
-                                # Inject formatted tables and remove duplicate text
-                                for child_table in nested_tables_in_row:
-                                    print(f"Processing nested table in question row {r_idx+1}")
-                                    print(f"BEFORE removal: '{question_text}'")
-                                    formatted_inner = self.format_table_as_string(child_table)
-                                    
-                                    # Extract the raw text from the nested table to identify what to remove
-                                    child_data = child_table.extract()
-                                    if child_data:
-                                        # Build the jumbled text pattern (how pdfplumber extracts it)
-                                        # It typically concatenates all cells with spaces
-                                        jumbled_parts = []
-                                        for child_row in child_data:
-                                            for cell in child_row:
-                                                if cell:
-                                                    cell_text = str(cell).strip()
-                                                    if cell_text:
-                                                        jumbled_parts.append(cell_text)
-                                        
-                                        print(f"Table parts: {jumbled_parts}")
-                                        
-                                        # Try multiple removal strategies
-                                        # Strategy 1: All parts joined with spaces
-                                        jumbled_text = " ".join(jumbled_parts)
-                                        if jumbled_text in question_text:
-                                            question_text = question_text.replace(jumbled_text, "", 1)  # Only replace first occurrence
-                                            print(f"Removed (with spaces): '{jumbled_text[:50]}...'")
-                                        # Strategy 2: All parts joined without spaces
-                                        elif "".join(jumbled_parts) in question_text:
-                                            jumbled_text_no_space = "".join(jumbled_parts)
-                                            question_text = question_text.replace(jumbled_text_no_space, "", 1)
-                                            print(f"Removed (no spaces): '{jumbled_text_no_space[:50]}...'")
-                                        # Strategy 3: Try with newlines (table rows might be on separate lines)
-                                        else:
-                                            # Build row-by-row pattern
-                                            for child_row in child_data:
-                                                row_text = " ".join([str(cell).strip() for cell in child_row if cell])
-                                                if row_text in question_text:
-                                                    question_text = question_text.replace(row_text, "", 1)
-                                                    print(f"Removed row: '{row_text[:30]}...'")
-                                        
-                                        # Clean up extra whitespace
-                                        question_text = " ".join(question_text.split())
-                                        print(f"AFTER removal: '{question_text}'")
-                                    
-                                    # Append the formatted table
-                                    question_text += "\n" + formatted_inner
-                                
-                                # Extract other metadata
-                                marks = row_data[m_idx] if m_idx != -1 and len(row_data) > m_idx else "10"
-                                co = row_data[c_idx] if c_idx != -1 and len(row_data) > c_idx else "CO1"
-                                level = row_data[l_idx] if l_idx != -1 and len(row_data) > l_idx else "L1"
-                                sl_no = row_data[s_idx] if s_idx != -1 and len(row_data) > s_idx else ""
-                                sl_no_cleaned = ''.join(filter(str.isdigit, sl_no))
-                                module = row_data[mod_idx] if mod_idx != -1 and len(row_data) > mod_idx else "1"
-
-                                # Logic to decide if this is a new question or continuation
-                                # If SL is present, it's a new question.
-                                # If SL is empty, it's a continuation of the previous question.
-                                
-                                is_continuation = False
-                                if not sl_no_cleaned:
-                                    # SL is empty. Check if we have a previous question to append to.
-                                    if page_questions:
-                                        # Append to last question on this page
-                                        page_questions[-1]["question_text"] += "\n" + question_text
-                                        # Update bbox_bottom to include this row
-                                        page_questions[-1]["bbox_bottom"] = max(page_questions[-1]["bbox_bottom"], row_bottom)
-                                        is_continuation = True
-                                    elif parsed_content:
-                                        # Append to last question from previous page
-                                        parsed_content[-1]["question_text"] += "\n" + question_text
-                                        is_continuation = True
-                                
-                                if not is_continuation:
-                                    page_questions.append({
-                                        "question_text": question_text,
-                                        "marks": marks,
-                                        "co": co,
-                                        "blooms_level": level,
-                                        "sl_no": sl_no_cleaned,
-                                        "module": module,
-                                        "images": [],
-                                        "formulas": [],
-                                        "bbox_bottom": row_bottom, # Store for image association
-                                        "bbox_top": row_top
-                                    })
-                        else:
-                            pass
+                # Row BBox (needed for image association)
+                row_bbox = table['row_bboxes'][r_idx] if r_idx < len(table['row_bboxes']) else None
+                if row_bbox:
+                    row_top = row_bbox[1]
+                    row_bottom = row_bbox[3]
+                else:
+                    row_top = 0
+                    row_bottom = 0
 
-                # Strategy 2: Text Extraction (Fallback)
-                if not page_questions:
-                    # ... (Text extraction logic - simplified for brevity as table is primary focus)
-                    pass
+                # Nested tables inside this row were found during layout extraction
+                nested_tables_in_row = table['nested_by_row'].get(r_idx, [])
 
-                # Associate images with questions based on coordinates
-                if page_questions and page_images:
-                    # Sort questions by vertical position (top)
-                    page_questions.sort(key=lambda x: x.get('bbox_top', 0))
+                # Extract question text
+                # If we have nested tables, we'll clean up the text after extraction
+                question_text = row_data[q_idx]
+                
+                if not question_text: continue
+                
+                # Collect the nested tables into the tables field and remove their text
+                question_tables = []
+                removed_by_chars = False
+                for child_data in nested_tables_in_row:
+                    print(f"Processing nested table in question row {r_idx+1}")
+                    print(f"BEFORE removal: '{question_text}'")
                     
-                    for img in page_images:
-                        img_top = img['bbox'][1]
-                        img_bottom = img['bbox'][3]
-                        img_filename = img['filename']
-                        
-                        # Find the question that is immediately above this image
-                        # We look for a question where q_bottom <= img_top (or close to it)
-                        # and minimize (img_top - q_bottom)
+                    # Use the raw text from the nested table to identify what to remove
+                    # (not needed once the cell text was rebuilt without any nested table)
+                    if child_data and not removed_by_chars:
+                        # Build the jumbled text pattern (how pdfplumber extracts it)
+                        # It typically concatenates all cells with spaces
+                        jumbled_parts = []
+                        for child_row in child_data:
+                            for cell in child_row:
+                                if cell:
+                                    cell_text = str(cell).strip()
+                                    if cell_text:
+                                        jumbled_parts.append(cell_text)
                         
-                        best_q = None
-                        min_dist = float('inf')
+                        print(f"Table parts: {jumbled_parts}")
                         
-                        for q in page_questions:
-                            q_bottom = q.get('bbox_bottom', 0)
-                            q_top = q.get('bbox_top', 0)
-                            
-                            # Case 1: Image is visually below the question row
-                            if img_top >= q_bottom - 5: # Tolerance of 5 units overlap
-                                dist = img_top - q_bottom
-                                if dist < min_dist:
-                                    min_dist = dist
-                                    best_q = q
-                            
-                            # Case 2: Image is INSIDE the question row (e.g. side by side or large cell)
-                            # If image center is within question vertical range
-                            img_center_y = (img_top + img_bottom) / 2
-                            if q_top <= img_center_y <= q_bottom:
-                                best_q = q
-                                break # Strong match
-                        
-                        if best_q:
-                            best_q["images"].append(img_filename)
+                        # Try multiple removal strategies
+                        # Strategy 1: All parts joined with spaces
+                        jumbled_text = " ".join(jumbled_parts)
+                        if jumbled_text in question_text:
+                            question_text = question_text.replace(jumbled_text, "", 1)  # Only replace first occurrence
+                            print(f"Removed (with spaces): '{jumbled_text[:50]}...'")
+                        # Strategy 2: All parts joined without spaces
+                        elif "".join(jumbled_parts) in question_text:
+                            jumbled_text_no_space = "".join(jumbled_parts)
+                            question_text = question_text.replace(jumbled_text_no_space, "", 1)
+                            print(f"Removed (no spaces): '{jumbled_text_no_space[:50]}...'")
+                        # Strategy 3: Try with newlines (table rows might be on separate lines)
                         else:
-                            # If no question found above (e.g. image at top of page), attach to first question?
-                            # Or maybe it belongs to the previous page's last question? (Not handling cross-page yet)
-                            # For now, if it's at the top, maybe it's a header logo, ignore or attach to first.
-                            if page_questions:
-                                # If it's really close to the first question, attach it
-                                if img_bottom < page_questions[0]['bbox_top']:
-                                     # Likely header, ignore
-                                     pass
+                            # Build row-by-row pattern
+                            all_rows_removed = True
+                            for child_row in child_data:
+                                row_text = " ".join([str(cell).strip() for cell in child_row if cell])
+                                if row_text in question_text:
+                                    question_text = question_text.replace(row_text, "", 1)
+                                    print(f"Removed row: '{row_text[:30]}...'")
                                 else:
-                                     # Attach to last question as fallback? No, that caused the issue.
-                                     # Let's leave it unattached if it doesn't fit logic, or attach to nearest.
-                                     pass
-
-                # Remove temporary bbox keys before adding to result
-                for q in page_questions:
-                    q.pop('bbox_bottom', None)
-                    q.pop('bbox_top', None)
+                                    all_rows_removed = False
+                            
+                            # Strategy 4: cells wrap differently inside the question text, so
+                            # rebuild the cell text from the page chars with the nested tables masked out
+                            if not all_rows_removed:
+                                cell_text = self._question_cell_text(layout, table, r_idx, q_idx)
+                                if cell_text:
+                                    question_text = cell_text
+                                    removed_by_chars = True
+                                    print("Removed nested table text by position")
+                        
+                        # Clean up extra whitespace
+                        question_text = " ".join(question_text.split())
+                        print(f"AFTER removal: '{question_text}'")
+                    
+                    if child_data:
+                        question_tables.append(make_table(child_data))
                 
-                parsed_content.extend(page_questions)
+                # Extract other metadata
+                marks = row_data[m_idx] if m_idx != -1 and len(row_data) > m_idx else "10"
+                co = row_data[c_idx] if c_idx != -1 and len(row_data) > c_idx else "CO1"
+                level = row_data[l_idx] if l_idx != -1 and len(row_data) > l_idx else "L1"
+                sl_no = row_data[s_idx] if s_idx != -1 and len(row_data) > s_idx else ""
+                sl_no_cleaned = ''.join(filter(str.isdigit, sl_no))
+                module = row_data[mod_idx] if mod_idx != -1 and len(row_data) > mod_idx else "1"
+
+                # Logic to decide if this is a new question or continuation
+                # If SL is present, it's a new question.
+                # If SL is empty, it's a continuation of the previous question.
+                
+                is_continuation = False
+                if not sl_no_cleaned:
+                    # SL is empty. Check if we have a previous question to append to.
+                    if page_questions:
+                        # Append to last question on this page
+                        page_questions[-1]["question_text"] += "\n" + question_text
+                        page_questions[-1]["tables"].extend(question_tables)
+                        # Update bbox_bottom to include this row
+                        page_questions[-1]["bbox_bottom"] = max(page_questions[-1]["bbox_bottom"], row_bottom)
+                        is_continuation = True
+                    elif parsed_content:
+                        # Append to last question from previous page
+                        parsed_content[-1]["question_text"] += "\n" + question_text
+                        parsed_content[-1].setdefault("tables", []).extend(question_tables)
+                        is_continuation = True
+                
+                if not is_continuation:
+                    page_questions.append({
+                        "question_text": question_text,
+                        "marks": marks,
+                        "co": co,
+                        "blooms_level": level,
+                        "sl_no": sl_no_cleaned,
+                        "module": module,
+                        "images": [],
+                        "formulas": [],
+                        "tables": question_tables,
+                        "bbox_bottom": row_bottom, # Store for image association
+                        "bbox_top": row_top
+                    })
+
+        # Strategy 2: Text Extraction (Fallback)
+        # Only for pages without a text layer (scanned banks): OCR the page and
+        # split its lines into numbered questions
+        parsed_page = layout.get('parsed_page')
+        if not page_questions and parsed_page is not None and layout.get('pdf_path') and not parsed_page.text.strip():
+            ocr_lines = self.ocr_page_lines(layout['pdf_path'], parsed_page)
+            page_questions = questions_from_ocr_lines(ocr_lines)
+            # The scan itself is an image on the page; don't attach it to a question
+            page_area = (parsed_page.width * parsed_page.height) or 1
+            page_images = [
+                img for img in page_images
+                if (img['bbox'][2] - img['bbox'][0]) * (img['bbox'][3] - img['bbox'][1]) < 0.5 * page_area
+            ]
+
+        # Associate images with questions based on coordinates
+        if page_questions and page_images:
+            # Sort questions by vertical position (top)
+            page_questions.sort(key=lambda x: x.get('bbox_top', 0))
+            
+            question_index = BBoxIndex([
+                (0, q.get('bbox_top', 0), 0, q.get('bbox_bottom', 0)) for q in page_questions
+            ])
+            
+            for img in page_images:
+                img_top = img['bbox'][1]
+                img_bottom = img['bbox'][3]
+                img_filename = img['filename']
+                
+                # Case 1 (strong match): Image is INSIDE the question row (e.g. side by side or large cell)
+                # i.e. the image center is within the question's vertical range
+                img_center_y = (img_top + img_bottom) / 2
+                pos = question_index.first_covering(img_center_y)
+                if pos is None:
+                    # Case 2: Image is visually below the question row
+                    # Take the question immediately above it (tolerance of 5 units overlap)
+                    pos = question_index.nearest_above(img_top, tolerance=5)
+                best_q = page_questions[pos] if pos is not None else None
+                
+                if best_q:
+                    best_q["images"].append(img_filename)
+                else:
+                    # If no question found above (e.g. image at top of page), attach to first question?
+                    # Or maybe it belongs to the previous page's last question? (Not handling cross-page yet)
+                    # For now, if it's at the top, maybe it's a header logo, ignore or attach to first.
+                    if page_questions:
+                        # If it's really close to the first question, attach it
+                        if img_bottom < page_questions[0]['bbox_top']:
+                             # Likely header, ignore
+                             pass
+                        else:
+                             # Attach to last question as fallback? No, that caused the issue.
+                             # Let's leave it unattached if it doesn't fit logic, or attach to nearest.
+                             pass
+
+        # Remove temporary bbox keys before adding to result
+        for q in page_questions:
+            q.pop('bbox_bottom', None)
+            q.pop('bbox_top', None)
+        
+        return page_questions, last_known_indices
+
+
+def group_ocr_words_into_lines(words):
+    """Groups OCR word boxes into reading-order lines: [{'text', 'top', 'bottom', 'x0'}]"""
+    lines = []
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        height = word["bottom"] - word["top"]
+        line = lines[-1] if lines else None
+        # Same line when the vertical centres are within half a word height
+        if line and abs((line["top"] + line["bottom"]) / 2 - (word["top"] + word["bottom"]) / 2) <= height / 2:
+            line["words"].append(word)
+            line["bottom"] = max(line["bottom"], word["bottom"])
+        else:
+            lines.append({"top": word["top"], "bottom": word["bottom"], "words": [word]})
+
+    return [{
+        "text": " ".join(w["text"] for w in sorted(line["words"], key=lambda w: w["x0"])),
+        "top": line["top"],
+        "bottom": line["bottom"],
+        "x0": min(w["x0"] for w in line["words"])
+    } for line in lines]
+
+
+# A question starts with its number followed by a word (dataset rows start with numbers)
+OCR_QUESTION_START = re.compile(r'^(?:Q\.?\s*)?(\d{1,3})[.)]?\s+([A-Za-z(].*)$', re.IGNORECASE)
+# The CO / level / marks columns, read into the text wherever the row wrapped
+OCR_ROW_FIELDS = re.compile(r'\s*\b(CO\s*\d+)\s+(L\s*[1-6])\b(?:\s+(\d{1,2})\s*M?\b)?', re.IGNORECASE)
+
+def questions_from_ocr_lines(lines):
+    """
+    Splits OCR lines into questions: a line starting with a number (optionally
+    'Q') and then a word starts a question, other lines continue it. The
+    'CO L marks' columns of the bank tables are split off into fields.
+    """
+    questions = []
+    for line in lines:
+        match = OCR_QUESTION_START.match(line["text"].strip())
+        if match:
+            questions.append({
+                "sl_no": match.group(1),
+                "lines": [match.group(2)],
+                "bbox_top": line["top"],
+                "bbox_bottom": line["bottom"]
+            })
+        elif questions:
+            questions[-1]["lines"].append(line["text"])
+            questions[-1]["bbox_bottom"] = max(questions[-1]["bbox_bottom"], line["bottom"])
+
+    page_questions = []
+    for q in questions:
+        text = " ".join(q["lines"])
+        co, level, marks = "CO1", "L1", "10"
+        fields = OCR_ROW_FIELDS.search(text)
+        if fields:
+            co = fields.group(1).replace(" ", "").upper()
+            level = fields.group(2).replace(" ", "").upper()
+            marks = fields.group(3) or marks
+            text = text[:fields.start()] + " " + text[fields.end():]
+        page_questions.append({
+            "question_text": " ".join(text.split()),
+            "marks": marks,
+            "co": co,
+            "blooms_level": level,
+            "sl_no": q["sl_no"],
+            "module": "1",
+            "images": [],
+            "formulas": [],
+            "tables": [],
+            "bbox_bottom": q["bbox_bottom"],
+            "bbox_top": q["bbox_top"]
+        })
+    return page_questions
+
+
+def format_table_data_as_string(data):
+    """Formats extracted table rows as a string with Table: marker."""
+    if not data: return ""
+    
+    formatted = "Table:\n"
+    for row in data:
+        # Clean cells: remove newlines within cells to keep structure clean
+        clean_row = [str(cell).replace('\n', ' ').strip() if cell else "" for cell in row]
+        formatted += " | ".join(clean_row) + "\n"
+    return formatted
+
+
+def extract_page_layout(page):
+    """
+    Groups a ParsedPage's tables into top-level tables and the nested tables
+    found inside each of their rows.
+    """
+    tables = page.tables
+    table_index = BBoxIndex([t.bbox for t in tables])
+    
+    # Identify nested tables (tables inside other tables)
+    # We use a tolerance of 5 pixels; a table inside several others belongs to the last one
+    nested_tables = {} # child_idx -> parent_idx
+    children_by_parent = {}
+    for t_idx, table in enumerate(tables):
+        parents = table_index.containers(table.bbox, tolerance=5, exclude=t_idx)
+        for parent_idx in parents:
+            print(f"Table {t_idx+1} is nested inside Table {parent_idx+1}")
+        if parents:
+            nested_tables[t_idx] = parents[-1]
+            children_by_parent.setdefault(parents[-1], []).append(t_idx)
+
+    if tables:
+        print(f"Found {len(tables)} tables on page {page.page_number}")
+
+    layout_tables = []
+    for t_idx, table in enumerate(tables):
+        # Skip if this table is nested inside another
+        if t_idx in nested_tables:
+            continue
+        
+        # Check for nested tables inside each row (vertically), by the child's centre
+        nested_by_row = {}
+        nested_bboxes_by_row = {}
+        children = children_by_parent.get(t_idx, [])
+        if children:
+            child_index = BBoxIndex([tables[c].bbox for c in children])
+            for r_idx, row_bbox in enumerate(table.row_bboxes):
+                row_top, row_bottom = (row_bbox[1], row_bbox[3]) if row_bbox else (0, 0)
+                for pos in child_index.centers_between(row_top, row_bottom):
+                    nested_by_row.setdefault(r_idx, []).append(tables[children[pos]].data)
+                    nested_bboxes_by_row.setdefault(r_idx, []).append(tables[children[pos]].bbox)
+        
+        layout_tables.append({
+            "bbox": table.bbox,
+            "data": table.data,
+            "row_bboxes": table.row_bboxes,
+            "cell_bboxes": table.cell_bboxes,
+            "nested_by_row": nested_by_row,
+            "nested_bboxes_by_row": nested_bboxes_by_row
+        })
+
+    return {"page": page.page_number, "tables": layout_tables, "parsed_page": page}
 
-        return parsed_content
 
 # Global instance
 advanced_parser = None
@@ -69,4 +69,9 @@ app.register_blueprint(admin_bp)
 app.register_blueprint(main_bp)
 
 if __name__ == '__main__':
+    # The development server runs the background parse jobs itself (in production: worker.py);
+    # under the reloader only the child process that serves requests starts them
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from services.job_queue import job_queue
+        job_queue.start_workers()
     app.run(debug=True, port=5000)
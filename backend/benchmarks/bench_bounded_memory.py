@@ -0,0 +1,112 @@
+"""
+Benchmark: peak memory of AdvancedParser.parse_pdf against bank size, with and without bounded-memory mode.
+
+Builds banks of growing page counts by concatenating the PDFs in
+question banks/, then parses each one in a fresh process with the whole
+document held in memory and in bounded-memory mode (pages streamed and
+released one by one). Peak RSS should stay flat in bounded mode; both
+modes must give the same questions.
+
+Usage (from backend/):
+    python benchmarks/bench_bounded_memory.py [--banks DIR] [--pages N ...] [--workers N]
+"""
+
+import io
+import os
+import sys
+import json
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_parsers import peak_rss_mb
+
+
+def build_bank(source_paths, page_count, out_path):
+    """A bank of page_count pages, cycling through the source PDFs"""
+    import fitz
+    sources = [fitz.open(path) for path in source_paths]
+    bank = fitz.open()
+    i = 0
+    while bank.page_count < page_count:
+        source = sources[i % len(sources)]
+        bank.insert_pdf(source, to_page=min(source.page_count, page_count - bank.page_count) - 1)
+        i += 1
+    bank.save(out_path)
+    for source in sources:
+        source.close()
+
+
+def worker(path, bounded, out_path):
+    from advanced_parser import get_advanced_parser
+    from services.parsed_document import ParsedDocument
+
+    images_dir = tempfile.mkdtemp(prefix='bench_images_')
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            document = ParsedDocument.load(path, bounded=bounded)
+            questions = get_advanced_parser().parse_pdf(path, images_dir, document=document)
+        seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(images_dir, ignore_errors=True)
+    for q in questions:
+        q['images'] = [os.path.basename(img) for img in q.get('images', [])]
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump({"seconds": seconds, "peak_rss_mb": peak_rss_mb(), "questions": questions}, f)
+
+
+def run_worker_process(path, bounded, workers, tmp_dir):
+    out_path = os.path.join(tmp_dir, 'result.json')
+    env = dict(os.environ, PARSER_LAYOUT_PROFILES='', PARSER_WORKERS=str(workers))
+    cmd = [sys.executable, os.path.abspath(__file__), '--worker', path, '--out', out_path]
+    if bounded:
+        cmd.append('--bounded')
+    subprocess.run(cmd, check=True, cwd=BACKEND_DIR, env=env)
+    with open(out_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--banks', default=os.path.join(os.path.dirname(BACKEND_DIR), 'question banks'))
+    ap.add_argument('--pages', type=int, nargs='+', default=[10, 100, 300])
+    ap.add_argument('--workers', type=int, default=1, help='PARSER_WORKERS for the parse')
+    ap.add_argument('--worker', help=argparse.SUPPRESS)
+    ap.add_argument('--bounded', action='store_true', help=argparse.SUPPRESS)
+    ap.add_argument('--out', help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.bounded, args.out)
+        return
+
+    source_paths = sorted(glob.glob(os.path.join(args.banks, '*.pdf')))
+    if not source_paths:
+        print(f"No PDF banks found in {args.banks}")
+        sys.exit(1)
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench_bounded_')
+    try:
+        print(f"{'pages':>6} | {'in-memory (s)':>13} {'peak MB':>8} | {'bounded (s)':>11} {'peak MB':>8} | {'same questions':>14}")
+        for page_count in args.pages:
+            path = os.path.join(tmp_dir, f'bank_{page_count}.pdf')
+            build_bank(source_paths, page_count, path)
+            full = run_worker_process(path, False, args.workers, tmp_dir)
+            bounded = run_worker_process(path, True, args.workers, tmp_dir)
+            same = full["questions"] == bounded["questions"]
+            print(f"{page_count:>6} | {full['seconds']:>13.1f} {full['peak_rss_mb']:>8} | "
+                  f"{bounded['seconds']:>11.1f} {bounded['peak_rss_mb']:>8} | {'yes' if same else 'NO':>14}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
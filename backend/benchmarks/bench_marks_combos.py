@@ -0,0 +1,102 @@
+"""
+Benchmark: itertools enumeration vs. the marks-bucketed search in find_standard_combo.
+
+Builds synthetic modules with marks drawn from what the bundled banks use
+(mostly 5-10) and times one main question's search with the old
+enumeration of every 2- and 3-question combination and with
+find_marks_combo. Both must agree on whether a combination exists and on
+how close to the target the best one gets. A small module is then sampled
+many times to check every best combination comes up about equally often.
+
+Usage (from backend/):
+    python benchmarks/bench_marks_combos.py [--sizes N ...] [--repeat N] [--draws N] [--seed N]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import itertools
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.marks_combos import find_marks_combo
+
+MARKS = [4, 5, 5, 6, 6, 7, 8, 8, 10, 10, 12]
+
+
+# --- Reference implementation (the enumeration find_marks_combo replaced) ---
+
+def enumerate_combo(module_qs, used_questions, target_marks=25, tolerance=5):
+    random.shuffle(module_qs)
+    valid_combos = []
+    for r in range(2, 4):
+        for combo in itertools.combinations(module_qs, r):
+            if any(q['firestore_id'] in used_questions for q in combo):
+                continue
+            total_marks = sum(q['marks'] for q in combo)
+            if abs(total_marks - target_marks) <= tolerance:
+                valid_combos.append(combo)
+    if not valid_combos:
+        return None
+    return list(min(valid_combos, key=lambda c: abs(sum(q['marks'] for q in c) - target_marks)))
+
+
+def make_module(size, rng):
+    return [{'firestore_id': f'q{i}', 'marks': rng.choice(MARKS)} for i in range(size)]
+
+
+def deviation(combo, target_marks=25):
+    return None if combo is None else abs(sum(q['marks'] for q in combo) - target_marks)
+
+
+def best_of(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--sizes', type=int, nargs='+', default=[20, 60, 150])
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--draws', type=int, default=60000, help='draws for the uniformity check')
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    ok = True
+
+    print(f"{'questions':>9} | {'enumeration (ms)':>16} | {'buckets (ms)':>12} | {'speedup':>8} | {'same best':>9}")
+    for size in args.sizes:
+        module = make_module(size, rng)
+        used = {q['firestore_id'] for q in rng.sample(module, size // 10)}
+        old_time, old_combo = best_of(lambda: enumerate_combo(list(module), used), args.repeat)
+        new_time, new_combo = best_of(lambda: find_marks_combo(module, used), args.repeat)
+        same = deviation(old_combo) == deviation(new_combo) and not any(q['firestore_id'] in used for q in new_combo or [])
+        ok = ok and same
+        print(f"{size:>9} | {old_time * 1000:>16.2f} | {new_time * 1000:>12.3f} | {old_time / new_time:>7.0f}x | {'yes' if same else 'NO':>9}")
+
+    # Uniformity: every best combination of a small module should be drawn about equally often
+    module = [{'firestore_id': f'q{i}', 'marks': marks} for i, marks in enumerate([5, 5, 5, 10, 10, 10, 15, 15, 20, 8])]
+    best = min(deviation(c) for r in (2, 3) for c in itertools.combinations(module, r) if deviation(c) <= 5)
+    expected = {frozenset(q['firestore_id'] for q in c) for r in (2, 3) for c in itertools.combinations(module, r) if deviation(c) == best}
+    counts = Counter(frozenset(q['firestore_id'] for q in find_marks_combo(module)) for _ in range(args.draws))
+    spread = max(counts.values()) / min(counts.values()) if set(counts) == expected else float('inf')
+    uniform = set(counts) == expected and spread < 1.15
+    ok = ok and uniform
+    print(f"\nUniformity: {len(expected)} best combinations, {args.draws} draws, "
+          f"max/min frequency {spread:.3f} -> {'ok' if uniform else 'NOT UNIFORM'}")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: first-three-unused CIE selection vs. the constraint search in generate_cie1/cie2_paper.
+
+Parses the banks in question banks/ (one module per bank, in file order, as
+a CIE upload would) and generates --runs CIE1 papers from three of the
+modules both ways: the old selection took the first three unused questions
+of each shuffled module, the new one is solve_paper(). Per method it reports how many papers meet every
+target (each main question within the marks tolerance, every CO of the
+layout's modules covered), the mean penalty and the mean time per paper.
+
+Usage (from backend/):
+    python benchmarks/bench_paper_solver.py [--banks DIR] [--runs N] [--seed N] [--modules P S T]
+"""
+
+import io
+import os
+import sys
+import glob
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import contextlib
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.paper_solver import (
+    PaperSearch, solve_paper, normalize_co, normalize_level, MAIN_QUESTION_MARKS, MARKS_TOLERANCE
+)
+
+
+# --- Reference implementation (the selection solve_paper replaced) ---
+
+def first_unused(layout, questions_by_module):
+    used, paper = set(), []
+    for parts in layout:
+        combo = []
+        for module in parts:
+            q = next(q for q in questions_by_module[module] if q['firestore_id'] not in used)
+            used.add(q['firestore_id'])
+            combo.append(q)
+        paper.append(combo)
+    return paper
+
+
+def load_modules(banks_dir):
+    from advanced_parser import get_advanced_parser
+    parser = get_advanced_parser()
+    questions_by_module = defaultdict(list)
+    images_dir = tempfile.mkdtemp(prefix='bench_images_')
+    try:
+        for module, path in enumerate(sorted(glob.glob(os.path.join(banks_dir, '*.pdf'))), 1):
+            with contextlib.redirect_stdout(io.StringIO()):
+                questions = parser.parse_pdf(path, images_dir)
+            for i, q in enumerate(questions):
+                try:
+                    marks = int(q.get('marks', 0))
+                except (ValueError, TypeError):
+                    continue
+                if marks > 0:
+                    questions_by_module[str(module)].append(dict(q, marks=marks, firestore_id=f'{module}-{i}'))
+    finally:
+        shutil.rmtree(images_dir, ignore_errors=True)
+    return questions_by_module
+
+
+def evaluate(paper, layout, questions_by_module):
+    """(meets every target, penalty) of a complete paper"""
+    search = PaperSearch(layout, questions_by_module)
+    parts = [q for combo in paper for q in combo]
+    marks_off = [abs(sum(q['marks'] for q in combo) - MAIN_QUESTION_MARKS) for combo in paper]
+    levels = defaultdict(int)
+    for q in parts:
+        levels[normalize_level(q.get('blooms_level'))] += 1
+    cos = {normalize_co(q.get('co')) for q in parts}
+    acceptable = max(marks_off) <= MARKS_TOLERANCE and search.required_cos <= cos
+    return acceptable, search.penalty(sum(marks_off), levels, cos, 0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--banks', default=os.path.join(os.path.dirname(BACKEND_DIR), 'question banks'))
+    ap.add_argument('--runs', type=int, default=20)
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--modules', nargs=3, help='primary, secondary and tertiary module (default: the last three banks)')
+    args = ap.parse_args()
+
+    random.seed(args.seed)
+    questions_by_module = load_modules(args.banks)
+    modules = args.modules or sorted(questions_by_module, key=int)[-3:]
+    if len(modules) < 3 or any(module not in questions_by_module for module in modules):
+        print(f"Need 3 banks with questions in {args.banks}")
+        sys.exit(1)
+    primary, secondary, tertiary = modules
+    layout = [[primary] * 3, [primary] * 3, [secondary, secondary, tertiary], [secondary, secondary, tertiary]]
+    print(f"Modules {', '.join(f'{m}: {len(questions_by_module[m])} questions' for m in modules)}; {args.runs} CIE1 papers\n")
+
+    methods = {'first unused': first_unused, 'constraint search': solve_paper}
+    print(f"{'method':<18} | {'acceptable':>10} | {'mean penalty':>12} | {'ms/paper':>8}")
+    for name, method in methods.items():
+        accepted, penalties, seconds = 0, [], 0.0
+        for _ in range(args.runs):
+            for module in modules:
+                random.shuffle(questions_by_module[module])
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                paper = method(layout, questions_by_module)
+            seconds += time.perf_counter() - start
+            acceptable, penalty = evaluate(paper, layout, questions_by_module)
+            accepted += acceptable
+            penalties.append(penalty)
+        print(f"{name:<18} | {accepted:>4}/{args.runs:<5} | {sum(penalties) / len(penalties):>12.2f} | {seconds * 1000 / args.runs:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""
+Benchmark and regression check: the question bank parsers over the bundled banks.
+
+Runs AdvancedParser.parse_pdf, parse_pdf_with_embedded_tables,
+parse_pdf_question_bank and parse_docx_question_bank over the PDFs in
+question banks/. No DOCX banks are bundled, so DOCX copies of the banks are
+built first from the advanced parser's output (one table: Q.No, Question,
+CO, Level, Marks, Module).
+
+Each parser runs in its own process, so the peak RSS reported is its own.
+Per parser it reports pages/sec, questions/sec, wall time per stage (load =
+laying out the PDF, parse = the parser itself) and peak RSS, then compares
+with the JSON baseline: a parser whose throughput drops below the baseline
+by more than --threshold, or whose question count changes, fails the run
+(exit status 1). Baselines are machine-specific; save one on the machine
+the check runs on.
+
+Usage (from backend/):
+    python benchmarks/bench_parsers.py [--banks DIR] [--repeat N] [--threshold F] [--only NAME ...]
+    python benchmarks/bench_parsers.py --save-baseline     # after an intended change
+"""
+
+import io
+import os
+import sys
+import json
+import glob
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'parser_baseline.json')
+PARSERS = ['advanced', 'embedded_tables', 'question_bank', 'docx']
+DOCX_HEADER = ['Q.No', 'Question', 'CO', 'Level', 'Marks', 'Module']
+# Fast parsers are called repeatedly until a run lasts this long, so their timings are not noise
+MIN_RUN_SECONDS = 0.2
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unavailable)"""
+    # Linux: VmHWM starts afresh at exec, while ru_maxrss keeps the launching process's peak
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def pdf_page_count(path):
+    import fitz
+    with fitz.open(path) as pdf:
+        return pdf.page_count
+
+
+# --- Fixtures ---
+
+def build_docx_banks(pdf_paths, out_dir):
+    """DOCX copy of each PDF bank, built from the advanced parser's questions"""
+    import docx
+    from advanced_parser import get_advanced_parser
+
+    parser = get_advanced_parser()
+    docx_paths = []
+    for path in pdf_paths:
+        images_dir = tempfile.mkdtemp(prefix='bench_images_')
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                questions = parser.parse_pdf(path, images_dir)
+        finally:
+            shutil.rmtree(images_dir, ignore_errors=True)
+
+        document = docx.Document()
+        table = document.add_table(rows=1, cols=len(DOCX_HEADER))
+        for cell, title in zip(table.rows[0].cells, DOCX_HEADER):
+            cell.text = title
+        for q in questions:
+            values = [q.get('sl_no'), q.get('question_text'), q.get('co'), q.get('blooms_level'), q.get('marks'), q.get('module')]
+            for cell, value in zip(table.add_row().cells, values):
+                cell.text = str(value if value is not None else '')
+        docx_path = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + '.docx')
+        document.save(docx_path)
+        docx_paths.append(docx_path)
+    return docx_paths
+
+
+# --- Worker (one process per parser) ---
+
+def run_parser(name, path):
+    """Parses one bank; returns (questions, {stage: seconds})"""
+    from services.parsed_document import ParsedDocument
+    from services.parsing_service import (
+        parse_pdf_with_embedded_tables, parse_pdf_question_bank, parse_docx_question_bank
+    )
+
+    stages = {}
+    if name == 'docx':
+        start = time.perf_counter()
+        questions = parse_docx_question_bank(path)
+        stages['parse'] = time.perf_counter() - start
+        return questions, stages
+
+    start = time.perf_counter()
+    document = ParsedDocument.load(path)
+    stages['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if name == 'advanced':
+        from advanced_parser import get_advanced_parser
+        # A fresh image folder each run, so every run writes its images
+        images_dir = tempfile.mkdtemp(prefix='bench_images_')
+        try:
+            questions = get_advanced_parser().parse_pdf(path, images_dir, document=document)
+        finally:
+            stages['parse'] = time.perf_counter() - start
+            shutil.rmtree(images_dir, ignore_errors=True)
+        return questions, stages
+    elif name == 'embedded_tables':
+        questions = parse_pdf_with_embedded_tables(path, document)
+    else:
+        questions = parse_pdf_question_bank(path, document)
+    stages['parse'] = time.perf_counter() - start
+    return questions, stages
+
+
+def worker(name, paths, repeat, out_path):
+    files = []
+    for path in paths:
+        best = None
+        for _ in range(repeat):
+            # The parsers log every page; keep the benchmark output readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                calls, totals, start = 0, {}, time.perf_counter()
+                while calls == 0 or time.perf_counter() - start < MIN_RUN_SECONDS:
+                    questions, call_stages = run_parser(name, path)
+                    for stage, seconds in call_stages.items():
+                        totals[stage] = totals.get(stage, 0) + seconds
+                    calls += 1
+                stages = {stage: seconds / calls for stage, seconds in totals.items()}
+            if best is None or sum(stages.values()) < sum(best[1].values()):
+                best = (questions, stages)
+        questions, stages = best
+        files.append({
+            "file": os.path.basename(path),
+            "pages": pdf_page_count(path) if path.lower().endswith('.pdf') else None,
+            "questions": len(questions),
+            "stages": {stage: round(seconds, 4) for stage, seconds in stages.items()}
+        })
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump({"files": files, "peak_rss_mb": peak_rss_mb()}, f)
+
+
+# --- Driver ---
+
+def summarize(name, raw):
+    files = raw["files"]
+    seconds = sum(sum(f["stages"].values()) for f in files)
+    stages = {}
+    for f in files:
+        for stage, value in f["stages"].items():
+            stages[stage] = round(stages.get(stage, 0) + value, 4)
+    pages = sum(f["pages"] or 0 for f in files)
+    questions = sum(f["questions"] for f in files)
+    return {
+        "parser": name,
+        "seconds": round(seconds, 4),
+        "stages": stages,
+        "pages": pages,
+        "questions": questions,
+        "pages_per_sec": round(pages / seconds, 2) if pages and seconds else None,
+        "questions_per_sec": round(questions / seconds, 2) if seconds else None,
+        "peak_rss_mb": raw["peak_rss_mb"],
+        "files": {f["file"]: f["questions"] for f in files}
+    }
+
+
+def run_worker_process(name, paths, repeat, tmp_dir):
+    out_path = os.path.join(tmp_dir, f'{name}.json')
+    env = dict(os.environ)
+    # Learned layout profiles would make runs depend on earlier uploads
+    env['PARSER_LAYOUT_PROFILES'] = ''
+    cmd = [sys.executable, os.path.abspath(__file__), '--worker', name, '--repeat', str(repeat), '--out', out_path] + paths
+    subprocess.run(cmd, check=True, cwd=BACKEND_DIR, env=env)
+    with open(out_path, 'r', encoding='utf-8') as f:
+        return summarize(name, json.load(f))
+
+
+def compare(results, baseline, threshold):
+    """Regression messages against the baseline (empty if none)"""
+    failures = []
+    for name, result in results.items():
+        base = baseline.get("parsers", {}).get(name)
+        if base is None:
+            continue
+        for metric in ("pages_per_sec", "questions_per_sec"):
+            if base.get(metric) and result.get(metric) is not None and result[metric] < base[metric] * (1 - threshold):
+                failures.append(f"{name}: {metric} {result[metric]} is more than {threshold:.0%} below the baseline {base[metric]}")
+        for file, count in result["files"].items():
+            if file in base.get("files", {}) and base["files"][file] != count:
+                failures.append(f"{name}: {file} gives {count} questions, baseline {base['files'][file]}")
+    return failures
+
+
+def machine_info():
+    return {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--banks', default=os.path.join(os.path.dirname(BACKEND_DIR), 'question banks'))
+    ap.add_argument('--repeat', type=int, default=3, help='timed runs per bank; the fastest is kept')
+    ap.add_argument('--threshold', type=float, default=0.25, help='allowed throughput drop (0.25 = 25%%)')
+    ap.add_argument('--baseline', default=DEFAULT_BASELINE)
+    ap.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    ap.add_argument('--only', nargs='+', choices=PARSERS, help='parsers to run (default: all)')
+    ap.add_argument('--worker', choices=PARSERS, help=argparse.SUPPRESS)
+    ap.add_argument('--out', help=argparse.SUPPRESS)
+    ap.add_argument('paths', nargs='*', help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.paths, args.repeat, args.out)
+        return
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.banks, '*.pdf')))
+    if not pdf_paths:
+        print(f"No PDF banks found in {args.banks}")
+        sys.exit(1)
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench_parsers_')
+    try:
+        parsers = args.only or PARSERS
+        docx_paths = build_docx_banks(pdf_paths, tmp_dir) if 'docx' in parsers else []
+        results = {}
+        for name in parsers:
+            results[name] = run_worker_process(name, docx_paths if name == 'docx' else pdf_paths, args.repeat, tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"{len(pdf_paths)} banks, best of {args.repeat} runs each\n")
+    print(f"{'parser':<16} {'pages':>6} {'questions':>9} | {'load (s)':>9} {'parse (s)':>9} | "
+          f"{'pages/s':>8} {'questions/s':>11} | {'peak RSS (MB)':>13}")
+    for name, r in results.items():
+        load = r["stages"].get("load")
+        print(f"{name:<16} {r['pages'] or '-':>6} {r['questions']:>9} | "
+              f"{load if load is not None else '-':>9} {r['stages'].get('parse', 0):>9} | "
+              f"{r['pages_per_sec'] or '-':>8} {r['questions_per_sec'] or '-':>11} | "
+              f"{r['peak_rss_mb'] if r['peak_rss_mb'] is not None else 'n/a':>13}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({"machine": machine_info(), "parsers": results}, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("machine") != machine_info():
+        print(f"\nNote: the baseline was recorded on {baseline.get('machine')}; throughput may not be comparable.")
+
+    failures = compare(results, baseline, args.threshold)
+    if failures:
+        print("\nRegressions against the baseline:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"\nNo regressions against the baseline (threshold {args.threshold:.0%}).")
+
+
+if __name__ == '__main__':
+    main()
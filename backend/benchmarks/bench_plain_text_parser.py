@@ -0,0 +1,114 @@
+"""
+Benchmark: three-regex plain-text question extraction vs. the single-pass line tokenizer.
+
+Takes the page text of the PDFs in question banks/, repeats it to build
+pages of growing length and times both versions of
+extract_questions_from_plain_text. Time per KB should stay flat for the
+line tokenizer as pages grow.
+
+Usage (from backend/):
+    python benchmarks/bench_plain_text_parser.py [--banks DIR] [--max-scale N] [--repeat N]
+"""
+
+import io
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+import contextlib
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.formatting_service import clean_text, extract_marks_from_text
+from services.parsed_document import ParsedDocument
+from services.parsing_service import extract_questions_from_plain_text
+
+
+# --- Reference implementation (the regex passes the tokenizer replaced) ---
+
+def regex_extract_questions(text_content):
+    questions = []
+    if not text_content:
+        return questions
+    patterns = [
+        (re.findall(r'Q\.?\s*(\d+)\.?\s*(.*?)(?=Q\.?\s*\d+\.?\s*|$)', text_content, re.DOTALL | re.IGNORECASE), 0),
+        (re.findall(r'Question\s*(\d+)[:\.]?\s*(.*?)(?=Question\s*\d+[:\.]?\s*|$)', text_content, re.DOTALL | re.IGNORECASE), 0),
+        (re.findall(r'^(\d+)\.\s*(.*?)(?=^\d+\.\s*|$)', text_content, re.MULTILINE | re.DOTALL), 20),
+    ]
+    for matches, min_length in patterns:
+        for q_num, q_text in matches:
+            if q_text.strip() and len(q_text.strip()) > min_length:
+                marks = extract_marks_from_text(q_text)
+                co_match = re.search(r'CO\s*(\d+)', q_text, re.IGNORECASE)
+                level_match = re.search(r'L\s*(\d+)', q_text, re.IGNORECASE)
+                questions.append({
+                    "sl_no": q_num,
+                    "question_text": clean_text(q_text),
+                    "co": co_match.group(0) if co_match else "CO1",
+                    "blooms_level": level_match.group(0) if level_match else "L1",
+                    "marks": marks if marks > 0 else 5,
+                    "module": "1"
+                })
+    seen_numbers = set()
+    unique_questions = []
+    for q in questions:
+        if q["sl_no"] not in seen_numbers:
+            seen_numbers.add(q["sl_no"])
+            unique_questions.append(q)
+    return unique_questions
+
+
+def load_page_texts(banks_dir):
+    texts = []
+    for path in sorted(glob.glob(os.path.join(banks_dir, '*.pdf'))):
+        # The parser logs every page; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            document = ParsedDocument.load(path, with_images=False)
+        texts.extend(page.text for page in document if page.text)
+    return texts
+
+
+def best_of(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--banks', default=os.path.join(os.path.dirname(BACKEND_DIR), 'question banks'))
+    ap.add_argument('--max-scale', type=int, default=32, help='largest number of times the bank text is repeated')
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+
+    texts = load_page_texts(args.banks)
+    if not texts:
+        print(f"No PDF text found in {args.banks}")
+        sys.exit(1)
+
+    # Real pages first: both versions should find (nearly) the same questions
+    regex_count = sum(len(regex_extract_questions(t)) for t in texts)
+    line_count = sum(len(extract_questions_from_plain_text(t)) for t in texts)
+    print(f"{len(texts)} pages: {regex_count} questions (regex), {line_count} questions (line tokenizer)\n")
+
+    corpus = "\n".join(texts)
+    print(f"{'scale':>6} {'KB':>8} | {'regex (ms)':>11} {'us/KB':>8} | {'lines (ms)':>11} {'us/KB':>8} | {'speedup':>8}")
+    scale = 1
+    while scale <= args.max_scale:
+        page = "\n".join([corpus] * scale)
+        kb = len(page) / 1024
+        regex_time, _ = best_of(lambda: regex_extract_questions(page), args.repeat)
+        line_time, _ = best_of(lambda: extract_questions_from_plain_text(page), args.repeat)
+        print(f"{scale:>6} {kb:>8.1f} | {regex_time * 1000:>11.2f} {regex_time * 1e6 / kb:>8.1f} | "
+              f"{line_time * 1000:>11.2f} {line_time * 1e6 / kb:>8.1f} | {regex_time / line_time:>7.1f}x")
+        scale *= 2
+
+
+if __name__ == '__main__':
+    main()
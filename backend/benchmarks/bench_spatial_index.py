@@ -0,0 +1,165 @@
+"""
+Benchmark: quadratic layout scans vs. the per-page BBoxIndex.
+
+Times the three layout steps of AdvancedParser on synthetic table-heavy
+pages (many small nested data tables, like the k-NN dataset questions)
+and checks both versions give identical results.
+
+Usage (from backend/):
+    python benchmarks/bench_spatial_index.py [--tables N] [--rows N] [--images N] [--repeat N]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.spatial_index import BBoxIndex
+
+
+# --- Reference implementations (the scans BBoxIndex replaced) ---
+
+def scan_nested_tables(bboxes):
+    nested = {}
+    for i, t1 in enumerate(bboxes):
+        for j, t2 in enumerate(bboxes):
+            if i == j: continue
+            if (t1[0] >= t2[0] - 5 and t1[1] >= t2[1] - 5 and
+                t1[2] <= t2[2] + 5 and t1[3] <= t2[3] + 5):
+                nested[i] = j
+    return nested
+
+def scan_rows(bboxes, nested, parent_idx, row_bboxes):
+    by_row = {}
+    for r_idx, (_, row_top, _, row_bottom) in enumerate(row_bboxes):
+        for child_idx, p_idx in nested.items():
+            if p_idx == parent_idx:
+                center = (bboxes[child_idx][1] + bboxes[child_idx][3]) / 2
+                if row_top <= center <= row_bottom:
+                    by_row.setdefault(r_idx, []).append(child_idx)
+    return by_row
+
+def scan_images(questions, images):
+    matches = []
+    for img_top, img_bottom in images:
+        best, min_dist = None, float('inf')
+        for q_idx, (q_top, q_bottom) in enumerate(questions):
+            if img_top >= q_bottom - 5:
+                dist = img_top - q_bottom
+                if dist < min_dist:
+                    min_dist, best = dist, q_idx
+            if q_top <= (img_top + img_bottom) / 2 <= q_bottom:
+                best = q_idx
+                break
+        matches.append(best)
+    return matches
+
+
+# --- Index-based versions (as used in advanced_parser) ---
+
+def index_nested_tables(bboxes):
+    index = BBoxIndex(bboxes)
+    nested = {}
+    for i, bbox in enumerate(bboxes):
+        parents = index.containers(bbox, tolerance=5, exclude=i)
+        if parents:
+            nested[i] = parents[-1]
+    return nested
+
+def index_rows(bboxes, nested, parent_idx, row_bboxes):
+    children = [c for c, p in nested.items() if p == parent_idx]
+    by_row = {}
+    if children:
+        child_index = BBoxIndex([bboxes[c] for c in children])
+        for r_idx, (_, row_top, _, row_bottom) in enumerate(row_bboxes):
+            for pos in child_index.centers_between(row_top, row_bottom):
+                by_row.setdefault(r_idx, []).append(children[pos])
+    return by_row
+
+def index_images(questions, images):
+    index = BBoxIndex([(0, top, 0, bottom) for top, bottom in questions])
+    matches = []
+    for img_top, img_bottom in images:
+        pos = index.first_covering((img_top + img_bottom) / 2)
+        if pos is None:
+            pos = index.nearest_above(img_top, tolerance=5)
+        matches.append(pos)
+    return matches
+
+
+def make_page(n_tables, n_rows, n_images, seed=7):
+    """One tall page: n_tables question tables, each row holding a small nested data table."""
+    rng = random.Random(seed)
+    bboxes, rows_by_parent, questions = [], {}, []
+    row_h = 60
+    y = 0
+    for _ in range(n_tables):
+        parent_idx = len(bboxes)
+        bboxes.append((40, y, 560, y + n_rows * row_h))
+        rows = []
+        for r in range(n_rows):
+            top = y + r * row_h
+            rows.append((40, top, 560, top + row_h))
+            questions.append((top, top + row_h))
+            # Nested dataset table in the middle of the question cell
+            bboxes.append((120, top + 15, 420, top + 45))
+        rows_by_parent[parent_idx] = rows
+        y += n_rows * row_h + 20
+    images = []
+    for _ in range(n_images):
+        top = rng.uniform(0, y)
+        images.append((top, top + rng.uniform(10, 80)))
+    return bboxes, rows_by_parent, questions, images
+
+
+def run_layout(bboxes, rows_by_parent, nested_fn, rows_fn):
+    nested = nested_fn(bboxes)
+    return nested, {p: rows_fn(bboxes, nested, p, rows) for p, rows in rows_by_parent.items()}
+
+
+def best_of(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--tables', type=int, default=20, help='question tables per page')
+    ap.add_argument('--rows', type=int, default=10, help='rows (each with a nested table) per question table')
+    ap.add_argument('--images', type=int, default=100, help='images per page')
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'tables':>8} {'rows':>6} {'images':>7} | {'step':<16} {'scan (ms)':>10} {'index (ms)':>11} {'speedup':>8}")
+    for scale in (0.25, 0.5, 1, 2):
+        n_tables = max(1, int(args.tables * scale))
+        n_images = max(1, int(args.images * scale))
+        bboxes, rows_by_parent, questions, images = make_page(n_tables, args.rows, n_images)
+
+        steps = [
+            ("nested + rows",
+             lambda: run_layout(bboxes, rows_by_parent, scan_nested_tables, scan_rows),
+             lambda: run_layout(bboxes, rows_by_parent, index_nested_tables, index_rows)),
+            ("images",
+             lambda: scan_images(questions, images),
+             lambda: index_images(questions, images)),
+        ]
+        for name, scan_fn, index_fn in steps:
+            scan_time, scan_result = best_of(scan_fn, args.repeat)
+            index_time, index_result = best_of(index_fn, args.repeat)
+            if scan_result != index_result:
+                print(f"MISMATCH in {name} at {n_tables} tables")
+                sys.exit(1)
+            print(f"{len(bboxes):>8} {len(questions):>6} {len(images):>7} | {name:<16} "
+                  f"{scan_time * 1000:>10.2f} {index_time * 1000:>11.2f} {scan_time / index_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark: keyword-list table heuristics vs. the compiled matcher in format_question_with_tables.
+
+Takes the question texts the advanced parser finds in question banks/
+(repeated to --scale times as many questions), formats them with the old
+any(...) keyword scans and with the compiled matcher and dataset rule
+table, and checks both give identical output. The per-line check is also
+timed on its own, old against new.
+
+Old and new runs alternate and the fastest of --repeat runs each is kept,
+with garbage collection off while timing, so background load on a shared
+machine skews both sides alike. Whole-question formatting also spends time
+in code both share (splitting, table formatting), so its speedup is smaller
+than the per-line one and the more variable of the two: over repeated runs
+on a busy single-core machine the per-line check measured 1.9x-2.3x faster
+and whole questions 1.1x-1.6x faster (typically about 1.5x).
+
+Usage (from backend/):
+    python benchmarks/bench_table_heuristics.py [--banks DIR] [--scale N] [--repeat N]
+"""
+
+import gc
+import io
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.formatting_service import (
+    format_question_with_tables, is_table_line, format_embedded_table,
+    format_knn_dataset_in_question, format_gpa_award_dataset_in_question, format_xy_class_dataset_in_question
+)
+
+
+# --- Reference implementation (the keyword scans the compiled matcher replaced) ---
+
+PROSE_KEYWORDS = ['question', 'consider', 'write', 'what', 'how', 'explain', 'describe', 'compare', 'contrast', 'differences', 'between', 'instance', 'based', 'learning', 'model', 'nearest', 'neighbour', 'algorithm', 'weighted', 'determine', 'class', 'given', 'test', 'assign', 'predict', 'using', 'classifier', 'centroid', 'training', 'dataset', 'target', 'variable', 'discrete', 'valued', 'takes', 'values', 'choose', 'k=']
+
+
+def keyword_scan_is_table_line(line):
+    words = line.split()
+    return (
+        len(words) >= 3 and
+        not any(word in line.lower() for word in PROSE_KEYWORDS) and
+        (any(word.isdigit() for word in words) or any(word in ['pass', 'fail', 'yes', 'no', 'a', 'b'] for word in words) or
+         any(word.lower() in ['s.no', 'sno', 'gpa', 'cgpa', 'x', 'y', 'class', 'award', 'result', 'assessment', 'project', 'submitted'] for word in words))
+    )
+
+
+def keyword_scan_format_question_with_tables(question_text):
+    if not question_text:
+        return question_text
+    if 'S.NO' in question_text and 'CGPA' in question_text and 'Assessment' in question_text:
+        return format_knn_dataset_in_question(question_text)
+    if 'S.NO' in question_text and 'GPA' in question_text and 'Award' in question_text:
+        return format_gpa_award_dataset_in_question(question_text)
+    if 'X Y Class' in question_text or ('X' in question_text and 'Y' in question_text and 'Class' in question_text):
+        return format_xy_class_dataset_in_question(question_text)
+
+    formatted_lines = []
+    table_lines = []
+    for line in question_text.split('\n'):
+        line = line.strip()
+        if not line:
+            if table_lines:
+                formatted_lines.append(format_embedded_table(table_lines))
+                table_lines = []
+            continue
+        if keyword_scan_is_table_line(line):
+            table_lines.append(line)
+        else:
+            if table_lines:
+                formatted_lines.append(format_embedded_table(table_lines))
+                table_lines = []
+            formatted_lines.append(line)
+    if table_lines:
+        formatted_lines.append(format_embedded_table(table_lines))
+    return '\n'.join(formatted_lines)
+
+
+def load_question_texts(banks_dir):
+    from advanced_parser import get_advanced_parser
+    parser = get_advanced_parser()
+    texts = []
+    images_dir = tempfile.mkdtemp(prefix='bench_images_')
+    try:
+        for path in sorted(glob.glob(os.path.join(banks_dir, '*.pdf'))):
+            # The parser logs every page; keep the benchmark output readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                texts.extend(q['question_text'] for q in parser.parse_pdf(path, images_dir))
+    finally:
+        shutil.rmtree(images_dir, ignore_errors=True)
+    return texts
+
+
+def best_of_interleaved(old_fn, new_fn, repeat):
+    """(fastest old run, fastest new run, old result, new result), the runs alternating"""
+    best = [float('inf'), float('inf')]
+    results = [None, None]
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for i, fn in enumerate((old_fn, new_fn)):
+                start = time.perf_counter()
+                results[i] = fn()
+                best[i] = min(best[i], time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best[0], best[1], results[0], results[1]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--banks', default=os.path.join(os.path.dirname(BACKEND_DIR), 'question banks'))
+    ap.add_argument('--scale', type=int, default=20, help='times the question texts are repeated')
+    ap.add_argument('--repeat', type=int, default=15)
+    args = ap.parse_args()
+
+    texts = load_question_texts(args.banks)
+    if not texts:
+        print(f"No questions found in {args.banks}")
+        sys.exit(1)
+    texts = texts * args.scale
+    lines = [line.strip() for text in texts for line in text.split('\n') if line.strip()]
+
+    old_time, new_time, old_result, new_result = best_of_interleaved(
+        lambda: [keyword_scan_format_question_with_tables(t) for t in texts],
+        lambda: [format_question_with_tables(t) for t in texts], args.repeat)
+    old_line_time, line_time, old_lines, new_lines = best_of_interleaved(
+        lambda: [keyword_scan_is_table_line(line) for line in lines],
+        lambda: [is_table_line(line) for line in lines], args.repeat)
+
+    identical = old_result == new_result and old_lines == new_lines
+    print(f"{len(texts)} questions, {len(lines)} lines; identical output: {'yes' if identical else 'NO'}")
+    print(f"{'':<18}{'keyword scans':>15}{'compiled':>12}{'speedup':>9}")
+    print(f"{'us/question':<18}{old_time * 1e6 / len(texts):>15.2f}{new_time * 1e6 / len(texts):>12.2f}{old_time / new_time:>8.2f}x")
+    print(f"{'us/line':<18}{old_line_time * 1e6 / len(lines):>15.2f}{line_time * 1e6 / len(lines):>12.2f}{old_line_time / line_time:>8.2f}x")
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == '__main__':
+    main()
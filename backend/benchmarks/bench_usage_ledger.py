@@ -0,0 +1,89 @@
+"""
+Benchmark: uniform vs. usage-weighted selection over consecutive papers.
+
+Simulates --papers consecutive papers, one a week, each with four main
+questions found by find_marks_combo in a synthetic module, and records every
+paper in a usage ledger the way record_paper_usage does. The uniform method
+ignores the ledger (what the generators did before); the weighted one
+gives the questions the weights PoolIndex.load() attaches. Per method it
+reports how many of a paper's questions were already in the previous paper
+or in any earlier one, and the time per paper. The weighted draw must repeat
+fewer questions at about the same speed.
+
+Usage (from backend/):
+    python benchmarks/bench_usage_ledger.py [--size N] [--papers N] [--seed N]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.marks_combos import find_marks_combo
+from services.usage_weights import usage_weights
+
+MARKS = [4, 5, 5, 6, 6, 7, 8, 8, 10, 10, 12]
+
+
+def simulate(module, papers, weighted):
+    """(questions repeated from the previous paper, from any earlier paper, seconds) over the papers"""
+    ledger = {"questions": {}}
+    start_day = datetime(2026, 1, 5, tzinfo=timezone.utc)
+    previous, seen = set(), set()
+    repeated_previous = repeated_any = 0
+    seconds = 0.0
+    for week in range(papers):
+        now = start_day + timedelta(weeks=week)
+        weights = usage_weights(ledger, now) if weighted else {}
+        questions = [dict(q, weight=weights.get(q['firestore_id'], 1.0)) for q in module]
+
+        start = time.perf_counter()
+        used = set()
+        for _ in range(4):
+            combo = find_marks_combo(questions, used)
+            used.update(q['firestore_id'] for q in combo or [])
+        seconds += time.perf_counter() - start
+
+        repeated_previous += len(used & previous)
+        repeated_any += len(used & seen)
+        for question_id in used:
+            entry = ledger["questions"].setdefault(question_id, {"uses": 0})
+            entry["uses"] += 1
+            entry["last_used"] = now
+        previous = used
+        seen |= used
+    return repeated_previous, repeated_any, seconds
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--size', type=int, default=60, help='questions in the module')
+    ap.add_argument('--papers', type=int, default=12)
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    module = [{'firestore_id': f'q{i}', 'marks': rng.choice(MARKS)} for i in range(args.size)]
+
+    results = {}
+    print(f"{args.size} questions, {args.papers} papers of 4 main questions\n")
+    print(f"{'method':<10} | {'from previous':>13} | {'from earlier':>12} | {'ms/paper':>8}")
+    for name, weighted in (('uniform', False), ('weighted', True)):
+        random.seed(args.seed)
+        results[name] = simulate(module, args.papers, weighted)
+        repeated_previous, repeated_any, seconds = results[name]
+        print(f"{name:<10} | {repeated_previous:>13} | {repeated_any:>12} | {seconds * 1000 / args.papers:>8.2f}")
+
+    fewer = results['weighted'][1] < results['uniform'][1]
+    fast = results['weighted'][2] < 3 * results['uniform'][2]
+    print(f"\nFewer repeats: {'yes' if fewer else 'NO'}; comparable speed: {'yes' if fast else 'NO'}")
+    sys.exit(0 if fewer and fast else 1)
+
+
+if __name__ == '__main__':
+    main()
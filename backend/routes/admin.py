@@ -5,6 +5,7 @@ from supabase_service import supabase_service
 import os
 import traceback
 from utils import firebase_auth_required
+from services.usage_ledger import record_paper_usage
 
 admin_bp = Blueprint('admin', __name__)
 db_firestore = firestore.client()
@@ -212,8 +213,23 @@ def approve_paper():
         
         # Approve paper using Supabase service
         success = supabase_service.approve_paper(approval_id, hod_user['id'], comments)
-        
+
         if success:
+            # Approved papers count towards the faculty's question usage (not twice if it was saved before)
+            try:
+                approval_result = supabase_service.supabase.table('approvals')\
+                    .select('paper_id, saved_question_papers(questions), users:users!approvals_submitted_by_fkey(firebase_uid)')\
+                    .eq('id', approval_id)\
+                    .execute()
+                if approval_result.data:
+                    approval = approval_result.data[0]
+                    faculty_uid = (approval.get('users') or {}).get('firebase_uid')
+                    questions = (approval.get('saved_question_papers') or {}).get('questions', [])
+                    if faculty_uid:
+                        record_paper_usage(db_firestore, faculty_uid, approval['paper_id'], questions)
+            except Exception as e:
+                print(f"Warning: Failed to record question usage: {e}")
+
             return jsonify({
                 "message": "Question paper approved successfully!",
                 "status": "approved"
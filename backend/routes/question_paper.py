@@ -1,11 +1,15 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, send_file, current_app, Response, stream_with_context
 import firebase_admin
 from firebase_admin import firestore
 from supabase_service import supabase_service
 import os
+import re
 import traceback
 import uuid
 import json
+import random
+import hashlib
+import secrets
 import requests
 import time
 from datetime import datetime
@@ -18,7 +22,18 @@ from services.formatting_service import (
     clean_text, extract_marks_from_text, extract_table_as_text,
     format_question_with_tables
 )
-from services.parsing_service import parse_docx_question_bank, parse_pdf_with_embedded_tables, parse_pdf_question_bank
+from services.parsing_service import parse_docx_question_bank, parse_pdf_with_embedded_tables, parse_pdf_question_bank, parse_cie_module_files
+from services.parsed_document import load_parsed_document
+from services.parse_cache import parse_cache
+from services.job_queue import job_queue
+from services.image_store import render_image_path
+from services.pool_sync import PoolSync, BatchWriter
+from services.pool_index import PoolIndex, unused_questions
+from services.usage_ledger import record_paper_usage, stage_forget_questions
+from services.marks_combos import find_marks_combo, weighted_sample
+from services.paper_solver import solve_paper, first_unfillable
+from services.question_tables import question_tables, add_docx_tables
+from services.pdf_service import question_table_flowables
 
 # PDF/DOCX Generation Imports
 # import pythoncom # Windows only - Moved to local scope
@@ -33,15 +48,6 @@ from reportlab.pdfgen import canvas
 qp_bp = Blueprint('question_paper', __name__)
 db_firestore = firestore.client()
 
-# --- Caching Helpers ---
-def get_cached_questions(user_uid, cache_key):
-    """Get questions from cache if available"""
-    return cache.get(cache_key)
-
-def cache_questions(user_uid, cache_key, questions):
-    """Cache questions"""
-    cache.set(cache_key, questions, timeout=300)
-
 # --- Helper Functions ---
 
 def convert_docx_to_pdf_robust(docx_path):
@@ -106,35 +112,24 @@ def convert_docx_to_pdf_robust(docx_path):
     print("All PDF conversion methods failed, returning DOCX")
     return docx_path
 
-def generate_paper_with_rules(all_questions, pattern='standard'):
+def generate_paper_with_rules(questions_by_module, pattern='standard', used_ids=None, rng=None):
     """
-    Generate a question paper following the specified rules.
+    Generate a question paper following the specified rules, from the pool index
+    (module -> question records, see PoolIndex.load).
+    Questions in used_ids are left out, and the paper's questions are added to it.
+    All random choices come from rng (a random.Random), so a seeded rng gives the same paper.
     """
     import random
-    from collections import defaultdict
+    rng = rng or random
 
-    # Group questions by module
-    questions_by_module = defaultdict(list)
-    for q in all_questions:
-        try:
-            module_num = str(q.get('module', '1'))
-            # Normalize module number (remove 'Module ' prefix if present)
-            module_num = module_num.lower().replace('module', '').strip()
-            
-            marks = int(q.get('marks', 0))
-            if marks > 0:
-                q['module_num'] = module_num
-                q['marks'] = marks
-                questions_by_module[module_num].append(q)
-        except (ValueError, TypeError):
-            continue
+    questions_by_module = unused_questions(questions_by_module, used_ids)
 
     # Helper to get random questions from a module
     def get_questions(module, count, used_ids):
         available = [q for q in questions_by_module.get(module, []) if q['firestore_id'] not in used_ids]
         if len(available) < count:
             return None
-        selected = random.sample(available, count)
+        selected = weighted_sample(available, count, rng)
         for q in selected:
             used_ids.add(q['firestore_id'])
         return selected
@@ -144,7 +139,7 @@ def generate_paper_with_rules(all_questions, pattern='standard'):
 
     # --- CIE 1 Logic ---
     if pattern == 'cie1':
-        return generate_cie1_paper(all_questions) # Use dedicated function
+        return generate_cie1_paper(questions_by_module, used_ids, rng) # Use dedicated function
 
     # --- Standard Pattern Logic ---
     # Goal: 4 Main Questions, approx 25 marks each
@@ -168,36 +163,17 @@ def generate_paper_with_rules(all_questions, pattern='standard'):
     
     # Helper to find a combination of questions summing to target marks (approx)
     def find_standard_combo(module_qs, target_marks=25, tolerance=5):
-        import itertools
-        import random
-        # Try to find exact match first, then within tolerance
-        # Limit combinations to 3 questions max (a, b, c)
-        
-        # SHUFFLE to ensure different questions are picked each time
-        random.shuffle(module_qs)
-        
-        valid_combos = []
-        
-        # Try combinations of 2 or 3 questions
-        for r in range(2, 4):
-            for combo in itertools.combinations(module_qs, r):
-                if any(q['firestore_id'] in used_questions for q in combo):
-                    continue
-                    
-                total_marks = sum(q['marks'] for q in combo)
-                if abs(total_marks - target_marks) <= tolerance:
-                    valid_combos.append(combo)
-                    
-        if not valid_combos:
-            # Fallback: just take top 2-3 questions if we can't match marks
-            available = [q for q in module_qs if q['firestore_id'] not in used_questions]
-            if len(available) >= 2:
-                return available[:3] # Take up to 3
-            return None
-            
-        # Pick the one closest to target marks
-        best_combo = min(valid_combos, key=lambda c: abs(sum(q['marks'] for q in c) - target_marks))
-        return list(best_combo)
+        # Combinations of 2 or 3 questions (a, b, c) closest to the target marks, drawn at
+        # random from per-marks buckets so each paper gets different questions
+        combo = find_marks_combo(module_qs, used_questions, target_marks, tolerance, rng=rng)
+        if combo:
+            return combo
+        
+        # Fallback: just take 2-3 random questions (rarely used ones first) if we can't match marks
+        available = [q for q in module_qs if q['firestore_id'] not in used_questions]
+        if len(available) >= 2:
+            return weighted_sample(available, min(3, len(available)), rng)
+        return None
 
     # Round-robin selection from modules
     current_module_idx = 0
@@ -232,14 +208,7 @@ def generate_paper_with_rules(all_questions, pattern='standard'):
             sub_questions = []
             parts = ['a', 'b', 'c']
             for idx, q in enumerate(found_combo):
-                sub_questions.append({
-                    "part": parts[idx] if idx < len(parts) else chr(97 + idx),
-                    "text": q['question_text'],
-                    "marks": q['marks'],
-                    "co": q.get('co', 'N/A'),
-                    "blooms_level": q.get('blooms_level', 'L2'),
-                    "module": selected_module
-                })
+                sub_questions.append(sub_question(q, parts[idx] if idx < len(parts) else chr(97 + idx), selected_module))
                 
             paper.append({
                 "main_question": q_num,
@@ -254,29 +223,18 @@ def generate_paper_with_rules(all_questions, pattern='standard'):
             
     if not paper:
         return {"error": "Could not generate any questions. Please check your question bank."}
-        
+    
+    if used_ids is not None:
+        used_ids.update(used_questions)
     return paper
 
-def generate_cie1_paper(all_questions):
-    """Generate CIE1 pattern question paper"""
+def generate_cie1_paper(questions_by_module, used_ids=None, rng=None):
+    """Generate CIE1 pattern question paper from the pool index (leaving out, then adding to, used_ids; random choices from rng)"""
     print("🎯 Generating CIE1 pattern question paper...")
-    from collections import defaultdict
-    questions_by_module = defaultdict(list)
-    for q in all_questions:
-        try:
-            module_num = str(q.get('module', '1'))
-            marks = int(q.get('marks', 0))
-            if marks > 0:
-                q['module_num'] = module_num
-                q['marks'] = marks
-                questions_by_module[module_num].append(q)
-        except (ValueError, TypeError):
-            continue
-
-    # SHUFFLE questions in each module for randomness
-    import random
-    for mod in questions_by_module:
-        random.shuffle(questions_by_module[mod])
+    questions_by_module = unused_questions(questions_by_module, used_ids)
+
+    # No shuffle needed: solve_paper draws its candidates at random from rng
+    rng = rng or random
 
     available_modules = list(questions_by_module.keys())
     if not available_modules:
@@ -291,100 +249,61 @@ def generate_cie1_paper(all_questions):
     secondary_module = available_modules[1] if len(available_modules) > 1 else available_modules[0]
     tertiary_module = available_modules[2] if len(available_modules) > 2 else secondary_module
 
-    paper = []
-    used_questions = set()
+    # Q1 & Q2 from the primary module, Q3 & Q4 two parts from the secondary and one from the tertiary
+    layout = [[primary_module] * 3, [primary_module] * 3,
+              [secondary_module, secondary_module, tertiary_module], [secondary_module, secondary_module, tertiary_module]]
+    unfillable = first_unfillable(layout, questions_by_module)
+    if unfillable is not None:
+        if unfillable < 2:
+            return {"error": f"Could not find suitable question combination for Q{unfillable + 1} from Module {primary_module}"}
+        return {"error": f"Insufficient questions for Q{unfillable + 1}"}
+
+    # Marks per main question, CO coverage and Bloom's levels are met in one bounded search
+    combos = solve_paper(layout, questions_by_module, rng=rng)
+    if not combos:
+        return {"error": "Could not find suitable question combinations for the CIE1 pattern"}
+    if used_ids is not None:
+        used_ids.update(q['firestore_id'] for combo in combos for q in combo)
 
-    def find_question_combination_cie(available_questions, count=3):
-        import itertools
-        for combo in itertools.combinations(available_questions, count):
-            if all(q['firestore_id'] not in used_questions for q in combo):
-                return list(combo)
-        return None
-
-    # Q1 & Q2
-    for q_num in ['Q1', 'Q2']:
-        primary_qs = [q for q in questions_by_module[primary_module] if q['firestore_id'] not in used_questions]
-        combo = find_question_combination_cie(primary_qs)
-        if not combo:
-             return {"error": f"Could not find suitable question combination for {q_num} from Module {primary_module}"}
-        
-        for q in combo: used_questions.add(q['firestore_id'])
-        
+    paper = []
+    for index, (combo, modules) in enumerate(zip(combos, layout)):
         paper.append({
-            "main_question": q_num,
-            "module": primary_module,
-            "sub_questions": [
-                {"part": "a", "text": combo[0]['question_text'], "marks": combo[0]['marks'], "co": combo[0].get('co', 'N/A'), "blooms_level": combo[0].get('blooms_level', 'L2'), "module": primary_module},
-                {"part": "b", "text": combo[1]['question_text'], "marks": combo[1]['marks'], "co": combo[1].get('co', 'N/A'), "blooms_level": combo[1].get('blooms_level', 'L2'), "module": primary_module},
-                {"part": "c", "text": combo[2]['question_text'], "marks": combo[2]['marks'], "co": combo[2].get('co', 'N/A'), "blooms_level": combo[2].get('blooms_level', 'L2'), "module": primary_module}
-            ]
+            "main_question": f"Q{index + 1}",
+            "module": primary_module if index < 2 else f"{secondary_module} & {tertiary_module}",
+            "sub_questions": cie_sub_questions(combo, modules)
         })
 
-    # Q3
-    sec_qs = [q for q in questions_by_module[secondary_module] if q['firestore_id'] not in used_questions]
-    tert_qs = [q for q in questions_by_module[tertiary_module] if q['firestore_id'] not in used_questions]
-    
-    if len(sec_qs) < 2 or len(tert_qs) < 1:
-        return {"error": "Insufficient questions for Q3"}
-        
-    q3_sec = sec_qs[:2]
-    q3_tert = tert_qs[0]
-    for q in q3_sec + [q3_tert]: used_questions.add(q['firestore_id'])
-    
-    paper.append({
-        "main_question": "Q3",
-        "module": f"{secondary_module} & {tertiary_module}",
-        "sub_questions": [
-            {"part": "a", "text": q3_sec[0]['question_text'], "marks": q3_sec[0]['marks'], "co": q3_sec[0].get('co', 'N/A'), "blooms_level": q3_sec[0].get('blooms_level', 'L2'), "module": secondary_module},
-            {"part": "b", "text": q3_sec[1]['question_text'], "marks": q3_sec[1]['marks'], "co": q3_sec[1].get('co', 'N/A'), "blooms_level": q3_sec[1].get('blooms_level', 'L2'), "module": secondary_module},
-            {"part": "c", "text": q3_tert['question_text'], "marks": q3_tert['marks'], "co": q3_tert.get('co', 'N/A'), "blooms_level": q3_tert.get('blooms_level', 'L2'), "module": tertiary_module}
-        ]
-    })
-
-    # Q4
-    sec_rem = [q for q in questions_by_module[secondary_module] if q['firestore_id'] not in used_questions]
-    tert_rem = [q for q in questions_by_module[tertiary_module] if q['firestore_id'] not in used_questions]
-    
-    if len(sec_rem) < 2 or len(tert_rem) < 1:
-        return {"error": "Insufficient questions for Q4"}
-
-    q4_sec = sec_rem[:2]
-    q4_tert = tert_rem[0]
-    for q in q4_sec + [q4_tert]: used_questions.add(q['firestore_id'])
-
-    paper.append({
-        "main_question": "Q4",
-        "module": f"{secondary_module} & {tertiary_module}",
-        "sub_questions": [
-            {"part": "a", "text": q4_sec[0]['question_text'], "marks": q4_sec[0]['marks'], "co": q4_sec[0].get('co', 'N/A'), "blooms_level": q4_sec[0].get('blooms_level', 'L2'), "module": secondary_module},
-            {"part": "b", "text": q4_sec[1]['question_text'], "marks": q4_sec[1]['marks'], "co": q4_sec[1].get('co', 'N/A'), "blooms_level": q4_sec[1].get('blooms_level', 'L2'), "module": secondary_module},
-            {"part": "c", "text": q4_tert['question_text'], "marks": q4_tert['marks'], "co": q4_tert.get('co', 'N/A'), "blooms_level": q4_tert.get('blooms_level', 'L2'), "module": tertiary_module}
-        ]
-    })
-
     return paper
 
-def generate_cie2_paper(all_questions):
-    """Generate CIE2 pattern question paper"""
+def cie_sub_questions(combo, modules):
+    """Sub-question entries (parts a, b, c) of a CIE main question"""
+    return [sub_question(q, chr(97 + idx), module) for idx, (q, module) in enumerate(zip(combo, modules))]
+
+def sub_question(q, part, module):
+    """
+    Sub-question entry of a chosen question. Index records carry no text or
+    tables; fill_question_texts() adds them once the paper is chosen.
+    """
+    return {
+        "part": part, "firestore_id": q['firestore_id'], "text": q.get('question_text', ''), "tables": q.get('tables', []),
+        "marks": q['marks'], "co": q.get('co', 'N/A'), "blooms_level": q.get('blooms_level', 'L2'), "module": module
+    }
+
+def fill_question_texts(pool_index, papers):
+    """Adds the text and tables of every sub-question of the papers, read in one call for all of them"""
+    sub_questions = [sq for paper in papers for main in paper for sq in main['sub_questions']]
+    questions = pool_index.fetch(sq['firestore_id'] for sq in sub_questions)
+    for sq in sub_questions:
+        q = questions.get(sq['firestore_id'], {})
+        sq['text'], sq['tables'] = q.get('question_text', ''), q.get('tables', [])
+
+def generate_cie2_paper(questions_by_module, used_ids=None, rng=None):
+    """Generate CIE2 pattern question paper from the pool index (leaving out, then adding to, used_ids; random choices from rng)"""
     print("🎯 Generating CIE2 pattern question paper...")
-    from collections import defaultdict
-    questions_by_module = defaultdict(list)
-    
-    for q in all_questions:
-        try:
-            module_num = str(q.get('module', '1'))
-            marks = int(q.get('marks', 0))
-            if marks > 0:
-                q['module_num'] = module_num
-                q['marks'] = marks
-                questions_by_module[module_num].append(q)
-        except (ValueError, TypeError):
-            continue
-
-    # SHUFFLE questions in each module for randomness
-    import random
-    for mod in questions_by_module:
-        random.shuffle(questions_by_module[mod])
+    questions_by_module = unused_questions(questions_by_module, used_ids)
+
+    # No shuffle needed: solve_paper draws its candidates at random from rng
+    rng = rng or random
 
     # CIE2 Logic (Module 4, 5, 6)
     # Simplified for brevity, assumes logic similar to CIE1 but with different modules
@@ -393,53 +312,27 @@ def generate_cie2_paper(all_questions):
     available_modules = list(questions_by_module.keys())
     if not available_modules: return {"error": "No questions found."}
     
-    paper = []
-    used_questions = set()
-    
-    def find_combo(qs, count=3):
-        import itertools
-        for combo in itertools.combinations(qs, count):
-            if all(q['firestore_id'] not in used_questions for q in combo): return list(combo)
-        return None
+    # Q1 & Q2 from Module 4, Q3 & Q4 two parts from Module 5 and one from Module 6
+    layout = [['4'] * 3, ['4'] * 3, ['5', '5', '6'], ['5', '5', '6']]
+    unfillable = first_unfillable(layout, questions_by_module)
+    if unfillable is not None:
+        if unfillable < 2:
+            return {"error": f"Insufficient questions for Q{unfillable + 1} from Module 4"}
+        return {"error": f"Insufficient questions for Q{unfillable + 1} (Need 2 from Mod 5, 1 from Mod 6)"}
+
+    # Marks per main question, CO coverage and Bloom's levels are met in one bounded search
+    combos = solve_paper(layout, questions_by_module, rng=rng)
+    if not combos:
+        return {"error": "Could not find suitable question combinations for the CIE2 pattern"}
+    if used_ids is not None:
+        used_ids.update(q['firestore_id'] for combo in combos for q in combo)
 
-    # Q1 & Q2 (Module 4)
-    mod4_qs = [q for q in questions_by_module.get('4', []) if q['firestore_id'] not in used_questions]
-    
-    for q_num in ['Q1', 'Q2']:
-        combo = find_combo(mod4_qs)
-        if not combo: return {"error": f"Insufficient questions for {q_num} from Module 4"}
-        for q in combo: used_questions.add(q['firestore_id'])
-        # Update mod4_qs for next iteration
-        mod4_qs = [q for q in questions_by_module.get('4', []) if q['firestore_id'] not in used_questions]
-        
-        paper.append({
-            "main_question": q_num,
-            "module": "4",
-            "sub_questions": [
-                {"part": "a", "text": combo[0]['question_text'], "marks": combo[0]['marks'], "co": combo[0].get('co', 'N/A'), "blooms_level": combo[0].get('blooms_level', 'L2'), "module": "4"},
-                {"part": "b", "text": combo[1]['question_text'], "marks": combo[1]['marks'], "co": combo[1].get('co', 'N/A'), "blooms_level": combo[1].get('blooms_level', 'L2'), "module": "4"},
-                {"part": "c", "text": combo[2]['question_text'], "marks": combo[2]['marks'], "co": combo[2].get('co', 'N/A'), "blooms_level": combo[2].get('blooms_level', 'L2'), "module": "4"}
-            ]
-        })
-
-    # Q3 & Q4 (Module 5 & 6)
-    for q_num in ['Q3', 'Q4']:
-        mod5_qs = [q for q in questions_by_module.get('5', []) if q['firestore_id'] not in used_questions]
-        mod6_qs = [q for q in questions_by_module.get('6', []) if q['firestore_id'] not in used_questions]
-        
-        if len(mod5_qs) < 2 or len(mod6_qs) < 1: return {"error": f"Insufficient questions for {q_num} (Need 2 from Mod 5, 1 from Mod 6)"}
-        
-        q_sel = mod5_qs[:2] + [mod6_qs[0]]
-        for q in q_sel: used_questions.add(q['firestore_id'])
-        
+    paper = []
+    for index, (combo, modules) in enumerate(zip(combos, layout)):
         paper.append({
-            "main_question": q_num,
-            "module": "5 & 6",
-            "sub_questions": [
-                {"part": "a", "text": q_sel[0]['question_text'], "marks": q_sel[0]['marks'], "co": q_sel[0].get('co', 'N/A'), "blooms_level": q_sel[0].get('blooms_level', 'L2'), "module": "5"},
-                {"part": "b", "text": q_sel[1]['question_text'], "marks": q_sel[1]['marks'], "co": q_sel[1].get('co', 'N/A'), "blooms_level": q_sel[1].get('blooms_level', 'L2'), "module": "5"},
-                {"part": "c", "text": q_sel[2]['question_text'], "marks": q_sel[2]['marks'], "co": q_sel[2].get('co', 'N/A'), "blooms_level": q_sel[2].get('blooms_level', 'L2'), "module": "6"}
-            ]
+            "main_question": f"Q{index + 1}",
+            "module": "4" if index < 2 else "5 & 6",
+            "sub_questions": cie_sub_questions(combo, modules)
         })
 
     return paper
@@ -464,9 +357,10 @@ def generate_docx_export(questions, subject, paper_id):
         
         for j, sub_q in enumerate(question.get('sub_questions', [])):
             part = sub_q.get('part', chr(97 + j))
-            text = sub_q.get('text', sub_q.get('question_text', ''))
+            text, tables = question_tables(sub_q.get('text', sub_q.get('question_text', '')), sub_q.get('tables'))
             marks = sub_q.get('marks', 0)
             doc.add_paragraph(f'({part}) {text} [{marks} marks]')
+            add_docx_tables(doc, tables)
         doc.add_paragraph('')
     
     filename = f"{subject.replace(' ', '_')}_{paper_id}.docx"
@@ -499,15 +393,109 @@ def generate_pdf_export(questions, subject, paper_id):
         
         for j, sub_q in enumerate(question.get('sub_questions', [])):
             part = sub_q.get('part', chr(97 + j))
-            text = sub_q.get('text', sub_q.get('question_text', ''))
+            text, tables = question_tables(sub_q.get('text', sub_q.get('question_text', '')), sub_q.get('tables'))
             marks = sub_q.get('marks', 0)
             story.append(Paragraph(f'({part}) {text} [{marks} marks]', styles['Normal']))
+            story.extend(question_table_flowables(tables, doc.width, styles))
             story.append(Spacer(1, 6))
         story.append(Spacer(1, 20))
     
     doc.build(story)
     return filepath
 
+def normalize_uploaded_question(item):
+    """Converts an AdvancedParser item to the question format stored by /upload_and_parse"""
+    return {
+        "sl_no": "Auto",
+        "question_text": item["question_text"],
+        "tables": item.get("tables", []),
+        "co": "CO1", "blooms_level": "L1", "marks": 10, "module": "1",
+        "images": [img.replace('\\', '/') for img in item["images"]],
+        "formulas": item["formulas"]
+    }
+
+def stage_bank_metadata(batch, user_uid, filename, question_count):
+    """Adds the question_banks entry for an uploaded file to batch"""
+    safe_bank_id = re.sub(r'[^a-zA-Z0-9]', '_', filename)
+    bank_ref = db_firestore.collection('users').document(user_uid).collection('question_banks').document(f"bank_{safe_bank_id}")
+    batch.set(bank_ref, {
+        'id': f"bank_{safe_bank_id}", 'name': filename, 'source_file': filename,
+        'uploaded_at': firestore.SERVER_TIMESTAMP, 'question_count': question_count,
+        'type': 'question-bank', 'user_uid': user_uid
+    })
+
+def parse_and_store_upload(user_uid, filepath, filename):
+    """
+    Parses a saved upload and writes its questions to the user's pool.
+    Returns the /upload_and_parse response body, or None if nothing parsed.
+    Runs in the request thread or in a background parse job.
+    """
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    parsed_questions = []
+    images_folder = os.path.join(os.path.dirname(filepath), "extracted_images")
+    
+    # A bank that was parsed before (by anyone) skips straight to the Firestore write
+    cache_key = parse_cache.key_for_file(filepath, 'upload')
+    cached_questions = parse_cache.get(cache_key, images_folder)
+    
+    if cached_questions is not None:
+        parsed_questions = cached_questions
+    elif file_extension == 'pdf':
+        # Read the PDF once; every strategy below works from this shared model
+        document = load_parsed_document(filepath)
+        try:
+            # Lazy import to avoid startup crash if dependencies are missing
+            import sys
+            sys.path.append(os.path.dirname(os.path.dirname(__file__))) # Add backend to path
+            from advanced_parser import get_advanced_parser
+            
+            parser = get_advanced_parser()
+            os.makedirs(images_folder, exist_ok=True)
+            raw_parsed_content = parser.parse_pdf(filepath, images_folder, document=document)
+            parsed_questions = [normalize_uploaded_question(item) for item in raw_parsed_content]
+        except ImportError as ie:
+            print(f"Advanced parser import failed (dependencies missing): {ie}")
+            # Fallback
+            parsed_questions = parse_pdf_with_embedded_tables(filepath, document)
+            if not parsed_questions: parsed_questions = parse_pdf_question_bank(filepath, document)
+        except Exception as e:
+            print(f"Advanced parsing failed: {e}")
+            parsed_questions = parse_pdf_with_embedded_tables(filepath, document)
+            if not parsed_questions: parsed_questions = parse_pdf_question_bank(filepath, document)
+    elif file_extension == 'docx':
+        parsed_questions = parse_docx_question_bank(filepath)
+    
+    if not parsed_questions: return None
+    
+    if cached_questions is None:
+        parse_cache.put(cache_key, parsed_questions, images_folder)
+
+    # A re-upload of the same file only writes the questions that changed
+    sync = PoolSync(db_firestore, user_uid, filename)
+    questions_to_return = [sync.stage(q_data) for q_data in parsed_questions]
+    sync.finish()
+
+    batch = db_firestore.batch()
+    stage_bank_metadata(batch, user_uid, filename, len(parsed_questions))
+    batch.commit()
+    
+    return {
+        "message": "File uploaded and parsed successfully!",
+        "filename": filename,
+        "parsed_questions_count": len(parsed_questions),
+        "parsed_data": questions_to_return,
+        "sync": sync.stats
+    }
+
+def run_parse_upload_job(payload):
+    """Background job handler for /upload_and_parse_async"""
+    result = parse_and_store_upload(payload['user_uid'], payload['filepath'], payload['filename'])
+    if result is None:
+        raise ValueError("No questions could be parsed.")
+    return result
+
+job_queue.register('parse_upload', run_parse_upload_job)
+
 # --- Routes ---
 
 @qp_bp.route('/upload_and_parse', methods=['POST'])
@@ -525,82 +513,196 @@ def upload_and_parse():
         filepath = os.path.join(user_upload_folder, filename)
         file.save(filepath)
         
-        file_extension = filename.rsplit('.', 1)[1].lower()
-        parsed_questions = []
-        
         try:
-            if file_extension == 'pdf':
-                try:
-                    # Lazy import to avoid startup crash if dependencies are missing
-                    import sys
-                    sys.path.append(os.path.dirname(os.path.dirname(__file__))) # Add backend to path
-                    from advanced_parser import get_advanced_parser
-                    
-                    parser = get_advanced_parser()
-                    images_folder = os.path.join(user_upload_folder, "extracted_images")
-                    os.makedirs(images_folder, exist_ok=True)
-                    raw_parsed_content = parser.parse_pdf(filepath, images_folder)
-                    for item in raw_parsed_content:
-                        parsed_questions.append({
-                            "sl_no": "Auto",
-                            "question_text": item["question_text"],
-                            "co": "CO1", "blooms_level": "L1", "marks": 10, "module": "1",
-                            "images": [img.replace('\\', '/') for img in item["images"]],
-                            "formulas": item["formulas"]
-                        })
-                except ImportError as ie:
-                    print(f"Advanced parser import failed (dependencies missing): {ie}")
-                    # Fallback
-                    parsed_questions = parse_pdf_with_embedded_tables(filepath)
-                    if not parsed_questions: parsed_questions = parse_pdf_question_bank(filepath)
-                except Exception as e:
-                    print(f"Advanced parsing failed: {e}")
-                    parsed_questions = parse_pdf_with_embedded_tables(filepath)
-                    if not parsed_questions: parsed_questions = parse_pdf_question_bank(filepath)
-            elif file_extension == 'docx':
-                parsed_questions = parse_docx_question_bank(filepath)
-            
-            if not parsed_questions: return jsonify({"error": "No questions could be parsed."}), 400
+            result = parse_and_store_upload(user_uid, filepath, filename)
+            if result is None: return jsonify({"error": "No questions could be parsed."}), 400
+            return jsonify(result), 200
+        except Exception as e:
+            traceback.print_exc()
+            return jsonify({"error": f"Error parsing/saving: {str(e)}"}), 500
+    return jsonify({"error": "Invalid file type"}), 400
+
+@qp_bp.route('/upload_and_parse_async', methods=['POST'])
+@firebase_auth_required
+def upload_and_parse_async():
+    """
+    Saves the upload and queues it for the background parse workers.
+    Returns a job ID straight away; poll /parse_jobs/<job_id> for progress.
+    """
+    user_uid = request.current_user_uid
+    if 'file' not in request.files: return jsonify({"error": "No file part"}), 400
+    file = request.files['file']
+    if file.filename == '': return jsonify({"error": "No selected file"}), 400
+    if not allowed_file(file.filename): return jsonify({"error": "Invalid file type"}), 400
+
+    filename = secure_filename(file.filename)
+    user_upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], user_uid)
+    os.makedirs(user_upload_folder, exist_ok=True)
+    # Unique name so a re-upload cannot overwrite a file that is still queued
+    filepath = os.path.join(user_upload_folder, f"job_{uuid.uuid4().hex[:8]}_{filename}")
+    file.save(filepath)
+
+    try:
+        job_id = job_queue.submit('parse_upload', user_uid, {
+            "user_uid": user_uid, "filepath": filepath, "filename": filename
+        })
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": f"Could not queue parse job: {str(e)}"}), 500
+
+    return jsonify({
+        "message": "File uploaded; parsing has been queued.",
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/parse_jobs/{job_id}",
+        "result_url": f"/parse_jobs/{job_id}/result"
+    }), 202
+
+def get_user_job(job_id, user_uid, include_result=False):
+    """Returns the job if it belongs to user_uid, else None"""
+    job = job_queue.get(job_id, include_result=include_result)
+    if not job or job.get('user_uid') != user_uid:
+        return None
+    return job
+
+@qp_bp.route('/parse_jobs/<job_id>', methods=['GET'])
+@firebase_auth_required
+def get_parse_job_status(job_id):
+    job = get_user_job(job_id, request.current_user_uid)
+    if not job: return jsonify({"error": "Job not found"}), 404
+    job.pop('user_uid', None)
+    return jsonify(job), 200
+
+@qp_bp.route('/parse_jobs/<job_id>/result', methods=['GET'])
+@firebase_auth_required
+def get_parse_job_result(job_id):
+    job = get_user_job(job_id, request.current_user_uid, include_result=True)
+    if not job: return jsonify({"error": "Job not found"}), 404
+    if job['status'] == 'failed':
+        return jsonify({"error": f"Error parsing/saving: {job['error']}", "status": "failed"}), 500
+    if job['status'] != 'done':
+        return jsonify({"status": job['status'], "queue_position": job['queue_position']}), 202
+    return jsonify(job['result']), 200
+
+# Questions per event when a bank has no page structure (DOCX, legacy fallbacks, cache hits)
+STREAM_CHUNK_SIZE = 25
+
+def iter_question_chunks(questions, size=STREAM_CHUNK_SIZE):
+    for start in range(0, len(questions), size):
+        yield None, questions[start:start + size]
+
+def iter_uploaded_questions(filepath, file_extension, images_folder):
+    """
+    Yields (page_number, questions) for an uploaded bank as it is parsed.
+    PDFs go through AdvancedParser.iter_parse_pdf page by page; if it fails
+    before producing anything, the legacy parsers run and their result is
+    yielded in chunks.
+    """
+    if file_extension == 'docx':
+        yield from iter_question_chunks(parse_docx_question_bank(filepath))
+        return
+    if file_extension != 'pdf':
+        return
+
+    yielded = False
+    try:
+        # Lazy import to avoid startup crash if dependencies are missing
+        import sys
+        sys.path.append(os.path.dirname(os.path.dirname(__file__))) # Add backend to path
+        from advanced_parser import get_advanced_parser
+        
+        parser = get_advanced_parser()
+        os.makedirs(images_folder, exist_ok=True)
+        for page_number, items in parser.iter_parse_pdf(filepath, images_folder):
+            yielded = True
+            yield page_number, [normalize_uploaded_question(item) for item in items]
+    except Exception as e:
+        if yielded:
+            raise
+        print(f"Advanced parsing failed: {e}")
+        parsed_questions = parse_pdf_with_embedded_tables(filepath)
+        if not parsed_questions: parsed_questions = parse_pdf_question_bank(filepath)
+        yield from iter_question_chunks(parsed_questions)
+
+def format_stream_event(event, payload, sse=False):
+    """Serializes one progress event as an NDJSON line or a server-sent event"""
+    payload = dict(payload, event=event)
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps(payload) + "\n"
+
+@qp_bp.route('/upload_and_parse_stream', methods=['POST'])
+@firebase_auth_required
+def upload_and_parse_stream():
+    """
+    Streaming variant of /upload_and_parse. Emits a 'questions' event per
+    parsed page (NDJSON by default, server-sent events with ?format=sse or
+    Accept: text/event-stream) and commits each page's questions to Firestore
+    before sending them, so nothing is held for the whole bank.
+    """
+    user_uid = request.current_user_uid
+    if 'file' not in request.files: return jsonify({"error": "No file part"}), 400
+    file = request.files['file']
+    if file.filename == '': return jsonify({"error": "No selected file"}), 400
+    if not allowed_file(file.filename): return jsonify({"error": "Invalid file type"}), 400
 
-            questions_to_return = []
+    filename = secure_filename(file.filename)
+    user_upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], user_uid)
+    os.makedirs(user_upload_folder, exist_ok=True)
+    filepath = os.path.join(user_upload_folder, filename)
+    file.save(filepath)
+    
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    images_folder = os.path.join(user_upload_folder, "extracted_images")
+    sse = request.args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+
+    def generate():
+        question_count = 0
+        yield format_stream_event('start', {"filename": filename}, sse)
+        try:
+            sync = PoolSync(db_firestore, user_uid, filename)
+            cached_questions = parse_cache.get(parse_cache.key_for_file(filepath, 'upload'), images_folder)
+            if cached_questions is not None:
+                chunks = iter_question_chunks(cached_questions)
+            else:
+                # Results are not written to the parse cache here, since that needs the whole bank at once
+                chunks = iter_uploaded_questions(filepath, file_extension, images_folder)
+
+            for page_number, questions in chunks:
+                if not questions: continue
+                questions = [sync.stage(q_data) for q_data in questions]
+                sync.commit()
+                question_count += len(questions)
+                yield format_stream_event('questions', {"page": page_number, "questions": questions}, sse)
+
+            if not question_count:
+                yield format_stream_event('error', {"error": "No questions could be parsed."}, sse)
+                return
+
+            # Questions of an earlier upload of this file that are gone now
+            sync.finish()
             batch = db_firestore.batch()
-            
-            for q_data in parsed_questions:
-                q_firestore = q_data.copy()
-                doc_ref = db_firestore.collection('users').document(user_uid).collection('question_bank_pool').document()
-                q_firestore.update({
-                    'user_uid': user_uid, 'source_file': filename, 'uploaded_at': firestore.SERVER_TIMESTAMP,
-                    'is_pre_selected': False, 'last_used_date': None
-                })
-                if 'images' in q_firestore: q_firestore['images'] = [os.path.basename(p) for p in q_firestore['images']]
-                
-                batch.set(doc_ref, q_firestore)
-                q_data['firestore_id'] = doc_ref.id
-                if 'uploaded_at' in q_data: del q_data['uploaded_at']
-                if 'last_used_date' in q_data: del q_data['last_used_date']
-                questions_to_return.append(q_data)
-            
-            # Save Bank Metadata
-            safe_bank_id = re.sub(r'[^a-zA-Z0-9]', '_', filename)
-            bank_ref = db_firestore.collection('users').document(user_uid).collection('question_banks').document(f"bank_{safe_bank_id}")
-            batch.set(bank_ref, {
-                'id': f"bank_{safe_bank_id}", 'name': filename, 'source_file': filename,
-                'uploaded_at': firestore.SERVER_TIMESTAMP, 'question_count': len(parsed_questions),
-                'type': 'question-bank', 'user_uid': user_uid
-            })
+            stage_bank_metadata(batch, user_uid, filename, question_count)
             batch.commit()
-            
-            return jsonify({
+
+            yield format_stream_event('done', {
                 "message": "File uploaded and parsed successfully!",
                 "filename": filename,
-                "parsed_questions_count": len(parsed_questions),
-                "parsed_data": questions_to_return
-            }), 200
-            
+                "parsed_questions_count": question_count,
+                "sync": sync.stats
+            }, sse)
         except Exception as e:
             traceback.print_exc()
-            return jsonify({"error": f"Error parsing/saving: {str(e)}"}), 500
-    return jsonify({"error": "Invalid file type"}), 400
+            yield format_stream_event('error', {
+                "error": f"Error parsing/saving: {str(e)}",
+                "parsed_questions_count": question_count
+            }, sse)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if sse else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @qp_bp.route('/upload_and_parse_cie', methods=['POST'])
 @firebase_auth_required
@@ -631,67 +733,33 @@ def upload_and_parse_cie():
     
     try:
         all_questions = []
-        batch = db_firestore.batch()
+        # Large uploads span several batches (Firestore takes at most 500 writes per batch)
+        writer = BatchWriter(db_firestore)
+        pool_index = PoolIndex(db_firestore, user_uid)
         
+        # Save every module file first (request files can only be read here), then parse them concurrently
+        module_files = []
+        user_upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], user_uid)
+        os.makedirs(user_upload_folder, exist_ok=True)
+        images_folder = os.path.join(user_upload_folder, "extracted_images")
         for module_field, file in uploaded_files:
             filename = secure_filename(file.filename)
-            user_upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], user_uid)
-            os.makedirs(user_upload_folder, exist_ok=True)
             filepath = os.path.join(user_upload_folder, filename)
             
             file.save(filepath)
             
             # Extract module number from field name
             module_num = module_field.replace('_file', '').replace('module', '')
-            
-            file_extension = filename.rsplit('.', 1)[1].lower()
-            
-            # Parse the file
-            parsed_questions = []
-            if file_extension == 'pdf':
-                # Try Advanced Parser first for better results with images/tables
-                try:
-                    # Lazy import
-                    import sys
-                    sys.path.append(os.path.dirname(os.path.dirname(__file__))) # Add backend to path
-                    from advanced_parser import get_advanced_parser
-                    
-                    parser = get_advanced_parser()
-                    # Create a subfolder for images
-                    images_folder = os.path.join(user_upload_folder, "extracted_images")
-                    os.makedirs(images_folder, exist_ok=True) # Ensure images folder exists
-                    
-                    # Parse
-                    raw_parsed_content = parser.parse_pdf(filepath, images_folder)
-                    
-                    # Convert to the format expected by Firestore/Frontend
-                    for item in raw_parsed_content:
-                        # Use extracted sl_no if available, otherwise "Auto"
-                        sl_no = item.get("sl_no")
-                        if not sl_no:
-                            sl_no = "Auto"
-                            
-                        parsed_questions.append({
-                            "sl_no": sl_no,
-                            "question_text": item["question_text"],
-                            "co": item.get("co", "CO1"), 
-                            "blooms_level": item.get("blooms_level", "L1"),
-                            "marks": item.get("marks", 10),
-                            "module": item.get("module", module_num), # Use extracted module if available, else form value
-                            "images": [img.replace('\\', '/') for img in item["images"]], # Normalize paths
-                            "formulas": item["formulas"] # New field
-                        })
-                        
-                except Exception as e:
-                    print(f"Advanced parsing failed for {filename}, falling back to legacy: {e}")
-                    # Fallback to legacy parsing
-                    parsed_questions = parse_pdf_with_embedded_tables(filepath)
-                    if not parsed_questions:
-                        parsed_questions = parse_pdf_question_bank(filepath)
-            elif file_extension == 'docx':
-                parsed_questions = parse_docx_question_bank(filepath)
-            
+            module_files.append((filepath, filename, module_num, images_folder))
+        
+        parse_start = time.time()
+        parsed_modules = parse_cie_module_files(module_files)
+        print(f"Parsed {len(module_files)} {cie_type.upper()} module files in {time.time() - parse_start:.2f}s")
+        
+        # Stage the writes in upload order so numbering and results stay the same however the parses finished
+        for (filepath, filename, module_num, images_folder), parsed_questions in zip(module_files, parsed_modules):
             if parsed_questions:
+                indexed_questions = {}
                 # Add module information to each question
                 for q_data_original in parsed_questions:
                     q_data_for_firestore = q_data_original.copy()
@@ -706,7 +774,8 @@ def upload_and_parse_cie():
                     q_data_for_firestore['last_used_date'] = None
                     
                     question_doc_ref = db_firestore.collection('users').document(user_uid).collection('question_bank_pool').document()
-                    batch.set(question_doc_ref, q_data_for_firestore)
+                    writer.write('set', question_doc_ref, q_data_for_firestore)
+                    indexed_questions[question_doc_ref.id] = q_data_for_firestore
                     
                     # Prepare data for frontend
                     q_data_original['firestore_id'] = question_doc_ref.id
@@ -720,8 +789,11 @@ def upload_and_parse_cie():
                         del q_data_original['last_used_date']
                     
                     all_questions.append(q_data_original)
+                
+                # Uploads add to the pool rather than replace a file's questions, so merge into its index
+                pool_index.stage_source(writer.write, filename, indexed_questions, replace=False)
         
-        batch.commit()
+        writer.commit()
         
         print(f"Saved {len(all_questions)} questions from {cie_type.upper()} modules to Firestore pool for user {user_uid}")
         
@@ -816,84 +888,130 @@ def delete_requirements_template(template_id):
         print(f"Error deleting template: {e}")
         return jsonify({"error": f"Failed to delete template: {str(e)}"}), 500
 
+# Labels of the parallel sets /generate_question_paper can produce in one call ("sets": N)
+SET_LABELS = "ABCDE"
+# A response generated for a given seed is kept this long for re-requests with the same pool and options
+PAPER_MEMO_SECONDS = int(os.getenv('PAPER_MEMO_SECONDS', '3600'))
+
+def paper_memo_key(user_uid, pool_version, **options):
+    """Cache key of a generated response: the pool version plus every option that shapes the papers"""
+    digest = hashlib.sha1(json.dumps([pool_version, options], sort_keys=True, default=str).encode()).hexdigest()
+    return f"paper_memo_{user_uid}_{digest}"
+
 @qp_bp.route('/generate_question_paper', methods=['POST'])
 @firebase_auth_required
 def generate_question_paper():
+    """
+    Generates one paper, or "sets" parallel papers, from the user's pool.
+
+    With a "seed" in the request the same pool and options give the same
+    papers. Such a response is memoized: a re-request (refresh, preview)
+    before the pool changes returns the same papers, with the same paper_ids
+    and "memoized": true, instead of generating and storing new ones. Without
+    a seed a fresh one is picked (and returned) and nothing is memoized.
+    """
     user_uid = request.current_user_uid
     data = request.get_json()
     subject = data.get('subject')
     modules = data.get('modules', [])
     use_latest = data.get('use_latest_upload_only', True)
     pattern = data.get('pattern', 'standard')
+    try:
+        set_count = int(data.get('sets', 1))
+    except (ValueError, TypeError):
+        set_count = 0
+    if not 1 <= set_count <= len(SET_LABELS):
+        return jsonify({"error": f"sets must be between 1 and {len(SET_LABELS)}"}), 400
+    # Same seed and pool -> same papers; without one, a fresh seed is returned so the result can be reproduced
+    seed_given = data.get('seed') is not None
+    try:
+        seed = int(data['seed']) if seed_given else secrets.randbelow(2 ** 31)
+    except (ValueError, TypeError):
+        return jsonify({"error": "seed must be an integer"}), 400
 
     try:
         if pattern == 'cie1': use_latest = False
         
-        all_questions = []
+        # Papers are chosen from the pool index (module, marks, CO, level per question), not the full pool
+        pool_index = PoolIndex(db_firestore, user_uid)
+        questions_by_module = {}
         latest_source_file = "All uploaded files"
         
         if use_latest:
-            # Check cache first
-            cache_key = f"latest_qs_{user_uid}"
-            all_questions = get_cached_questions(user_uid, cache_key)
+            # Find the latest source_file by checking the most recent uploaded_at
+            questions_ref = db_firestore.collection('users').document(user_uid).collection('question_bank_pool')
+            latest_docs = questions_ref.order_by('uploaded_at', direction=firestore.Query.DESCENDING).limit(1).get()
             
-            if not all_questions:
-                # 1. Find the latest source_file by checking the most recent uploaded_at
-                questions_ref = db_firestore.collection('users').document(user_uid).collection('question_bank_pool')
-                latest_docs = questions_ref.order_by('uploaded_at', direction=firestore.Query.DESCENDING).limit(1).get()
-                
-                if latest_docs:
-                    latest_source_file = latest_docs[0].to_dict().get('source_file')
-                    print(f"DEBUG: Found latest source_file: {latest_source_file}")
-                    
-                    # 2. Fetch all questions matching that source_file
-                    docs = questions_ref.where('source_file', '==', latest_source_file).stream()
-                    all_questions = []
-                    for doc in docs:
-                        q = doc.to_dict()
-                        q['firestore_id'] = doc.id
-                        all_questions.append(q)
-                    
-                    # 3. Cache it
-                    cache_questions(user_uid, cache_key, all_questions)
+            if latest_docs:
+                latest_source_file = latest_docs[0].to_dict().get('source_file')
+                print(f"DEBUG: Found latest source_file: {latest_source_file}")
+                questions_by_module = pool_index.load(latest_source_file)
         
         # Fallback or if not using latest
-        if not all_questions:
-            questions_ref = db_firestore.collection('users').document(user_uid).collection('question_bank_pool')
-            docs = questions_ref.stream()
-            for doc in docs:
-                q = doc.to_dict()
-                q['firestore_id'] = doc.id
-                all_questions.append(q)
+        if not questions_by_module:
+            questions_by_module = pool_index.load()
             latest_source_file = "All uploaded files"
         
-        if not all_questions: return jsonify({"error": "No questions found."}), 400
-
-        if pattern == 'cie1': generated_paper = generate_cie1_paper(all_questions)
-        elif pattern == 'cie2': generated_paper = generate_cie2_paper(all_questions)
-        else: generated_paper = generate_paper_with_rules(all_questions)
-
-        if isinstance(generated_paper, dict) and "error" in generated_paper:
-            return jsonify(generated_paper), 400
-
-        # Save to Firestore
-        paper_ref = db_firestore.collection('users').document(user_uid).collection('generated_papers').document()
-        paper_data = {
-            "user_uid": user_uid, 
-            "paper_name": f"{subject} - {pattern.upper()}", 
-            "subject": subject,
-            "pattern": pattern, 
-            "questions": generated_paper, 
-            "created_at": firestore.SERVER_TIMESTAMP,
-            "status": "generated",
-            "source_info": {
-                "latest_upload_only": use_latest,
-                "source_file": latest_source_file
+        if not questions_by_module: return jsonify({"error": "No questions found."}), 400
+
+        # A re-request with the same seed on an unchanged pool gets the papers already generated for it
+        memo_key = None
+        if seed_given:
+            memo_key = paper_memo_key(user_uid, pool_index.version, pattern=pattern, sets=set_count, seed=seed,
+                                      subject=subject, use_latest=use_latest, source_file=latest_source_file)
+            memoized = cache.get(memo_key)
+            if memoized is not None:
+                print(f"Returning memoized papers for seed {seed}")
+                return jsonify(dict(memoized, memoized=True)), 200
+
+        # Parallel sets (A, B, C, ...) come from the same pool, with no question in two sets
+        rng = random.Random(seed)
+        used_ids = set()
+        generated_papers = []
+        for set_index in range(set_count):
+            if pattern == 'cie1': generated_paper = generate_cie1_paper(questions_by_module, used_ids, rng)
+            elif pattern == 'cie2': generated_paper = generate_cie2_paper(questions_by_module, used_ids, rng)
+            else: generated_paper = generate_paper_with_rules(questions_by_module, used_ids=used_ids, rng=rng)
+
+            if isinstance(generated_paper, dict) and "error" in generated_paper:
+                if set_count > 1:
+                    generated_paper = {"error": f"Set {SET_LABELS[set_index]}: {generated_paper['error']}"}
+                return jsonify(generated_paper), 400
+            generated_papers.append(generated_paper)
+        fill_question_texts(pool_index, generated_papers)
+
+        # Save to Firestore, all sets in one batch
+        batch = db_firestore.batch()
+        papers_ref = db_firestore.collection('users').document(user_uid).collection('generated_papers')
+        saved_sets = []
+        for set_index, generated_paper in enumerate(generated_papers):
+            paper_ref = papers_ref.document()
+            paper_data = {
+                "user_uid": user_uid, 
+                "paper_name": f"{subject} - {pattern.upper()}", 
+                "subject": subject,
+                "pattern": pattern, 
+                "questions": generated_paper, 
+                "created_at": firestore.SERVER_TIMESTAMP,
+                "status": "generated",
+                "source_info": {
+                    "latest_upload_only": use_latest,
+                    "source_file": latest_source_file
+                }
             }
-        }
-        paper_ref.set(paper_data)
+            if set_count > 1:
+                paper_data["paper_name"] += f" - Set {SET_LABELS[set_index]}"
+                paper_data["set_label"] = SET_LABELS[set_index]
+            batch.set(paper_ref, paper_data)
+            saved_sets.append({"set": SET_LABELS[set_index], "questions": generated_paper, "paper_id": paper_ref.id})
+        batch.commit()
         
-        return jsonify({"message": "Generated!", "questions": generated_paper, "paper_id": paper_ref.id}), 200
+        response = {"message": "Generated!", "questions": saved_sets[0]["questions"], "paper_id": saved_sets[0]["paper_id"], "seed": seed}
+        if set_count > 1:
+            response["sets"] = saved_sets
+        if memo_key:
+            cache.set(memo_key, response, timeout=PAPER_MEMO_SECONDS)
+        return jsonify(response), 200
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -930,6 +1048,11 @@ def save_question_paper():
                 data['supabase_id'] = saved_paper['id']
                 db_firestore.collection('users').document(user_uid).collection('saved_question_papers').add(data)
             except: pass
+            # Saved papers count towards question usage (keyed by the Supabase id, which approval sees too)
+            try:
+                record_paper_usage(db_firestore, user_uid, saved_paper['id'], data.get('questions', []))
+            except Exception as e:
+                print(f"Warning: Failed to record question usage: {e}")
             return jsonify({'message': 'Saved', 'paper_id': saved_paper['id']}), 200
         return jsonify({'error': 'Failed to save'}), 500
     except Exception as e:
@@ -1011,6 +1134,124 @@ def delete_recent_paper():
         return jsonify({'error': str(e)}), 500
 
 
+def batch_writer(batch):
+    """write(op, *args) callable staging into batch, for the PoolIndex staging methods"""
+    return lambda op, *args: getattr(batch, op)(*args)
+
+@qp_bp.route('/add_question_to_bank', methods=['POST'])
+@firebase_auth_required
+def add_question_to_bank():
+    """Add a question to the user's question bank pool by hand"""
+    cache.clear()
+    user_uid = request.current_user_uid
+    data = request.get_json()
+
+    required_fields = ['question_text', 'marks']
+    if not all(field in data for field in required_fields):
+        return jsonify({"error": "Missing required fields (question_text, marks)."}), 400
+
+    try:
+        new_question_ref = db_firestore.collection('users').document(user_uid).collection('question_bank_pool').document()
+        question_data = {
+            "question_text": data.get('question_text'),
+            "co": data.get('co', 'N/A'),
+            "blooms_level": data.get('blooms_level', 'N/A'),
+            "marks": int(data.get('marks')),
+            "module": str(data.get('module', '1')),
+            "user_uid": user_uid,
+            "uploaded_at": firestore.SERVER_TIMESTAMP,
+            "is_pre_selected": False,
+            "last_used_date": None,
+            "source_file": "Manual Entry"
+        }
+
+        # The question and its pool index entry are written together
+        batch = db_firestore.batch()
+        batch.set(new_question_ref, question_data)
+        PoolIndex(db_firestore, user_uid).stage_question(batch_writer(batch), new_question_ref.id, question_data)
+        batch.commit()
+        print(f"Manually added question {new_question_ref.id} to bank for user {user_uid}.")
+
+        # Remove non-serializable fields
+        question_data_for_frontend = {k: v for k, v in question_data.items() if k not in ('uploaded_at', 'last_used_date')}
+        question_data_for_frontend['firestore_id'] = new_question_ref.id
+        return jsonify({"message": "Question added successfully!", "new_question": question_data_for_frontend}), 200
+
+    except ValueError:
+        return jsonify({"error": "Marks must be a valid number."}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": f"Failed to add question to bank: {str(e)}"}), 500
+
+@qp_bp.route('/update_question_in_bank', methods=['POST'])
+@firebase_auth_required
+def update_question_in_bank():
+    """Update fields of a question in the user's question bank pool"""
+    cache.clear()
+    user_uid = request.current_user_uid
+    data = request.get_json()
+    question_id = data.get('question_id')
+    updated_fields = {k: v for k, v in data.items() if k not in ('question_id', 'firestore_id')}
+
+    if not question_id:
+        return jsonify({"error": "Question ID is missing."}), 400
+    if not updated_fields:
+        return jsonify({"error": "No fields provided for update."}), 400
+
+    try:
+        if 'marks' in updated_fields:
+            updated_fields['marks'] = int(updated_fields['marks'])
+
+        question_ref = db_firestore.collection('users').document(user_uid).collection('question_bank_pool').document(question_id)
+        # The index entry moves with the question if its module or source changes, so read it first
+        existing = question_ref.get()
+        if not existing.exists:
+            return jsonify({"error": "Question not found."}), 404
+        old_data = existing.to_dict() or {}
+
+        batch = db_firestore.batch()
+        batch.update(question_ref, updated_fields)
+        PoolIndex(db_firestore, user_uid).stage_question(batch_writer(batch), question_id, {**old_data, **updated_fields}, old_data)
+        batch.commit()
+        print(f"Question {question_id} updated in bank for user {user_uid}.")
+        return jsonify({"message": "Question updated successfully!"}), 200
+
+    except ValueError:
+        return jsonify({"error": "Marks must be a valid number."}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": f"Failed to update question in bank: {str(e)}"}), 500
+
+@qp_bp.route('/delete_question_from_bank', methods=['DELETE'])
+@firebase_auth_required
+def delete_question_from_bank():
+    """Delete a question from the user's question bank pool"""
+    cache.clear()
+    user_uid = request.current_user_uid
+    data = request.get_json()
+    question_id = data.get('question_id')
+
+    if not question_id:
+        return jsonify({"error": "Question ID is missing."}), 400
+
+    try:
+        question_ref = db_firestore.collection('users').document(user_uid).collection('question_bank_pool').document(question_id)
+        existing = question_ref.get()
+        if not existing.exists:
+            return jsonify({"error": "Question not found."}), 404
+
+        batch = db_firestore.batch()
+        batch.delete(question_ref)
+        PoolIndex(db_firestore, user_uid).stage_remove(batch_writer(batch), question_id, existing.to_dict() or {})
+        stage_forget_questions(batch_writer(batch), db_firestore, user_uid, [question_id])
+        batch.commit()
+        print(f"Question {question_id} deleted from bank for user {user_uid}.")
+        return jsonify({"message": "Question deleted successfully!"}), 200
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": f"Failed to delete question from bank: {str(e)}"}), 500
+
 @qp_bp.route('/get_user_questions', methods=['GET'])
 @firebase_auth_required
 def get_user_questions():
@@ -1148,7 +1389,10 @@ def generate_final_document():
                     qno = str(main_q_idx + 1)
                 
                 sub_letter = chr(97 + sub_q_idx)
-                question_text = sub_q_data.get('question_text', sub_q_data.get('text', ''))
+                # Papers saved before the tables field carry their tables inline in the text
+                question_text, tables = question_tables(
+                    sub_q_data.get('question_text', sub_q_data.get('text', '')), sub_q_data.get('tables')
+                )
                 
                 # Store images
                 images = sub_q_data.get('images', [])
@@ -1160,7 +1404,8 @@ def generate_final_document():
                     'co': sub_q_data.get('co', ''),
                     'level': sub_q_data.get('blooms_level', sub_q_data.get('level', '')),
                     'module': sub_q_data.get('module', ''),
-                    'images': images
+                    'images': images,
+                    'tables': tables
                 })
 
         # Create PDF
@@ -1295,6 +1540,9 @@ def generate_final_document():
                 # Add question text
                 question_cell_content.append(Paragraph(str(q['question']), styles['Normal']))
                 
+                # Add the question's tables as native tables
+                question_cell_content.extend(question_table_flowables(q.get('tables'), 11.5*cm, styles))
+                
                 # Add images inline if present
                 if q.get('images') and len(q['images']) > 0:
                     for img_name in q['images']:
@@ -1310,7 +1558,8 @@ def generate_final_document():
                                 # Add small spacer before image
                                 question_cell_content.append(Spacer(1, 0.1*cm))
                                 # Add image (smaller size for inline display)
-                                img = Image(full_img_path, width=4*cm, height=3*cm, kind='proportional')
+                                # Draw the render-sized derivative rather than the full-resolution original
+                                img = Image(render_image_path(full_img_path), width=4*cm, height=3*cm, kind='proportional')
                                 question_cell_content.append(img)
                             except Exception as e:
                                 print(f"Error loading image {full_img_path}: {e}")
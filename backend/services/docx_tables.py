@@ -0,0 +1,154 @@
+"""
+Streaming reader for the tables of a DOCX question bank.
+
+Reads the main document part with lxml's iterparse and hands back each row of
+the body's top-level tables as soon as its closing tag has been read; the row
+is freed before the next one is parsed, so memory stays flat however large
+the bank is. python-docx would build the whole object model first.
+
+Cells match python-docx's row.cells / cell.text:
+- a horizontally spanned cell is repeated once per grid column it spans;
+- a vertically merged ("continue") cell repeats the cell it continues;
+- a cell's text is its direct paragraphs joined by newlines, from the runs
+  (and hyperlink runs) directly inside each paragraph, so nested tables and
+  wrapped content (w:ins, w:sdt, ...) are left out.
+
+Anything this reader cannot reproduce raises UnsupportedDocx; callers fall
+back to python-docx.
+"""
+
+import zipfile
+import posixpath
+from typing import Iterator, List, Tuple
+
+from lxml import etree
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+OFFICE_DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+PACKAGE_RELS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+
+def _w(tag):
+    return f'{{{W_NS}}}{tag}'
+
+
+BODY, TBL, TR, TC, P, R = _w('body'), _w('tbl'), _w('tr'), _w('tc'), _w('p'), _w('r')
+HYPERLINK, TR_PR, TC_PR = _w('hyperlink'), _w('trPr'), _w('tcPr')
+GRID_BEFORE, GRID_SPAN, VMERGE = _w('gridBefore'), _w('gridSpan'), _w('vMerge')
+W_VAL, W_TYPE = _w('val'), _w('type')
+T, BR = _w('t'), _w('br')
+
+# Run content with a fixed text equivalent, as in python-docx's Run.text (w:t and w:br handled separately)
+CONTENT_TEXT = {_w('tab'): '\t', _w('ptab'): '\t', _w('cr'): '\n', _w('noBreakHyphen'): '-'}
+
+
+class UnsupportedDocx(Exception):
+    """The document needs the python-docx reader."""
+
+
+def main_document_part(archive: zipfile.ZipFile) -> str:
+    """Name of the main document part, from the package relationships"""
+    rels = etree.fromstring(archive.read('_rels/.rels'))
+    for rel in rels.iter(f'{{{PACKAGE_RELS_NS}}}Relationship'):
+        if rel.get('Type') == OFFICE_DOCUMENT_REL and rel.get('TargetMode') != 'External':
+            return posixpath.normpath(rel.get('Target').lstrip('/'))
+    raise UnsupportedDocx("no main document part")
+
+
+def run_text(r, parts):
+    for element in r:
+        tag = element.tag
+        if tag == T:
+            parts.append(element.text or '')
+        elif tag == BR:
+            # Page and column breaks have no text equivalent
+            if element.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag in CONTENT_TEXT:
+            parts.append(CONTENT_TEXT[tag])
+
+
+def paragraph_text(p) -> str:
+    """Text of the runs directly in p and in its hyperlinks, like python-docx's Paragraph.text"""
+    parts = []
+    for child in p:
+        if child.tag == R:
+            run_text(child, parts)
+        elif child.tag == HYPERLINK:
+            for r in child.iterchildren(R):
+                run_text(r, parts)
+    return ''.join(parts)
+
+
+def _child_val(parent, tag):
+    """w:val of parent's first tag child: None if there is no such child, '' if it has no w:val"""
+    if parent is None:
+        return None
+    child = parent.find(tag)
+    return None if child is None else child.get(W_VAL, '')
+
+
+def _int_val(value: str, default: int) -> int:
+    try:
+        return int(value) if value else default
+    except ValueError:
+        raise UnsupportedDocx(f"invalid grid value {value!r}")
+
+
+def read_row_cells(tr, above) -> Tuple[List[str], dict]:
+    """
+    Cell texts of one w:tr, and its (text, span) per starting grid offset for
+    the row below. above is that mapping for the previous row of the table.
+    """
+    cells = []
+    starts = {}
+    offset = _int_val(_child_val(tr.find(TR_PR), GRID_BEFORE), 0)
+    for tc in tr.iterchildren(TC):
+        tc_pr = tc.find(TC_PR)
+        span = _int_val(_child_val(tc_pr, GRID_SPAN), 1)
+        merge = _child_val(tc_pr, VMERGE)
+        if merge in ('', 'continue'):
+            if offset not in above:
+                raise UnsupportedDocx("vertically merged cell without a cell above it")
+            text, root_span = above[offset]
+        else:
+            text = '\n'.join(paragraph_text(p) for p in tc.iterchildren(P))
+            root_span = span
+        starts[offset] = (text, root_span)
+        cells.extend([text] * root_span)
+        offset += span
+    return cells, starts
+
+
+def _free(element):
+    """Drop an element's content and everything before it in its parent"""
+    element.clear()
+    parent = element.getparent()
+    while element.getprevious() is not None:
+        del parent[0]
+
+
+def iter_table_rows(filepath: str) -> Iterator[Tuple[int, List[str]]]:
+    """Yields (row_index, cell texts) for each row of each top-level table, in document order"""
+    with zipfile.ZipFile(filepath) as archive:
+        part = main_document_part(archive)
+        with archive.open(part) as stream:
+            row_index = 0
+            above = {}
+            for _, element in etree.iterparse(stream, events=('end',), tag=(TR, TBL)):
+                parent = element.getparent()
+                if element.tag == TBL:
+                    # Nested tables are part of a cell and freed with its row
+                    if parent is not None and parent.tag == BODY:
+                        row_index, above = 0, {}
+                        _free(element)
+                    continue
+
+                grandparent = parent.getparent() if parent is not None else None
+                if parent.tag != TBL or grandparent is None or grandparent.tag != BODY:
+                    continue
+
+                cells, above = read_row_cells(element, above)
+                yield row_index, cells
+                row_index += 1
+                _free(element)
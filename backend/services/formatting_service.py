@@ -1,5 +1,20 @@
 import re
 
+from services.question_tables import make_table
+
+# A line containing any of these (lowercased, anywhere in the line) is question prose, not table data
+PROSE_KEYWORDS = (
+    'question', 'consider', 'write', 'what', 'how', 'explain', 'describe', 'compare', 'contrast',
+    'differences', 'between', 'instance', 'based', 'learning', 'model', 'nearest', 'neighbour',
+    'algorithm', 'weighted', 'determine', 'class', 'given', 'test', 'assign', 'predict', 'using',
+    'classifier', 'centroid', 'training', 'dataset', 'target', 'variable', 'discrete', 'valued',
+    'takes', 'values', 'choose', 'k='
+)
+PROSE_KEYWORD_PATTERN = re.compile('|'.join(re.escape(word) for word in sorted(PROSE_KEYWORDS, key=len, reverse=True)))
+# Words that mark a line as table data: cell values (as written) and column headers (any case)
+TABLE_VALUE_WORDS = frozenset(['pass', 'fail', 'yes', 'no', 'a', 'b'])
+TABLE_HEADER_WORDS = frozenset(['s.no', 'sno', 'gpa', 'cgpa', 'x', 'y', 'class', 'award', 'result', 'assessment', 'project', 'submitted'])
+
 def clean_text(text):
     """Basic text cleaning: remove excessive whitespace, newlines, strip leading/trailing space."""
     if text is None:
@@ -98,87 +113,101 @@ def format_question_with_tables(question_text):
     """Format question text that may contain embedded table data"""
     if not question_text:
         return question_text
-    
-    # Check if the question contains concatenated table data (like "S.NO CGPA Assessment Project submitted Result 1 9.2 85 8 Pass 2 8 80 7 Pass...")
-    if 'S.NO' in question_text and 'CGPA' in question_text and 'Assessment' in question_text:
-        # This is likely the k-NN dataset format
-        return format_knn_dataset_in_question(question_text)
-    
-    # Check for other table patterns like "S.NO GPA No. of projects done Award 1 9.5 5 Yes..."
-    if 'S.NO' in question_text and 'GPA' in question_text and 'Award' in question_text:
-        return format_gpa_award_dataset_in_question(question_text)
-    
-    # Check for other table patterns like "X Y Class 3 1 A 5 2 A..."
-    if 'X Y Class' in question_text or ('X' in question_text and 'Y' in question_text and 'Class' in question_text):
-        return format_xy_class_dataset_in_question(question_text)
+    return render_question_segments(question_segments(question_text))
+
+def split_question_tables(question_text):
+    """
+    Finds the tables in a question text like format_question_with_tables, but
+    returns them as a structured tables field: (text without tables, tables).
+    A split that would leave no question text, or only finds single-row
+    "tables" (a sentence whose words the heuristics took for cells), keeps
+    the original text with no tables.
+    """
+    if not question_text:
+        return question_text, []
+    segments = question_segments(question_text)
+    text = '\n'.join(segment for segment in segments if isinstance(segment, str)).strip()
+    tables = [make_table(segment) for segment in segments if not isinstance(segment, str)]
+    if tables and (not text or all(len(table["rows"]) < 2 for table in tables)):
+        return question_text, []
+    return text, tables
+
+def question_segments(question_text):
+    """
+    Splits question text into segments: text lines (str) and tables (lists of
+    rows, each a list of cells), in their order in the text.
+    """
+    # Datasets concatenated into the question text (k-NN, GPA/Award, X/Y/Class) have their own formatters
+    dataset_segments = match_dataset_rule(question_text)
+    if dataset_segments:
+        return dataset_segments(question_text)
     
     # Check if the question contains table-like data
-    lines = question_text.split('\n')
-    formatted_lines = []
-    in_table = False
+    segments = []
     table_lines = []
     
-    for line in lines:
+    for line in question_text.split('\n'):
         line = line.strip()
         if not line:
-            if in_table and table_lines:
+            if table_lines:
                 # End of table, format it
-                formatted_table = format_embedded_table(table_lines)
-                formatted_lines.append(formatted_table)
+                segments.append(embedded_table_rows(table_lines))
                 table_lines = []
-                in_table = False
             continue
             
-        # Check if this line looks like table data (has multiple space-separated values)
-        words = line.split()
-        # More specific conditions for table detection
-        is_table_data = (
-            len(words) >= 3 and 
-            not any(word in line.lower() for word in ['question', 'consider', 'write', 'what', 'how', 'explain', 'describe', 'compare', 'contrast', 'differences', 'between', 'instance', 'based', 'learning', 'model', 'nearest', 'neighbour', 'algorithm', 'weighted', 'determine', 'class', 'given', 'test', 'assign', 'predict', 'using', 'classifier', 'centroid', 'training', 'dataset', 'target', 'variable', 'discrete', 'valued', 'takes', 'values', 'choose', 'k=']) and
-            (any(word.isdigit() for word in words) or any(word in ['pass', 'fail', 'yes', 'no', 'a', 'b'] for word in words) or 
-             any(word.lower() in ['s.no', 'sno', 'gpa', 'cgpa', 'x', 'y', 'class', 'award', 'result', 'assessment', 'project', 'submitted'] for word in words))
-        )
-        
-        if is_table_data:
+        if is_table_line(line):
             # This looks like table data
-            if not in_table:
-                in_table = True
             table_lines.append(line)
         else:
-            if in_table and table_lines:
+            if table_lines:
                 # End of table, format it
-                formatted_table = format_embedded_table(table_lines)
-                formatted_lines.append(formatted_table)
+                segments.append(embedded_table_rows(table_lines))
                 table_lines = []
-                in_table = False
-            formatted_lines.append(line)
+            segments.append(line)
     
     # Handle table at the end
-    if in_table and table_lines:
-        formatted_table = format_embedded_table(table_lines)
-        formatted_lines.append(formatted_table)
+    if table_lines:
+        segments.append(embedded_table_rows(table_lines))
     
-    return '\n'.join(formatted_lines)
+    return segments
 
-def format_knn_dataset_in_question(question_text):
-    """Format k-NN dataset that's concatenated in question text"""
+def render_table_text(rows):
+    """Rows of cells as the "Table:\n a | b" text stored before questions had a tables field"""
+    return ("Table:\n" + "\n".join(" | ".join(row) for row in rows)).strip()
+
+def render_question_segments(segments):
+    return '\n'.join(segment if isinstance(segment, str) else render_table_text(segment) for segment in segments)
+
+def is_table_line(line):
+    """True if a (stripped) line looks like table data: several values, no question prose"""
+    words = line.split()
+    if len(words) < 3:
+        return False
+    # The word checks are cheaper than the keyword scan and rule out most prose first
+    if not any(word.isdigit() or word in TABLE_VALUE_WORDS or word.lower() in TABLE_HEADER_WORDS for word in words):
+        return False
+    return not PROSE_KEYWORD_PATTERN.search(line.lower())
+
+def knn_dataset_segments(question_text):
+    """Segments of a question with a k-NN dataset concatenated into its text"""
     # Find the start of the table data
     table_start = question_text.find('S.NO')
     if table_start == -1:
-        return question_text
+        return [question_text]
     
     # Split into question part and table part
     question_part = question_text[:table_start].strip()
     table_part = question_text[table_start:].strip()
     
-    # Format the table part
-    formatted_table = format_concatenated_table(table_part)
-    
-    # Combine question and formatted table
-    return f"{question_part}\n\n{formatted_table}"
+    # Question, a blank line, then the table
+    return [question_part, "", concatenated_table_rows(table_part)]
 
-def format_xy_class_dataset_in_question(question_text):
-    """Format X Y Class dataset that's concatenated in the question text"""
+def format_knn_dataset_in_question(question_text):
+    """Format k-NN dataset that's concatenated in question text"""
+    return render_question_segments(knn_dataset_segments(question_text))
+
+def xy_class_dataset_segments(question_text):
+    """Segments of a question with an X Y Class dataset concatenated into its text"""
     # Find where the table data starts
     table_start = question_text.find('X Y Class')
     if table_start == -1:
@@ -193,20 +222,20 @@ def format_xy_class_dataset_in_question(question_text):
                     break
     
     if table_start == -1:
-        return question_text
+        return [question_text]
     
     # Split into question part and table part
     question_part = question_text[:table_start].strip()
     table_part = question_text[table_start:].strip()
     
-    # Format the table part
-    formatted_table = format_xy_class_table(table_part)
-    
-    # Combine question and formatted table
-    return f"{question_part}\n\n{formatted_table}"
+    return [question_part, "", xy_class_table_rows(table_part)]
 
-def format_xy_class_table(table_text):
-    """Format X Y Class table data"""
+def format_xy_class_dataset_in_question(question_text):
+    """Format X Y Class dataset that's concatenated in the question text"""
+    return render_question_segments(xy_class_dataset_segments(question_text))
+
+def xy_class_table_rows(table_text):
+    """Rows of X Y Class table data (the whole text in one cell if it does not parse)"""
     words = table_text.split()
     
     # Find the header part (X Y Class)
@@ -220,40 +249,39 @@ def format_xy_class_table(table_text):
         header_words.append(word)
     
     if len(header_words) < 3 or data_start_idx == 0:
-        return f"Table:\n{table_text}"
-    
-    # Format headers
-    headers = ' | '.join(header_words)
-    formatted_table = f"Table:\n{headers}\n"
+        return [[table_text]]
     
-    # Format data rows (should be groups of 3: number, number, letter)
+    # Data rows should be groups of 3: number, number, letter
+    rows = [header_words]
     data_words = words[data_start_idx:]
     for i in range(0, len(data_words), 3):
         if i + 2 < len(data_words):
-            row = f"{data_words[i]} | {data_words[i+1]} | {data_words[i+2]}"
-            formatted_table += row + "\n"
-    
-    return formatted_table.strip()
+            rows.append(data_words[i:i + 3])
+    return rows
 
-def format_gpa_award_dataset_in_question(question_text):
-    """Format S.NO GPA Award dataset that's concatenated in the question text"""
+def format_xy_class_table(table_text):
+    """Format X Y Class table data"""
+    return render_table_text(xy_class_table_rows(table_text))
+
+def gpa_award_dataset_segments(question_text):
+    """Segments of a question with an S.NO GPA Award dataset concatenated into its text"""
     # Find where the table data starts
     table_start = question_text.find('S.NO')
     if table_start == -1:
-        return question_text
+        return [question_text]
     
     # Split into question part and table part
     question_part = question_text[:table_start].strip()
     table_part = question_text[table_start:].strip()
     
-    # Format the table part
-    formatted_table = format_gpa_award_table(table_part)
-    
-    # Combine question and formatted table
-    return f"{question_part}\n\n{formatted_table}"
+    return [question_part, "", gpa_award_table_rows(table_part)]
 
-def format_gpa_award_table(table_text):
-    """Format S.NO GPA Award table data"""
+def format_gpa_award_dataset_in_question(question_text):
+    """Format S.NO GPA Award dataset that's concatenated in the question text"""
+    return render_question_segments(gpa_award_dataset_segments(question_text))
+
+def gpa_award_table_rows(table_text):
+    """Rows of S.NO GPA Award table data (the whole text in one cell if it does not parse)"""
     words = table_text.split()
     
     # Find the header part (S.NO GPA No. of projects done Award)
@@ -267,23 +295,22 @@ def format_gpa_award_table(table_text):
         header_words.append(word)
     
     if len(header_words) < 4 or data_start_idx == 0:
-        return f"Table:\n{table_text}"
+        return [[table_text]]
     
-    # Format headers
-    headers = ' | '.join(header_words)
-    formatted_table = f"Table:\n{headers}\n"
-    
-    # Format data rows (should be groups of 4: number, decimal, number, yes/no)
+    # Data rows should be groups of 4: number, decimal, number, yes/no
+    rows = [header_words]
     data_words = words[data_start_idx:]
     for i in range(0, len(data_words), 4):
         if i + 3 < len(data_words):
-            row = f"{data_words[i]} | {data_words[i+1]} | {data_words[i+2]} | {data_words[i+3]}"
-            formatted_table += row + "\n"
-    
-    return formatted_table.strip()
+            rows.append(data_words[i:i + 4])
+    return rows
 
-def format_concatenated_table(table_text):
-    """Format concatenated table text like 'S.NO CGPA Assessment Project submitted Result 1 9.2 85 8 Pass 2 8 80 7 Pass...'"""
+def format_gpa_award_table(table_text):
+    """Format S.NO GPA Award table data"""
+    return render_table_text(gpa_award_table_rows(table_text))
+
+def concatenated_table_rows(table_text):
+    """Rows of concatenated table text like 'S.NO CGPA Assessment Project submitted Result 1 9.2 85 8 Pass 2 8 80 7 Pass...'"""
     words = table_text.split()
     
     # Find the header part
@@ -297,59 +324,55 @@ def format_concatenated_table(table_text):
         header_words.append(word)
     
     if not header_words or data_start_idx == 0:
-        return f"Table:\n{table_text}"
-    
-    # Format headers
-    headers = ' | '.join(header_words)
+        return [[table_text]]
     
-    # Format data rows
-    data_words = words[data_start_idx:]
-    rows = []
+    # Data rows start at a row number once the current row has its values
+    rows = [header_words]
     current_row = []
     
-    for word in data_words:
+    for word in words[data_start_idx:]:
         if word.isdigit() and len(current_row) >= 4:  # New row starting
-            if current_row:
-                rows.append(' | '.join(current_row))
+            rows.append(current_row)
             current_row = [word]
         else:
             current_row.append(word)
     
     # Add the last row
     if current_row:
-        rows.append(' | '.join(current_row))
-    
-    # Combine everything
-    result = f"Table:\n{headers}\n" + '\n'.join(rows)
-    return result
+        rows.append(current_row)
+    return rows
 
-def format_embedded_table(table_lines):
-    """Format embedded table lines into a proper table structure"""
+def format_concatenated_table(table_text):
+    """Format concatenated table text like 'S.NO CGPA Assessment Project submitted Result 1 9.2 85 8 Pass 2 8 80 7 Pass...'"""
+    return render_table_text(concatenated_table_rows(table_text))
+
+def embedded_table_rows(table_lines):
+    """Rows of table lines found in question text: their words, lines of fewer than two words dropped"""
     if not table_lines:
-        return ""
+        return []
     
     # Check if first line looks like headers
     first_line_words = table_lines[0].split()
     if len(first_line_words) >= 2 and not any(word.isdigit() for word in first_line_words):
         # First line is likely headers
-        headers = ' | '.join(first_line_words)
+        rows = [first_line_words]
         data_lines = table_lines[1:]
     else:
         # No clear headers, treat all as data
-        headers = None
+        rows = []
         data_lines = table_lines
     
-    formatted_table = "Table:\n"
-    if headers:
-        formatted_table += headers + "\n"
-    
     for line in data_lines:
         words = line.split()
         if len(words) >= 2:
-            formatted_line = ' | '.join(words)
-            formatted_table += formatted_line + "\n"
-    
-    return formatted_table.strip()
+            rows.append(words)
+    return rows
+
+def format_embedded_table(table_lines):
+    """Format embedded table lines into a proper table structure"""
+    if not table_lines:
+        return ""
+    return render_table_text(embedded_table_rows(table_lines))
 
 def extract_table_from_docx_cell(cell):
     """Extract table content from a DOCX cell if it contains a table"""
@@ -359,3 +382,30 @@ def extract_table_from_docx_cell(cell):
             row_cells = [cell.text.strip() for cell in row.cells]
             table_text += "\t".join(row_cells) + "\n"
     return table_text.strip()
+
+# Datasets that end up concatenated into question text, as (name, markers, segments function): a rule
+# applies when all of its markers occur in the text, and the first rule that applies splits the question
+DATASET_RULES = []
+# Every marker of every rule, each tested once per question however many rules share it
+_dataset_markers = ()
+
+def register_dataset_rule(name, markers, segments):
+    """Adds a dataset rule after the existing ones; segments(question_text) works like question_segments"""
+    global _dataset_markers
+    DATASET_RULES.append((name, frozenset(markers), segments))
+    _dataset_markers = tuple(sorted({marker for _, rule_markers, _ in DATASET_RULES for marker in rule_markers}))
+
+def match_dataset_rule(question_text):
+    """Segments function of the first dataset rule whose markers all occur in the text, or None"""
+    found = {marker for marker in _dataset_markers if marker in question_text}
+    for _, markers, segments in DATASET_RULES:
+        if markers <= found:
+            return segments
+    return None
+
+# e.g. "S.NO CGPA Assessment Project submitted Result 1 9.2 85 8 Pass 2 8 80 7 Pass..."
+register_dataset_rule('knn', ('S.NO', 'CGPA', 'Assessment'), knn_dataset_segments)
+# e.g. "S.NO GPA No. of projects done Award 1 9.5 5 Yes..."
+register_dataset_rule('gpa_award', ('S.NO', 'GPA', 'Award'), gpa_award_dataset_segments)
+# e.g. "X Y Class 3 1 A 5 2 A..."
+register_dataset_rule('xy_class', ('X', 'Y', 'Class'), xy_class_dataset_segments)
@@ -0,0 +1,165 @@
+"""
+Content-addressed storage for images extracted from question banks.
+
+Each image is saved as img_<sha256 prefix>.<ext>, so identical bytes are
+written once no matter how many pages, banks or re-uploads contain them,
+and banks sharing a user's extracted_images folder no longer overwrite
+each other's files. Writes go through a small thread pool; call flush()
+before handing filenames to anything that reads the files.
+
+Next to each original a render-sized JPEG (img_<hash>_render.jpg) is
+stored for the PDF renderers, which always draw question images in a
+4cm x 3cm box; render_image_path() picks it up (creating it on first use
+for images extracted before derivatives existed).
+"""
+
+import os
+import uuid
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
+
+IMAGE_WRITE_WORKERS = int(os.getenv('PARSER_IMAGE_WRITE_WORKERS', '4'))
+HASH_PREFIX_LEN = 20
+
+# Render derivative: sized for the renderers' 4cm x 3cm image box at RENDER_DPI
+RENDER_BOX_CM = (4, 3)
+RENDER_DPI = int(os.getenv('PARSER_RENDER_DPI', '200'))
+RENDER_JPEG_QUALITY = int(os.getenv('PARSER_RENDER_JPEG_QUALITY', '85'))
+RENDER_SUFFIX = '_render.jpg'
+
+
+def image_filename(sha256, ext):
+    return f"img_{sha256[:HASH_PREFIX_LEN]}.{ext}"
+
+
+def _write_file(path, data):
+    """Write via a temp file and rename, so concurrent writers of the same image never see a partial file"""
+    if os.path.exists(path):
+        return False
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def render_variant_path(path):
+    return os.path.splitext(path)[0] + RENDER_SUFFIX
+
+
+def make_render_variant(path, data=None):
+    """
+    Writes the render-sized JPEG for the image at path. Returns its path, or
+    None when Pillow is unavailable or the variant would not be smaller.
+    """
+    variant_path = render_variant_path(path)
+    if os.path.exists(variant_path):
+        return variant_path
+    if PILImage is None:
+        return None
+
+    box = tuple(round(size / 2.54 * RENDER_DPI) for size in RENDER_BOX_CM)
+    tmp_path = f"{variant_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with PILImage.open(path) as img:
+            img.load()
+            if img.mode in ('RGBA', 'LA', 'P'):
+                # Flatten transparency onto the white page background
+                img = img.convert('RGBA')
+                background = PILImage.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1])
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            img.thumbnail(box, PILImage.LANCZOS)
+
+            img.save(tmp_path, 'JPEG', quality=RENDER_JPEG_QUALITY, optimize=True)
+
+        original_size = len(data) if data is not None else os.path.getsize(path)
+        if os.path.getsize(tmp_path) >= original_size:
+            os.remove(tmp_path)
+            return None
+        os.replace(tmp_path, variant_path)
+        return variant_path
+    except Exception as e:
+        print(f"Could not create render variant for {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+
+_variant_attempted = set()
+_variant_lock = threading.Lock()
+
+
+def render_image_path(path):
+    """The file a renderer should draw for path: its render variant when there is one, else path itself"""
+    variant_path = render_variant_path(path)
+    if os.path.exists(variant_path):
+        return variant_path
+
+    # Images extracted before derivatives existed: build the variant once
+    with _variant_lock:
+        if path in _variant_attempted:
+            return path
+        _variant_attempted.add(path)
+    return make_render_variant(path) or path
+
+
+def _store_image(path, data):
+    _write_file(path, data)
+    make_render_variant(path, data)
+
+
+class ImageStore:
+    def __init__(self, folder, workers=None):
+        self.folder = folder
+        self.workers = IMAGE_WRITE_WORKERS if workers is None else workers
+        self._executor = None
+        self._pending = []
+        self._seen = set()
+        os.makedirs(folder, exist_ok=True)
+
+    def add(self, data, ext, sha256=None):
+        """Queue an image for writing; returns (filename, path)"""
+        sha256 = sha256 or hashlib.sha256(data).hexdigest()
+        filename = image_filename(sha256, ext)
+        path = os.path.join(self.folder, filename)
+
+        if filename not in self._seen:
+            self._seen.add(filename)
+            if not os.path.exists(path):
+                if self.workers > 1:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+                    self._pending.append(self._executor.submit(_store_image, path, data))
+                else:
+                    _store_image(path, data)
+        return filename, path
+
+    def flush(self):
+        """Block until every queued write has finished (re-raising write errors)"""
+        pending, self._pending = self._pending, []
+        wait(pending)
+        for future in pending:
+            future.result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
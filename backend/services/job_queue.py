@@ -0,0 +1,215 @@
+"""
+Persistent background job queue for slow work such as PDF parsing.
+
+Jobs live in a small SQLite database so they survive restarts and can be
+polled from any gunicorn worker. The web processes only queue and read jobs;
+a separate worker process (backend/worker.py, the Procfile "worker") runs
+them on PARSE_JOB_WORKERS threads and requeues jobs left "running" by a
+worker that died. It must share the machine and PARSE_JOB_DB with the web
+processes. Jobs are claimed inside an IMMEDIATE transaction, so a job runs
+once even when several workers share the database.
+
+    job_id = job_queue.submit('parse_upload', user_uid, {...})     # web process
+    job_queue.get(job_id)  ->  {'id', 'status', 'result', 'error', ...}
+    job_queue.run_forever()                                         # worker process
+
+Statuses: queued -> running -> done | failed
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'parse_jobs.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user_uid TEXT,
+    status TEXT NOT NULL,
+    payload TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobQueue:
+    def __init__(self, db_path: str = None, workers: int = None):
+        self.db_path = db_path or os.getenv('PARSE_JOB_DB', DEFAULT_DB_PATH)
+        self.workers = workers if workers is not None else int(os.getenv('PARSE_JOB_WORKERS', '2'))
+        # A job still "running" after this long is assumed to have lost its process
+        self.stale_seconds = int(os.getenv('PARSE_JOB_STALE_SECONDS', '3600'))
+        self.retention_seconds = int(os.getenv('PARSE_JOB_RETENTION_HOURS', '24')) * 3600
+        self.handlers: Dict[str, Callable] = {}
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def register(self, kind: str, handler: Callable):
+        """Register handler(payload) -> result (JSON-serializable) for a job kind"""
+        self.handlers[kind] = handler
+
+    @contextmanager
+    def _connect(self):
+        """A short-lived connection per operation; commits on success"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _ensure_schema(self):
+        """Create the schema on first use"""
+        with self._lock:
+            if self._schema_ready:
+                return
+            with self._connect() as conn:
+                conn.executescript(SCHEMA)
+            self._schema_ready = True
+
+    def requeue_stale(self) -> int:
+        """Requeue jobs whose worker died mid-run; returns how many"""
+        self._ensure_schema()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running' AND started_at < ?",
+                (time.time() - self.stale_seconds,)
+            )
+        if cursor.rowcount:
+            print(f"Requeued {cursor.rowcount} stale jobs")
+        return cursor.rowcount
+
+    def start_workers(self):
+        """Start the worker threads in this process (once); the web processes never call this"""
+        self.requeue_stale()
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(max(1, self.workers)):
+                thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        print(f"Job queue started with {max(1, self.workers)} workers ({self.db_path})")
+
+    def run_forever(self, requeue_interval: float = 60):
+        """Worker process main loop: runs jobs until killed, requeueing stale ones now and then"""
+        self.start_workers()
+        while True:
+            time.sleep(requeue_interval)
+            try:
+                self.requeue_stale()
+            except sqlite3.Error as e:
+                print(f"Job queue error: {e}")
+
+    def submit(self, kind: str, user_uid: str, payload: Dict) -> str:
+        """Queue a job and return its ID immediately"""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        self._ensure_schema()
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, user_uid, status, payload, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, user_uid, json.dumps(payload), now)
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (now - self.retention_seconds,)
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str, include_result: bool = True) -> Optional[Dict]:
+        """Return a job as a dict, or None if it does not exist"""
+        self._ensure_schema()
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            position = None
+            if row['status'] == 'queued':
+                position = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?", (row['created_at'],)
+                ).fetchone()[0]
+
+        job = {
+            'id': row['id'],
+            'kind': row['kind'],
+            'user_uid': row['user_uid'],
+            'status': row['status'],
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'queue_position': position
+        }
+        if include_result:
+            job['result'] = json.loads(row['result']) if row['result'] else None
+        return job
+
+    def _claim_next(self) -> Optional[sqlite3.Row]:
+        """Atomically move the oldest queued job to running"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), row['id']))
+            return row
+
+    def _finish(self, job_id: str, status: str, result=None, error: str = None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def _worker_loop(self):
+        while True:
+            try:
+                row = self._claim_next()
+            except sqlite3.Error as e:
+                print(f"Job queue error: {e}")
+                row = None
+
+            if row is None:
+                # Other processes may queue work too, so poll as well as waiting for a local submit
+                self._wakeup.wait(timeout=2)
+                self._wakeup.clear()
+                continue
+
+            job_id = row['id']
+            handler = self.handlers.get(row['kind'])
+            started = time.time()
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler registered for job kind '{row['kind']}'")
+                result = handler(json.loads(row['payload'] or '{}'))
+                self._finish(job_id, 'done', result=result)
+                print(f"Job {job_id[:8]} ({row['kind']}) done in {time.time() - started:.2f}s")
+            except Exception as e:
+                traceback.print_exc()
+                self._finish(job_id, 'failed', error=str(e))
+
+
+# Global instance
+job_queue = JobQueue()
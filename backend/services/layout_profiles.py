@@ -0,0 +1,199 @@
+"""
+Reusable table layout profiles for question banks.
+
+Most banks come from a handful of fixed templates. The first page of a bank
+is fingerprinted from its page size, the text of the question table's header
+row and the header cells' x positions. The first upload of a template stores
+a profile for it:
+
+    columns         column index per role (question, sl, marks, co, level, module)
+    header / header_row
+                    the normalized header cells and the row they sit in
+    table_settings  find_tables() settings tuned to the template's ruling
+
+Later uploads whose first page matches parse the remaining pages with the
+profile's table_settings and take the columns from it instead of
+re-discovering them by string matching on every table.
+
+Profiles live in one small JSON file (PARSER_LAYOUT_PROFILES; empty disables),
+replaced atomically (temp file + rename). It is only written when a profile is
+learned; a match is counted in memory, and the counts ("uses", "last_used")
+are folded into the file at most every PROFILE_USES_FLUSH_SECONDS.
+"""
+
+import os
+import copy
+import json
+import time
+import uuid
+import hashlib
+import threading
+from typing import Dict, Optional
+
+DEFAULT_PROFILES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'layout_profiles.json')
+
+# Column x positions are compared on this grid (points), so re-exports of a template still match
+FINGERPRINT_GRID = 2
+# Ruling shorter than this can never be a cell side of the template's tables; pdfplumber's
+# defaults keep every edge of 3pt and over (and prefilter at 1pt)
+MIN_EDGE_LENGTH = 3
+MAX_EDGE_LENGTH = 6
+# Matches are counted in memory and written to the file at most this often
+PROFILE_USES_FLUSH_SECONDS = int(os.getenv('PARSER_LAYOUT_PROFILES_FLUSH_SECONDS', '300'))
+
+EMPTY_COLUMNS = {"question": -1, "sl": -1, "marks": -1, "co": -1, "level": -1, "module": -1}
+
+
+def normalize_cell(cell) -> str:
+    return " ".join(str(cell).split()) if cell else ""
+
+
+def header_columns(row) -> Optional[Dict[str, int]]:
+    """Column index per role if row is a question table header, else None"""
+    row = [str(cell).strip() if cell else "" for cell in row]
+    if not (any("Question" in cell for cell in row) or any("Marks" in cell for cell in row)):
+        return None
+
+    columns = dict(EMPTY_COLUMNS)
+    for c_idx, cell in enumerate(row):
+        if "Question" in cell: columns["question"] = c_idx
+        if "SL" in cell or "Sl" in cell or "No" in cell: columns["sl"] = c_idx
+        if "Marks" in cell: columns["marks"] = c_idx
+        if "CO" in cell: columns["co"] = c_idx
+        if "Level" in cell or "RBT" in cell: columns["level"] = c_idx
+        if "Module" in cell: columns["module"] = c_idx
+    return columns
+
+
+def is_profile_header(row, profile: Dict) -> bool:
+    return [normalize_cell(cell) for cell in row] == profile["header"]
+
+
+def tuned_table_settings(tables) -> Dict:
+    """find_tables() settings that drop ruling fragments shorter than half the smallest cell"""
+    sides = [
+        min(cell[2] - cell[0], cell[3] - cell[1])
+        for table in tables for row in table.cell_bboxes for cell in row if cell
+    ]
+    edge_length = int(min(sides) / 2) if sides else MIN_EDGE_LENGTH
+    edge_length = max(MIN_EDGE_LENGTH, min(MAX_EDGE_LENGTH, edge_length))
+    return {"edge_min_length": edge_length, "edge_min_length_prefilter": edge_length}
+
+
+def fingerprint_page(page) -> Optional[Dict]:
+    """
+    Profile for a bank's first ParsedPage: fingerprint, columns, header and
+    table settings. None if the page has no question table header.
+    """
+    for table in page.tables:
+        for r_idx, row in enumerate(table.data):
+            columns = header_columns(row)
+            if columns is None:
+                continue
+            if columns["question"] == -1:
+                break
+
+            cells = table.cell_bboxes[r_idx] if r_idx < len(table.cell_bboxes) else []
+            header = [normalize_cell(cell) for cell in row]
+            key = {
+                "page": [round(page.width), round(page.height)],
+                "header": header,
+                "columns_x": [
+                    [round(cell[0] / FINGERPRINT_GRID), round(cell[2] / FINGERPRINT_GRID)] if cell else None
+                    for cell in cells
+                ]
+            }
+            return {
+                "fingerprint": hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16],
+                "columns": columns,
+                "header": header,
+                "header_row": r_idx,
+                "table_settings": tuned_table_settings(page.tables)
+            }
+    return None
+
+
+class LayoutProfileStore:
+    def __init__(self, path: str = None):
+        self.path = path if path is not None else os.getenv('PARSER_LAYOUT_PROFILES', DEFAULT_PROFILES_PATH)
+        self.enabled = bool(self.path)
+        self._lock = threading.Lock()
+        # The file as last read, keyed by its mtime so other processes' changes are picked up
+        self._profiles = {}
+        self._profiles_mtime = None
+        # Matches not written yet: fingerprint -> [uses, last_used]
+        self._pending_uses = {}
+        self._last_flush = time.time()
+
+    def _load(self) -> Dict:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime != self._profiles_mtime:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._profiles = json.load(f)
+                self._profiles_mtime = mtime
+            return self._profiles
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Could not read layout profiles {self.path}: {e}")
+            return {}
+
+    def _save(self, profiles: Dict):
+        # Write-then-rename so other processes never read a half-written file
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(profiles, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._profiles = profiles
+        self._profiles_mtime = os.stat(self.path).st_mtime_ns
+
+    def _save_with_uses(self, profiles: Dict):
+        """Saves profiles (a fresh copy of the file) with the pending match counts added"""
+        for fingerprint, (uses, last_used) in self._pending_uses.items():
+            if fingerprint in profiles:
+                profile = profiles[fingerprint]
+                profile["uses"] = profile.get("uses", 0) + uses
+                profile["last_used"] = max(profile.get("last_used", 0), last_used)
+        self._save(profiles)
+        self._pending_uses = {}
+        self._last_flush = time.time()
+
+    def match_or_learn(self, first_page) -> Optional[Dict]:
+        """
+        The stored profile matching a bank's first page, or None. An unknown
+        layout is stored so the next upload of the same template matches.
+        """
+        if not self.enabled:
+            return None
+        candidate = fingerprint_page(first_page)
+        if candidate is None:
+            return None
+
+        fingerprint = candidate["fingerprint"]
+        try:
+            with self._lock:
+                # Other worker processes may have learned profiles; _load() notices the file changed
+                profile = self._load().get(fingerprint)
+                now = time.time()
+                if profile is None:
+                    profiles = copy.deepcopy(self._load())
+                    profiles[fingerprint] = dict(candidate, created_at=now, last_used=now, uses=0)
+                    self._save_with_uses(profiles)
+                    print(f"Learned table layout profile {fingerprint}")
+                    return None
+
+                pending = self._pending_uses.setdefault(fingerprint, [0, now])
+                pending[0] += 1
+                pending[1] = now
+                if now - self._last_flush >= PROFILE_USES_FLUSH_SECONDS:
+                    self._save_with_uses(copy.deepcopy(self._load()))
+            print(f"Using table layout profile {fingerprint}")
+            return profile
+        except Exception as e:
+            print(f"Layout profile lookup failed: {e}")
+            return None
+
+
+# Global instance
+layout_profiles = LayoutProfileStore()
@@ -0,0 +1,132 @@
+"""
+Marks-bucketed selection of sub-question combinations.
+
+A main question is 2 or 3 questions of one module whose marks add up to the
+target (25 +/- 5). Rather than enumerating every combination of questions,
+the questions are grouped into buckets by marks and the search runs over the
+bucket values, of which a module has only a handful:
+
+    values 6, 8, 10  ->  (6, 8, 10), (8, 8, 8), (10, 10, 6), ... checked once each
+
+Each combination of values stands for comb(n, k) question combinations per
+value it repeats k times, so the number of question combinations behind it
+is known without listing them. A value combination is drawn with probability
+proportional to that count and its questions are then sampled from the
+buckets, which makes every question combination at the best distance from
+the target equally likely (the enumeration took the first of them in
+shuffled order, which favoured pairs over triples).
+
+Questions may carry a sampling "weight" (services/usage_weights.py favours
+rarely used ones). The count of a value then generalizes to the summed
+weight of its question combinations, the elementary symmetric polynomial
+e_k of the bucket's weights (comb(n, k) when every weight is 1), and the
+questions are drawn from the bucket by weighted sampling without
+replacement (weighted_sample). The value combination is drawn exactly in
+proportion to e_k, and a single question from a bucket exactly in
+proportion to its weight; several questions from one bucket are drawn one
+after another, so their combination is only approximately proportional to
+the product of their weights. Unweighted draws stay exactly uniform. Both
+are computed from the weights on the records, so a weighted draw costs about
+the same as an unweighted one.
+
+Building the buckets is linear in the questions; the search is polynomial in
+the number of distinct marks values only.
+"""
+
+import math
+import heapq
+import random
+import itertools
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional
+
+
+def marks_buckets(questions: Iterable[Dict], used_ids=()) -> Dict[int, List[Dict]]:
+    """Unused questions grouped by their (integer) marks"""
+    buckets = defaultdict(list)
+    for q in questions:
+        if q['firestore_id'] not in used_ids:
+            buckets[q['marks']].append(q)
+    return buckets
+
+
+def bucket_weight_table(bucket: List[Dict], max_size: int) -> List:
+    """Summed weight of the bucket's k-question combinations for k = 0..max_size (exact counts when unweighted)"""
+    weights = [q.get('weight', 1.0) for q in bucket]
+    if all(weight == 1.0 for weight in weights):
+        return [math.comb(len(weights), k) for k in range(max_size + 1)]
+    table = [1.0] + [0.0] * max_size
+    for weight in weights:
+        for k in range(max_size, 0, -1):
+            table[k] += table[k - 1] * weight
+    return table
+
+
+def combination_weight(tables: Dict[int, List], values) -> float:
+    """Summed weight of the question combinations with exactly these marks values"""
+    total = 1
+    for value, times in Counter(values).items():
+        table = tables.get(value)
+        total *= table[times] if table and times < len(table) else 0
+    return total
+
+
+def draw_weighted(options, rng=random):
+    """One item of [(item, weight), ...] with probability proportional to its weight"""
+    total = sum(weight for _, weight in options)
+    # Exact integer draw when unweighted: counts can exceed what float weights represent
+    pick = rng.randrange(total) if isinstance(total, int) else rng.random() * total
+    for item, weight in options:
+        if pick < weight:
+            return item
+        pick -= weight
+    return options[-1][0]
+
+
+def weighted_sample(questions: List[Dict], count: int, rng=random) -> List[Dict]:
+    """
+    count distinct questions, heavier ones more likely (Efraimidis-Spirakis:
+    each pick is in proportion to the weights of the questions not yet picked,
+    so a set of several is only approximately in proportion to the product of
+    its weights); a plain uniform sample when unweighted.
+    """
+    if all(q.get('weight', 1.0) == 1.0 for q in questions):
+        return rng.sample(questions, count)
+    return heapq.nlargest(count, questions, key=lambda q: rng.random() ** (1.0 / q.get('weight', 1.0)))
+
+
+def find_marks_combo(questions: Iterable[Dict], used_ids=(), target_marks=25, tolerance=5, sizes=(2, 3), rng=random) -> Optional[List[Dict]]:
+    """
+    A combination of unused questions whose marks total is as close to
+    target_marks as any (and within tolerance), chosen at random among those,
+    favouring heavier questions (about in proportion to the product of their
+    weights; exactly uniform when unweighted); None if there is none. Draws come from rng (a random.Random, for reproducible
+    picks) or the global generator.
+    """
+    buckets = marks_buckets(questions, used_ids)
+    values = sorted(buckets)
+    tables = {value: bucket_weight_table(buckets[value], max(sizes)) for value in values}
+
+    best_deviation = None
+    options = []    # (values, weight of their question combinations) at the best deviation so far
+    for size in sizes:
+        for value_combo in itertools.combinations_with_replacement(values, size):
+            deviation = abs(sum(value_combo) - target_marks)
+            if deviation > tolerance or (best_deviation is not None and deviation > best_deviation):
+                continue
+            weight = combination_weight(tables, value_combo)
+            if not weight:
+                continue
+            if best_deviation is None or deviation < best_deviation:
+                best_deviation, options = deviation, []
+            options.append((value_combo, weight))
+
+    if not options:
+        return None
+
+    value_combo = draw_weighted(options, rng)
+    combo = []
+    for value, times in Counter(value_combo).items():
+        combo.extend(weighted_sample(buckets[value], times, rng))
+    rng.shuffle(combo)
+    return combo
@@ -0,0 +1,239 @@
+"""
+Step-bounded constraint search for CIE papers.
+
+A paper layout lists, per main question, the module each part (a, b, c) is
+taken from:
+
+    CIE1: [[p, p, p], [p, p, p], [s, s, t], [s, s, t]]   (primary, secondary, tertiary module)
+
+solve_paper() fills the layout in one pass, meeting three targets:
+
+    marks    each main question totals MAIN_QUESTION_MARKS +/- MARKS_TOLERANCE (hard)
+    CO       every CO found in the layout's modules appears in the paper
+    Bloom's  the parts' levels follow BLOOMS_TARGET (shares of L1..L6)
+
+The search is a depth-first backtracking over main questions. Candidates for
+a main question are drawn at random from per-module marks buckets (so only
+combinations that meet the marks target are generated, and papers differ
+from call to call), ordered by how much they add to the penalty, and a branch
+is cut as soon as a lower bound of its penalty reaches the best paper found:
+
+    marks     deviation of the main questions already chosen
+    Bloom's   parts already over a level's target count
+    CO        COs still missing that the remaining parts cannot all cover
+
+The search is bounded by SOLVER_NODES steps (one step = one partial paper
+extended) and never by time, so with a seeded rng the same pool gives the
+same paper on any machine however busy it is; the best paper found is
+returned (a perfect one ends the search at once). Without any paper yet it
+may take up to four times as many steps. If no paper meets the marks target,
+the search runs again without it, so a paper comes back whenever there are
+enough questions.
+"""
+
+import os
+import math
+import time
+import random
+import itertools
+from collections import Counter
+from typing import Dict, List, Optional
+
+from services.marks_combos import bucket_weight_table, combination_weight, draw_weighted, marks_buckets, weighted_sample
+
+
+def parse_blooms_target(spec: str) -> Dict[str, float]:
+    """'L1:1,L2:3,L3:4,L4:2' -> shares of the parts per level"""
+    weights = {}
+    for item in spec.split(','):
+        if ':' in item:
+            level, weight = item.split(':', 1)
+            weights[normalize_level(level)] = float(weight)
+    total = sum(weights.values())
+    return {level: weight / total for level, weight in weights.items()} if total else {}
+
+
+def normalize_level(level) -> str:
+    """'L3', 'l 3', '3' -> 'L3'"""
+    digits = ''.join(ch for ch in str(level or '') if ch.isdigit())
+    return f"L{digits}" if digits else str(level or '').strip().upper()
+
+
+def normalize_co(co) -> str:
+    """'CO2', 'co 2' -> 'CO2'"""
+    return ''.join(str(co or '').split()).upper()
+
+
+# Steps of one paper's search (about 0.5s on a single core)
+SOLVER_NODES = int(os.getenv('CIE_SOLVER_NODES', '300'))
+MAIN_QUESTION_MARKS = int(os.getenv('CIE_MAIN_QUESTION_MARKS', '25'))
+MARKS_TOLERANCE = int(os.getenv('CIE_MARKS_TOLERANCE', '5'))
+BLOOMS_TARGET = parse_blooms_target(os.getenv('CIE_BLOOMS_TARGET', 'L1:1,L2:3,L3:4,L4:2'))
+# Random candidates drawn per main question at each step of the search
+CANDIDATES_PER_QUESTION = 40
+
+# Penalty weights: a missed CO counts as much as this many marks off target, etc.
+MARKS_WEIGHT = 1.0
+CO_WEIGHT = 4.0
+BLOOMS_WEIGHT = 1.5
+
+
+def first_unfillable(layout: List[List[str]], questions_by_module: Dict[str, List[Dict]]) -> Optional[int]:
+    """Index of the first main question the modules run out of questions for, or None"""
+    needed = Counter()
+    for index, parts in enumerate(layout):
+        needed.update(parts)
+        if any(needed[module] > len(questions_by_module.get(module, ())) for module in set(parts)):
+            return index
+    return None
+
+
+def level_counts(shares: Dict[str, float], parts: int) -> Dict[str, int]:
+    """Whole numbers of parts per level closest to the shares (largest remainder), so a paper can hit them exactly"""
+    exact = {level: share * parts for level, share in shares.items()}
+    counts = {level: int(value) for level, value in exact.items()}
+    by_remainder = sorted(exact, key=lambda level: exact[level] - counts[level], reverse=True)
+    for level in by_remainder[:max(0, parts - sum(counts.values()))]:
+        counts[level] += 1
+    return counts
+
+
+def draw_candidates(parts: List[str], questions_by_module, used_ids, target, tolerance, count, rng=random) -> List[List[Dict]]:
+    """
+    Up to count distinct random combinations of unused questions for one main
+    question (one per part, from the part's module), each within tolerance of
+    target marks (any total when tolerance is None). Questions with a lower
+    usage weight come up less often.
+    """
+    modules = list(dict.fromkeys(parts))
+    parts_per_module = Counter(parts)
+    buckets = {module: marks_buckets(questions_by_module.get(module, ()), used_ids) for module in modules}
+    tables = {
+        module: {value: bucket_weight_table(bucket, parts_per_module[module]) for value, bucket in buckets[module].items()}
+        for module in modules
+    }
+
+    # Marks values per module, combined across modules, weighted by the question combinations behind them
+    options = []
+    per_module_values = [
+        list(itertools.combinations_with_replacement(sorted(buckets[module]), parts_per_module[module]))
+        for module in modules
+    ]
+    for value_combos in itertools.product(*per_module_values):
+        total = sum(sum(values) for values in value_combos)
+        if tolerance is not None and abs(total - target) > tolerance:
+            continue
+        weight = 1
+        for module, values in zip(modules, value_combos):
+            weight *= combination_weight(tables[module], values)
+        if weight:
+            options.append((value_combos, weight))
+    if not options:
+        return []
+
+    candidates, seen = [], set()
+    # Distinct draws stop coming once the combinations run out; don't spin on them
+    for _ in range(count * 3):
+        if len(candidates) >= count:
+            break
+        value_combos = draw_weighted(options, rng)
+        chosen = {}
+        for module, values in zip(modules, value_combos):
+            chosen[module] = []
+            for value, times in Counter(values).items():
+                chosen[module].extend(weighted_sample(buckets[module][value], times, rng))
+            rng.shuffle(chosen[module])
+        key = frozenset(q['firestore_id'] for qs in chosen.values() for q in qs)
+        if key in seen:
+            continue
+        seen.add(key)
+        # Parts take their module's questions in layout order
+        candidates.append([chosen[module].pop() for module in parts])
+    return candidates
+
+
+class PaperSearch:
+    """One bounded search over a layout; run() returns the best paper found"""
+
+    def __init__(self, layout, questions_by_module, target=MAIN_QUESTION_MARKS, tolerance=MARKS_TOLERANCE,
+                 blooms_target=BLOOMS_TARGET, nodes=SOLVER_NODES, rng=random):
+        self.layout = layout
+        self.questions_by_module = questions_by_module
+        self.target = target
+        self.tolerance = tolerance
+        self.total_parts = sum(len(parts) for parts in layout)
+        self.blooms_target = level_counts(blooms_target, self.total_parts)
+        self.required_cos = {
+            normalize_co(q.get('co')) for module in set(itertools.chain(*layout))
+            for q in questions_by_module.get(module, ()) if normalize_co(q.get('co'))
+        }
+        self.nodes = nodes
+        self.rng = rng
+        self.steps = 0
+        self.best = None
+        self.best_penalty = math.inf
+
+    def penalty(self, marks_off, levels, cos, parts_left):
+        """Lower bound of the penalty of any paper completing this partial one (exact when complete)"""
+        missing_cos = len(self.required_cos - cos)
+        if parts_left:
+            over = sum(max(0, count - self.blooms_target.get(level, 0)) for level, count in levels.items())
+            missing_cos = max(0, missing_cos - parts_left)
+        else:
+            over = sum(abs(levels.get(level, 0) - self.blooms_target.get(level, 0))
+                       for level in set(levels) | set(self.blooms_target))
+        return MARKS_WEIGHT * marks_off + BLOOMS_WEIGHT * over + CO_WEIGHT * missing_cos
+
+    def run(self) -> Optional[List[List[Dict]]]:
+        self._search(0, [], set(), 0, Counter(), set(), self.total_parts)
+        return self.best
+
+    def _search(self, index, chosen, used_ids, marks_off, levels, cos, parts_left):
+        if index == len(self.layout):
+            penalty = self.penalty(marks_off, levels, cos, 0)
+            if penalty < self.best_penalty:
+                self.best, self.best_penalty = list(chosen), penalty
+            return
+
+        self.steps += 1
+        parts = self.layout[index]
+        scored = []
+        for combo in draw_candidates(parts, self.questions_by_module, used_ids, self.target, self.tolerance,
+                                     CANDIDATES_PER_QUESTION, self.rng):
+            combo_marks_off = marks_off + abs(sum(q['marks'] for q in combo) - self.target)
+            combo_levels = levels + Counter(normalize_level(q.get('blooms_level')) for q in combo)
+            combo_cos = cos | {normalize_co(q.get('co')) for q in combo}
+            bound = self.penalty(combo_marks_off, combo_levels, combo_cos, parts_left - len(parts))
+            scored.append((bound, combo, combo_marks_off, combo_levels, combo_cos))
+        scored.sort(key=lambda item: item[0])
+
+        for bound, combo, combo_marks_off, combo_levels, combo_cos in scored:
+            # A perfect paper can't be beaten; past the step budget only finish the first paper
+            if bound >= self.best_penalty or self.best_penalty == 0:
+                return
+            if self.steps >= 4 * self.nodes or (self.best is not None and self.steps >= self.nodes):
+                return
+            chosen.append(combo)
+            self._search(index + 1, chosen, used_ids | {q['firestore_id'] for q in combo},
+                         combo_marks_off, combo_levels, combo_cos, parts_left - len(parts))
+            chosen.pop()
+
+
+def solve_paper(layout: List[List[str]], questions_by_module: Dict[str, List[Dict]], **options) -> Optional[List[List[Dict]]]:
+    """
+    Questions for every part of the layout (a list per main question, in part
+    order) meeting the marks, CO and Bloom's targets as well as the search
+    finds in its step budget; None if the modules don't have enough questions.
+    Pass rng (a random.Random) for a reproducible paper.
+    """
+    if first_unfillable(layout, questions_by_module) is not None:
+        return None
+    start = time.monotonic()
+    search = PaperSearch(layout, questions_by_module, **options)
+    paper = search.run()
+    if paper is None:
+        print("No combination meets the marks target; searching without it")
+        search = PaperSearch(layout, questions_by_module, **dict(options, tolerance=None))
+        paper = search.run()
+    print(f"Paper search: penalty {search.best_penalty:.1f} in {search.steps} steps, {time.monotonic() - start:.2f}s")
+    return paper
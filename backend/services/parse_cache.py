@@ -0,0 +1,154 @@
+"""
+Content-addressed cache for parsed question banks.
+
+Entries are keyed by the SHA-256 of the uploaded file plus PARSER_VERSION, so
+re-uploading the same bank (by anyone) skips parsing entirely. Each entry
+stores the normalized question list and the image files it references:
+
+    <PARSE_CACHE_DIR>/<key>/questions.json
+    <PARSE_CACHE_DIR>/<key>/images/<filename>
+
+The cache is bounded by PARSE_CACHE_MAX_MB; the least recently used entries
+are evicted first (an entry's mtime is refreshed on every hit).
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import uuid
+from typing import Dict, List, Optional
+
+from services.image_store import render_variant_path
+
+# Bump whenever any parser's output changes, so stale entries are never served
+PARSER_VERSION = "3"
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'parse_cache')
+
+
+def file_sha256(filepath: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file in chunks so large banks are never read into memory at once"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or os.getenv('PARSE_CACHE_DIR', DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_bytes = int(os.getenv('PARSE_CACHE_MAX_MB', '256')) * 1024 * 1024
+        self.max_bytes = max_bytes
+        self.enabled = self.max_bytes > 0
+
+    def key_for_file(self, filepath: str, variant: str = '') -> str:
+        """Cache key for an uploaded file; variant separates route-specific normalizations"""
+        key_data = f"{file_sha256(filepath)}:{PARSER_VERSION}:{variant}"
+        return hashlib.sha256(key_data.encode()).hexdigest()
+
+    def get(self, key: str, images_folder: Optional[str] = None) -> Optional[List[Dict]]:
+        """Return cached questions (restoring their images into images_folder), or None"""
+        if not self.enabled:
+            return None
+
+        entry_dir = os.path.join(self.cache_dir, key)
+        questions_path = os.path.join(entry_dir, 'questions.json')
+        try:
+            with open(questions_path, 'r', encoding='utf-8') as f:
+                questions = json.load(f)
+
+            cached_images_dir = os.path.join(entry_dir, 'images')
+            if images_folder and os.path.isdir(cached_images_dir):
+                os.makedirs(images_folder, exist_ok=True)
+                for filename in os.listdir(cached_images_dir):
+                    target = os.path.join(images_folder, filename)
+                    if not os.path.exists(target):
+                        shutil.copyfile(os.path.join(cached_images_dir, filename), target)
+
+            # Mark as recently used
+            os.utime(entry_dir, None)
+            print(f"Parse cache hit: {key[:12]}")
+            return questions
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Parse cache read error for {key[:12]}: {e}")
+            return None
+
+    def put(self, key: str, questions: List[Dict], images_folder: Optional[str] = None) -> bool:
+        """Store parsed questions and the image files they reference"""
+        if not self.enabled:
+            return False
+
+        entry_dir = os.path.join(self.cache_dir, key)
+        if os.path.isdir(entry_dir):
+            return True
+
+        # Build the entry in a temp dir and rename it into place, so readers never see a partial entry
+        tmp_dir = os.path.join(self.cache_dir, f".tmp_{uuid.uuid4().hex}")
+        try:
+            os.makedirs(os.path.join(tmp_dir, 'images'))
+            with open(os.path.join(tmp_dir, 'questions.json'), 'w', encoding='utf-8') as f:
+                json.dump(questions, f)
+
+            if images_folder:
+                for q in questions:
+                    for img in q.get('images', []) or []:
+                        filename = os.path.basename(str(img).replace('\\', '/'))
+                        source = os.path.join(images_folder, filename)
+                        if os.path.isfile(source):
+                            shutil.copyfile(source, os.path.join(tmp_dir, 'images', filename))
+                        # Keep the render-sized derivative with its original
+                        variant = render_variant_path(source)
+                        if os.path.isfile(variant):
+                            shutil.copyfile(variant, os.path.join(tmp_dir, 'images', os.path.basename(variant)))
+
+            try:
+                os.rename(tmp_dir, entry_dir)
+            except OSError:
+                # Another request cached the same file first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+            self._evict()
+            return True
+        except Exception as e:
+            print(f"Parse cache write error for {key[:12]}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+    def _entry_size(self, entry_dir: str) -> int:
+        total = 0
+        for root, _, files in os.walk(entry_dir):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if name.startswith('.tmp_') or not os.path.isdir(entry_dir):
+                continue
+            size = self._entry_size(entry_dir)
+            entries.append((os.path.getmtime(entry_dir), size, entry_dir))
+            total += size
+
+        entries.sort()
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            print(f"Parse cache evicted: {os.path.basename(entry_dir)[:12]}")
+
+
+# Global instance
+parse_cache = ParseCache()
@@ -0,0 +1,422 @@
+"""
+Parse-once document model for PDF question banks.
+
+A PDF is opened once with pdfplumber (chars, tables, text) and once with
+PyMuPDF (image rects and bytes). Every parsing strategy - the AdvancedParser
+and the legacy fallbacks in parsing_service - then reads from the in-memory
+ParsedDocument instead of reopening the file and re-running table detection.
+
+Very large banks get a StreamedDocument instead (bounded-memory mode): the
+same interface, but pages are parsed from the file as they are iterated and
+released as soon as the caller moves on.
+"""
+
+import os
+import math
+import hashlib
+import itertools
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+
+from services.char_index import PageChars
+from services.layout_profiles import layout_profiles
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# Page-level parallelism when building a document (set PARSER_WORKERS=1 to force serial parsing)
+PARSER_WORKERS = int(os.getenv('PARSER_WORKERS', os.cpu_count() or 1))
+# Small banks are cheaper to parse inline than to start a process pool for
+PARALLEL_MIN_PAGES = int(os.getenv('PARSER_PARALLEL_MIN_PAGES', '4'))
+# An image xref placed on this many pages is treated as page furniture (logo, header) and skipped
+FURNITURE_MIN_PAGES = int(os.getenv('PARSER_FURNITURE_MIN_PAGES', '3'))
+# Banks with at least this many pages are parsed in bounded-memory mode (0 = never)
+BOUNDED_MEMORY_MIN_PAGES = int(os.getenv('PARSER_BOUNDED_MEMORY_MIN_PAGES', '40'))
+# Pages per process-pool task in bounded-memory mode
+BOUNDED_CHUNK_PAGES = 4
+# Inline parsing in bounded-memory mode reopens the PDF after this many pages; pdfminer
+# keeps every decoded font and stream of an open document
+BOUNDED_REOPEN_PAGES = 25
+
+# Passed as profile to have the bank's first page matched against the stored layout profiles
+MATCH_LAYOUT = object()
+
+# Char attributes kept per page; enough for pdfplumber's text reassembly utilities
+CHAR_KEYS = (
+    'text', 'fontname', 'size', 'adv', 'upright', 'matrix', 'object_type', 'page_number',
+    'x0', 'x1', 'y0', 'y1', 'top', 'bottom', 'doctop', 'width', 'height'
+)
+
+
+class ParsedTable:
+    """A table found by pdfplumber's find_tables(), reduced to plain data."""
+
+    def __init__(self, bbox, data, row_bboxes, cell_bboxes):
+        self.bbox = bbox                # (x0, top, x1, bottom)
+        self.data = data                # table.extract() rows
+        self.row_bboxes = row_bboxes    # one bbox (or None) per row
+        self.cell_bboxes = cell_bboxes  # per row, one bbox (or None) per cell
+
+
+class ParsedPage:
+    """Everything the parsing strategies need from one PDF page."""
+
+    def __init__(self, page_number, width, height, text, chars, tables, images=None):
+        self.page_number = page_number  # 1-based
+        self.width = width
+        self.height = height
+        self.text = text
+        self.chars = chars
+        self.tables = tables
+        self.images = images or []      # [{'xref', 'index', 'bbox', 'ext', 'data', 'sha256', 'furniture'}]
+        self.layout_profile = None      # the bank's matched layout profile, if any
+        self._char_index = None
+
+    @property
+    def char_index(self):
+        """NumPy view of the page's chars, built on first use."""
+        if self._char_index is None:
+            self._char_index = PageChars(self.chars)
+        return self._char_index
+
+    @property
+    def table_data(self):
+        """Equivalent of page.extract_tables() with default settings."""
+        return [table.data for table in self.tables]
+
+
+class ParsedDocument:
+    """In-memory model of a PDF, built once per upload."""
+
+    def __init__(self, path, pages):
+        self.path = path
+        self.pages = pages
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __iter__(self):
+        return iter(self.pages)
+
+    @classmethod
+    def load(cls, pdf_path, workers=None, with_images=True, bounded=None):
+        """
+        Builds the document, laying out pages in a process pool for large banks.
+        Banks of BOUNDED_MEMORY_MIN_PAGES pages or more (or bounded=True) get a
+        StreamedDocument instead.
+        """
+        page_count = pdf_page_count(pdf_path)
+        if bounded is None:
+            bounded = use_bounded_memory(page_count)
+        if bounded:
+            return StreamedDocument(pdf_path, page_count, workers, with_images)
+        return cls(pdf_path, list(iter_document_pages(pdf_path, workers, with_images, bounded=False)))
+
+    @classmethod
+    def load_images(cls, pdf_path):
+        """Builds an image-only document (no text or tables) with PyMuPDF."""
+        pages = []
+        if fitz is not None:
+            doc = fitz.open(pdf_path)
+            pages = [ParsedPage(i + 1, page.rect.width, page.rect.height, "", [], []) for i, page in enumerate(doc)]
+            doc.close()
+        attach_page_images(pdf_path, pages)
+        return cls(pdf_path, pages)
+
+
+class StreamedDocument:
+    """
+    Bounded-memory stand-in for ParsedDocument. Nothing is kept between
+    pages: every iteration parses the pages from the file again, releasing
+    each one (pdfplumber caches, chars, image bytes) once the caller moves
+    on, so memory stays flat however many pages the bank has.
+    """
+
+    def __init__(self, path, page_count, workers=None, with_images=True):
+        self.path = path
+        self.page_count = page_count
+        self.workers = workers
+        self.with_images = with_images
+        # Matched on the first iteration only, so every iteration parses with the same table settings
+        self.layout_profile = MATCH_LAYOUT
+
+    def __len__(self):
+        return self.page_count
+
+    def __iter__(self):
+        for page in iter_document_pages(self.path, self.workers, self.with_images, bounded=True,
+                                        profile=self.layout_profile):
+            if self.layout_profile is MATCH_LAYOUT:
+                self.layout_profile = page.layout_profile
+            yield page
+
+
+def pdf_page_count(pdf_path):
+    """Number of pages, without laying any of them out."""
+    if fitz is not None:
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def use_bounded_memory(page_count):
+    return bool(BOUNDED_MEMORY_MIN_PAGES) and page_count >= BOUNDED_MEMORY_MIN_PAGES
+
+
+def parse_page(page, page_number, table_settings=None):
+    """
+    Runs the expensive pdfplumber work for a single page: find_tables(),
+    extract() and extract_text(). Returns a ParsedPage that can be sent back
+    from a worker process.
+
+    table_settings come from a matched layout profile; if they find no table
+    at all the page is re-checked with the defaults.
+    """
+    found_tables = page.find_tables(table_settings) if table_settings else page.find_tables()
+    if table_settings and not found_tables:
+        found_tables = page.find_tables()
+
+    tables = []
+    for table in found_tables:
+        row_bboxes = []
+        cell_bboxes = []
+        for row_obj in table.rows:
+            try:
+                row_bboxes.append(tuple(row_obj.bbox)) # (x0, top, x1, bottom)
+            except Exception:
+                row_bboxes.append(None)
+            cell_bboxes.append([tuple(cell) if cell else None for cell in getattr(row_obj, 'cells', [])])
+
+        tables.append(ParsedTable(tuple(table.bbox), table.extract(), row_bboxes, cell_bboxes))
+
+    chars = [{key: char[key] for key in CHAR_KEYS if key in char} for char in page.chars]
+
+    return ParsedPage(
+        page_number=page_number,
+        width=page.width,
+        height=page.height,
+        text=page.extract_text() or "",
+        chars=chars,
+        tables=tables
+    )
+
+
+def parse_and_release(pdf, index, table_settings=None):
+    """parse_page() for pdf.pages[index], then drops pdfplumber's caches for that page."""
+    pdf_page = pdf.pages[index]
+    try:
+        return parse_page(pdf_page, index + 1, table_settings)
+    finally:
+        pdf_page.close()
+
+
+def _parse_pages(pdf_path, page_indices, table_settings=None):
+    """Process-pool entry point: parses a contiguous run of pages."""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [parse_and_release(pdf, i, table_settings) for i in page_indices]
+
+
+def iter_pages_inline(pdf_path, page_indices, table_settings=None, reopen_every=None):
+    """
+    parse_and_release() for each page index, in order. With reopen_every the
+    PDF is reopened every that many pages, dropping pdfminer's document caches.
+    """
+    page_indices = list(page_indices)
+    step = reopen_every or max(1, len(page_indices))
+    for start in range(0, len(page_indices), step):
+        with pdfplumber.open(pdf_path) as pdf:
+            for i in page_indices[start:start + step]:
+                yield parse_and_release(pdf, i, table_settings)
+
+
+def iter_parsed_pages(pdf_path, workers=None, bounded=False, profile=MATCH_LAYOUT):
+    """
+    Yields ParsedPages in page order. With more than one worker and a bank of
+    at least PARALLEL_MIN_PAGES pages, pages are parsed in a process pool;
+    otherwise (or if the pool cannot be started) pages are processed inline.
+
+    The first page is always parsed inline: it identifies the bank's layout
+    profile, whose table settings are then used for the remaining pages.
+    A profile already matched for the bank (or None) can be passed instead.
+
+    In bounded-memory mode the pool gets small chunks and at most two per
+    worker are in flight, so parsed pages never pile up ahead of the caller;
+    inline parsing reopens the PDF every BOUNDED_REOPEN_PAGES pages.
+    """
+    workers = PARSER_WORKERS if workers is None else workers
+
+    with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+        if not page_count:
+            return
+        first_page = parse_and_release(pdf, 0)
+    if profile is MATCH_LAYOUT:
+        profile = layout_profiles.match_or_learn(first_page)
+    table_settings = profile["table_settings"] if profile else None
+    first_page.layout_profile = profile
+    reopen_every = BOUNDED_REOPEN_PAGES if bounded else None
+
+    if workers <= 1 or page_count < max(2, PARALLEL_MIN_PAGES):
+        yield first_page
+        for page in iter_pages_inline(pdf_path, range(1, page_count), table_settings, reopen_every):
+            page.layout_profile = profile
+            yield page
+        return
+
+    workers = min(workers, page_count - 1)
+    # Contiguous chunks keep each worker's pdfplumber document warm
+    chunk_size = BOUNDED_CHUNK_PAGES if bounded else max(1, math.ceil((page_count - 1) / (workers * 2)))
+    chunks = [list(range(s, min(s + chunk_size, page_count))) for s in range(1, page_count, chunk_size)]
+    max_in_flight = workers * 2 if bounded else len(chunks)
+
+    parsed_count = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Chunks are handed back in page order as soon as each one is ready
+            queued = iter(chunks)
+            in_flight = deque(
+                executor.submit(_parse_pages, pdf_path, chunk, table_settings)
+                for chunk in itertools.islice(queued, max_in_flight)
+            )
+            parsed_count += 1
+            yield first_page
+            while in_flight:
+                pages = in_flight.popleft().result()
+                for chunk in itertools.islice(queued, 1):
+                    in_flight.append(executor.submit(_parse_pages, pdf_path, chunk, table_settings))
+                for page in pages:
+                    page.layout_profile = profile
+                    parsed_count += 1
+                    yield page
+    except (BrokenProcessPool, OSError) as e:
+        print(f"Parallel page parsing unavailable ({e}), continuing with serial parsing.")
+        if not parsed_count:
+            parsed_count += 1
+            yield first_page
+        for page in iter_pages_inline(pdf_path, range(parsed_count, page_count), table_settings, reopen_every):
+            page.layout_profile = profile
+            yield page
+        return
+
+    print(f"Parsed {page_count} pages with {workers} worker processes")
+
+
+def iter_document_pages(pdf_path, workers=None, with_images=True, bounded=None, profile=MATCH_LAYOUT):
+    """
+    Yields ParsedPages in page order with their images attached, so callers
+    can start working on the first page before the last one is parsed.
+    bounded=None picks bounded-memory mode from the bank's page count.
+    """
+    if bounded is None:
+        bounded = use_bounded_memory(pdf_page_count(pdf_path))
+    if not with_images or fitz is None:
+        yield from iter_parsed_pages(pdf_path, workers, bounded, profile)
+        return
+
+    doc = fitz.open(pdf_path)
+    try:
+        reader = PageImageReader(doc, bounded)
+        for page in iter_parsed_pages(pdf_path, workers, bounded, profile):
+            page.images = reader.read(page.page_number)
+            yield page
+    finally:
+        doc.close()
+
+
+def find_furniture_xrefs(doc, min_pages=None):
+    """
+    Image xrefs placed on at least min_pages pages: logos, headers and other
+    page furniture rather than question content. Only reads the page image
+    lists; nothing is decoded.
+    """
+    min_pages = FURNITURE_MIN_PAGES if min_pages is None else min_pages
+    if min_pages <= 1 or len(doc) < min_pages:
+        return set()
+    counts = Counter()
+    for fitz_page in doc:
+        counts.update({img[0] for img in fitz_page.get_images(full=True)})
+    return {xref for xref, count in counts.items() if count >= min_pages}
+
+
+class PageImageReader:
+    """
+    Reads page images from one open PyMuPDF document. Each xref is extracted
+    and hashed once, however many pages show it; images whose xref is page
+    furniture are flagged so they can be skipped. In bounded-memory mode only
+    furniture stays cached across pages.
+    """
+
+    def __init__(self, doc, bounded=False):
+        self.doc = doc
+        self.bounded = bounded
+        self.furniture_xrefs = find_furniture_xrefs(doc)
+        self._by_xref = {}
+
+    def _extract(self, xref):
+        if xref not in self._by_xref:
+            base_image = self.doc.extract_image(xref)
+            self._by_xref[xref] = (
+                base_image["ext"],
+                base_image["image"],
+                hashlib.sha256(base_image["image"]).hexdigest()
+            )
+        return self._by_xref[xref]
+
+    def read(self, page_number):
+        """Image bytes, content hash and on-page rect for each image on a (1-based) page."""
+        if self.bounded:
+            self._by_xref = {xref: image for xref, image in self._by_xref.items() if xref in self.furniture_xrefs}
+        fitz_page = self.doc[page_number - 1]
+        images = []
+        for img_index, img in enumerate(fitz_page.get_images(full=True)):
+            xref = img[0]
+            ext, data, sha = self._extract(xref)
+
+            # Get bounding box(es) of the image on the page
+            # An image can appear multiple times, we'll take the first occurrence for now
+            rects = fitz_page.get_image_rects(xref)
+            bbox = rects[0] if rects else fitz.Rect(0, 0, 0, 0)
+
+            images.append({
+                "xref": xref,
+                "index": img_index + 1,
+                "bbox": (bbox.x0, bbox.y0, bbox.x1, bbox.y1), # (left, top, right, bottom)
+                "ext": ext,
+                "data": data,
+                "sha256": sha,
+                "furniture": xref in self.furniture_xrefs
+            })
+        if self.bounded:
+            # MuPDF keeps decoded page resources in a process-wide store until it is full
+            fitz.TOOLS.store_shrink(100)
+        return images
+
+
+def attach_page_images(pdf_path, pages):
+    """Reads image bytes and on-page rects with PyMuPDF and attaches them to the pages."""
+    if fitz is None:
+        return pages
+
+    doc = fitz.open(pdf_path)
+    try:
+        reader = PageImageReader(doc)
+        for page in pages:
+            page.images = reader.read(page.page_number)
+    finally:
+        doc.close()
+    return pages
+
+
+def load_parsed_document(pdf_path, workers=None):
+    """Builds a ParsedDocument, returning None if the PDF cannot be read."""
+    try:
+        return ParsedDocument.load(pdf_path, workers)
+    except Exception as e:
+        print(f"Could not build parsed document for {pdf_path}: {e}")
+        return None
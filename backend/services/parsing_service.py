@@ -1,71 +1,95 @@
-import pdfplumber
+import os
 import docx
 import traceback
 import re
-from services.formatting_service import clean_text, extract_marks_from_text, format_question_with_tables, extract_table_as_text
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from lxml import etree
+from services.formatting_service import clean_text, extract_marks_from_text, split_question_tables, extract_table_as_text
+from services.question_tables import make_table
+from services.parsed_document import ParsedDocument, PARSER_WORKERS, load_parsed_document
+from services.parse_cache import parse_cache
+from services.docx_tables import iter_table_rows, UnsupportedDocx
 
-def parse_pdf_question_bank(filepath):
+DOCX_HEADER_WORDS = ['q.no', 'question', 'co', 'level', 'marks', 'module', 'sl', 's.no']
+
+# Module files of a CIE upload parsed at the same time (1 = one after another)
+CIE_PARSE_WORKERS = int(os.getenv('CIE_PARSE_WORKERS', '3'))
+
+# Question numbering at the start of a line: 'Q.1' / 'Q1', 'Question 1:' or '1.' (not '1.5')
+QUESTION_START_PATTERN = re.compile(
+    r'^\s*(?:Q\.?\s*(?P<q>\d+)\.?|Question\s*(?P<question>\d+)[:.]?|(?P<number>\d+)\.(?!\d))\s*(?P<text>.*)$',
+    re.IGNORECASE
+)
+STYLE_Q, STYLE_QUESTION, STYLE_NUMBER = 0, 1, 2
+CO_PATTERN = re.compile(r'CO\s*(\d+)', re.IGNORECASE)
+LEVEL_PATTERN = re.compile(r'L\s*(\d+)', re.IGNORECASE)
+
+def parse_pdf_question_bank(filepath, document=None):
     """
     Parses a PDF question bank, attempting to extract questions from tables.
     Assumes a table structure for questions (SL#, Question, CO, Level, Marks).
     Math equations will be extracted as raw text.
+    Reads tables from the shared ParsedDocument when one is given.
     """
     extracted_questions = []
     
     try:
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables() 
-                
-                for table in tables:
-                    for row_index, row in enumerate(table):
-                        if row_index == 0: # Skip header row
-                            continue
-                        
-                        if len(row) >= 6:
-                            # Handle 6-column format: Q.No, Questions, CO, Level, Marks, Module
-                            sl_no = clean_text(row[0])
-                            question_text = clean_text(row[1])
-                            co = clean_text(row[2])
-                            blooms_level = clean_text(row[3])
-                            marks_text = clean_text(row[4])
-                            module = clean_text(row[5])
+        if document is None:
+            document = ParsedDocument.load(filepath, with_images=False)
+        for page in document:
+            tables = page.table_data
+            
+            for table in tables:
+                for row_index, row in enumerate(table):
+                    if row_index == 0: # Skip header row
+                        continue
+                    
+                    if len(row) >= 6:
+                        # Handle 6-column format: Q.No, Questions, CO, Level, Marks, Module
+                        sl_no = clean_text(row[0])
+                        question_text = clean_text(row[1])
+                        co = clean_text(row[2])
+                        blooms_level = clean_text(row[3])
+                        marks_text = clean_text(row[4])
+                        module = clean_text(row[5])
 
-                            # Use enhanced marks extraction
-                            marks = extract_marks_from_text(marks_text)
+                        # Use enhanced marks extraction
+                        marks = extract_marks_from_text(marks_text)
 
-                            if question_text:
-                                extracted_questions.append({
-                                    "sl_no": sl_no,
-                                    "question_text": question_text,
-                                    "co": co,
-                                    "blooms_level": blooms_level,
-                                    "marks": marks,
-                                    "module": module
-                                })
-                        elif len(row) >= 5:
-                            # Handle 5-column format (legacy): Q.No, Questions, CO, Level, Marks
-                            sl_no = clean_text(row[0])
-                            question_text = clean_text(row[1])
-                            co = clean_text(row[2])
-                            blooms_level = clean_text(row[3])
-                            marks_text = clean_text(row[4])
+                        if question_text:
+                            extracted_questions.append({
+                                "sl_no": sl_no,
+                                "question_text": question_text,
+                                "co": co,
+                                "blooms_level": blooms_level,
+                                "marks": marks,
+                                "module": module
+                            })
+                    elif len(row) >= 5:
+                        # Handle 5-column format (legacy): Q.No, Questions, CO, Level, Marks
+                        sl_no = clean_text(row[0])
+                        question_text = clean_text(row[1])
+                        co = clean_text(row[2])
+                        blooms_level = clean_text(row[3])
+                        marks_text = clean_text(row[4])
 
-                            # Use enhanced marks extraction
-                            marks = extract_marks_from_text(marks_text)
+                        # Use enhanced marks extraction
+                        marks = extract_marks_from_text(marks_text)
 
-                            if question_text:
-                                extracted_questions.append({
-                                    "sl_no": sl_no,
-                                    "question_text": question_text,
-                                    "co": co,
-                                    "blooms_level": blooms_level,
-                                    "marks": marks,
-                                    "module": "1"  # Default to module 1 for legacy format
-                                })
-                        else:
-                            # print(f"Skipping malformed PDF row due to insufficient columns: {row}") # Debugging
-                            pass
+                        if question_text:
+                            extracted_questions.append({
+                                "sl_no": sl_no,
+                                "question_text": question_text,
+                                "co": co,
+                                "blooms_level": blooms_level,
+                                "marks": marks,
+                                "module": "1"  # Default to module 1 for legacy format
+                            })
+                    else:
+                        # print(f"Skipping malformed PDF row due to insufficient columns: {row}") # Debugging
+                        pass
     except Exception as e:
         print(f"Error during PDF parsing of {filepath}: {e}")
         traceback.print_exc() # Print full traceback for debugging
@@ -78,127 +102,149 @@ def parse_docx_question_bank(filepath):
     Parses a DOCX question bank, attempting to extract questions from tables.
     Assumes a table structure similar to PDF (SL#, Question, CO, Level, Marks).
     Math equations will be extracted as raw text.
+    Rows are streamed from the document XML; documents the streaming reader
+    cannot handle are read with python-docx instead.
     """
-    extracted_questions = []
     try:
-        doc = docx.Document(filepath)
+        try:
+            return questions_from_docx_rows(iter_table_rows(filepath))
+        except (UnsupportedDocx, KeyError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+            print(f"Streaming DOCX reader could not read {filepath} ({e}), falling back to python-docx")
+        return questions_from_docx_rows(iter_python_docx_rows(filepath))
+    except Exception as e:
+        print(f"Error during DOCX parsing of {filepath}: {e}")
+        traceback.print_exc() # Print full traceback for debugging
+        raise # Re-raise to be caught by the route's error handling
 
-        for table in doc.tables:
-            for row_index, row in enumerate(table.rows):
-                cells = [clean_text(cell.text) for cell in row.cells]
-                
-                # Skip empty rows
-                if not any(cells):
-                    continue
-                
-                # Check if this is a header row (contains common header words)
-                header_words = ['q.no', 'question', 'co', 'level', 'marks', 'module', 'sl', 's.no']
-                is_header = any(word in ' '.join(cells).lower() for word in header_words)
-                
-                if is_header and row_index == 0:
-                    continue  # Skip header row
-                
-                if len(cells) >= 6:
-                    # Handle 6-column format: Q.No, Questions, CO, Level, Marks, Module
-                    sl_no = cells[0] if cells[0].strip() else f"Q{len(extracted_questions) + 1}"
-                    question_text = cells[1]
-                    co = cells[2]
-                    blooms_level = cells[3]
-                    marks_text = cells[4]
-                    module = cells[5]
+def iter_python_docx_rows(filepath):
+    """Yields (row_index, cell texts) for each table row, read through python-docx"""
+    doc = docx.Document(filepath)
+    for table in doc.tables:
+        for row_index, row in enumerate(table.rows):
+            yield row_index, [cell.text for cell in row.cells]
 
-                    # Extract marks using the helper function
-                    marks = extract_marks_from_text(marks_text)
+def questions_from_docx_rows(rows):
+    """Builds question records from (row_index, cell texts) table rows"""
+    extracted_questions = []
+    for row_index, cells in rows:
+        cells = [clean_text(cell) for cell in cells]
+        
+        # Skip empty rows
+        if not any(cells):
+            continue
+        
+        # Skip the header row (first row containing common header words)
+        if row_index == 0:
+            row_text = ' '.join(cells).lower()
+            if any(word in row_text for word in DOCX_HEADER_WORDS):
+                continue
+        
+        if len(cells) >= 6:
+            # Handle 6-column format: Q.No, Questions, CO, Level, Marks, Module
+            sl_no = cells[0] if cells[0].strip() else f"Q{len(extracted_questions) + 1}"
+            question_text = cells[1]
+            co = cells[2]
+            blooms_level = cells[3]
+            marks_text = cells[4]
+            module = cells[5]
 
-                    if question_text and question_text.strip():
-                        extracted_questions.append({
-                            "sl_no": sl_no,
-                            "question_text": format_question_with_tables(question_text),
-                            "co": co,
-                            "blooms_level": blooms_level,
-                            "marks": marks,
-                            "module": module
-                        })
-                elif len(cells) >= 5:
-                    # Handle 5-column format: SL#, Questions, CO, Level, Marks
-                    sl_no = cells[0] if cells[0].strip() else f"Q{len(extracted_questions) + 1}"
-                    question_text = cells[1]
-                    co = cells[2]
-                    blooms_level = cells[3]
-                    marks_text = cells[4]
+            # Extract marks using the helper function
+            marks = extract_marks_from_text(marks_text)
 
-                    # Extract marks using the helper function
-                    marks = extract_marks_from_text(marks_text)
+            if question_text and question_text.strip():
+                question_text, tables = split_question_tables(question_text)
+                extracted_questions.append({
+                    "sl_no": sl_no,
+                    "question_text": question_text,
+                    "tables": tables,
+                    "co": co,
+                    "blooms_level": blooms_level,
+                    "marks": marks,
+                    "module": module
+                })
+        elif len(cells) >= 5:
+            # Handle 5-column format: SL#, Questions, CO, Level, Marks
+            sl_no = cells[0] if cells[0].strip() else f"Q{len(extracted_questions) + 1}"
+            question_text = cells[1]
+            co = cells[2]
+            blooms_level = cells[3]
+            marks_text = cells[4]
 
-                    if question_text and question_text.strip():
-                        extracted_questions.append({
-                            "sl_no": sl_no,
-                            "question_text": format_question_with_tables(question_text),
-                            "co": co,
-                            "blooms_level": blooms_level,
-                            "marks": marks,
-                            "module": "1"  # Default to module 1 for legacy format
-                        })
-                elif len(cells) >= 4:
-                    # Handle 4-column format: Q.No, Questions, CO, Level (no marks)
-                    sl_no = cells[0] if cells[0].strip() else f"Q{len(extracted_questions) + 1}"
-                    question_text = cells[1]
-                    co = cells[2]
-                    blooms_level = cells[3]
+            # Extract marks using the helper function
+            marks = extract_marks_from_text(marks_text)
 
-                    if question_text and question_text.strip():
-                        extracted_questions.append({
-                            "sl_no": sl_no,
-                            "question_text": format_question_with_tables(question_text),
-                            "co": co,
-                            "blooms_level": blooms_level,
-                            "marks": 0,  # Default marks
-                            "module": "1"  # Default module
-                        })
-    except Exception as e:
-        print(f"Error during DOCX parsing of {filepath}: {e}")
-        traceback.print_exc() # Print full traceback for debugging
-        raise # Re-raise to be caught by the route's error handling
+            if question_text and question_text.strip():
+                question_text, tables = split_question_tables(question_text)
+                extracted_questions.append({
+                    "sl_no": sl_no,
+                    "question_text": question_text,
+                    "tables": tables,
+                    "co": co,
+                    "blooms_level": blooms_level,
+                    "marks": marks,
+                    "module": "1"  # Default to module 1 for legacy format
+                })
+        elif len(cells) >= 4:
+            # Handle 4-column format: Q.No, Questions, CO, Level (no marks)
+            sl_no = cells[0] if cells[0].strip() else f"Q{len(extracted_questions) + 1}"
+            question_text = cells[1]
+            co = cells[2]
+            blooms_level = cells[3]
+
+            if question_text and question_text.strip():
+                question_text, tables = split_question_tables(question_text)
+                extracted_questions.append({
+                    "sl_no": sl_no,
+                    "question_text": question_text,
+                    "tables": tables,
+                    "co": co,
+                    "blooms_level": blooms_level,
+                    "marks": 0,  # Default marks
+                    "module": "1"  # Default module
+                })
     return extracted_questions
 
-def parse_pdf_with_embedded_tables(filepath):
+def parse_pdf_with_embedded_tables(filepath, document=None):
     """
     Universal PDF parser that can handle any type of question bank format.
     This function uses multiple strategies to extract questions from various PDF structures.
+    Reads tables and text from the shared ParsedDocument when one is given.
     """
     extracted_questions = []
     
     # Check if file exists
     import os
-    if not os.path.exists(filepath):
+    if document is None and not os.path.exists(filepath):
         print(f"Error: File not found: {filepath}")
         return extracted_questions
     
     try:
-        with pdfplumber.open(filepath) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                # Extract all tables from the page
-                tables = page.extract_tables()
-                page_text = page.extract_text() or ""
-                
-                print(f"Page {page_num + 1}: Found {len(tables)} tables and {len(page_text)} characters of text")
-                
-                # Strategy 1: Process structured question bank tables
-                structured_questions = process_structured_tables(tables, page_num + 1)
-                extracted_questions.extend(structured_questions)
-                
-                # Strategy 2: Extract questions from plain text (fallback)
-                text_questions = extract_questions_from_plain_text(page_text)
-                print(f"Extracted {len(text_questions)} questions from plain text")
-                
-                # Remove duplicates from text questions (in case they were already extracted from tables)
-                existing_sl_nos = {q.get('sl_no', '') for q in extracted_questions}
-                unique_text_questions = [q for q in text_questions if q.get('sl_no', '') not in existing_sl_nos]
-                extracted_questions.extend(unique_text_questions)
-                
-                # Strategy 3: Process embedded tables as potential questions
-                embedded_questions = process_embedded_tables(tables, page_text, page_num + 1)
-                extracted_questions.extend(embedded_questions)
+        if document is None:
+            document = ParsedDocument.load(filepath, with_images=False)
+        for page in document:
+            page_num = page.page_number - 1
+            # All tables and text were extracted once when the document was built
+            tables = page.table_data
+            page_text = page.text
+            
+            print(f"Page {page_num + 1}: Found {len(tables)} tables and {len(page_text)} characters of text")
+            
+            # Strategy 1: Process structured question bank tables
+            structured_questions = process_structured_tables(tables, page_num + 1)
+            extracted_questions.extend(structured_questions)
+            
+            # Strategy 2: Extract questions from plain text (fallback)
+            text_questions = extract_questions_from_plain_text(page_text)
+            print(f"Extracted {len(text_questions)} questions from plain text")
+            
+            # Remove duplicates from text questions (in case they were already extracted from tables)
+            existing_sl_nos = {q.get('sl_no', '') for q in extracted_questions}
+            unique_text_questions = [q for q in text_questions if q.get('sl_no', '') not in existing_sl_nos]
+            extracted_questions.extend(unique_text_questions)
+            
+            # Strategy 3: Process embedded tables as potential questions
+            embedded_questions = process_embedded_tables(tables, page_text, page_num + 1)
+            extracted_questions.extend(embedded_questions)
     
     except Exception as e:
         print(f"Error parsing PDF with embedded tables: {e}")
@@ -292,12 +338,13 @@ def extract_question_from_row(row):
     marks = extract_marks_from_text(marks_text)
 
     if question_text and sl_no:
-        # Check if question text contains table data and format it properly
-        formatted_question = format_question_with_tables(question_text)
+        # Check if question text contains table data and split it into the tables field
+        question_text, tables = split_question_tables(question_text)
         
         return {
             "sl_no": sl_no,
-            "question_text": formatted_question,
+            "question_text": question_text,
+            "tables": tables,
             "co": co,
             "blooms_level": blooms_level,
             "marks": marks,
@@ -321,7 +368,7 @@ def process_embedded_tables(tables, page_text, page_num):
         # Try to find question context around this table
         table_text = extract_table_as_text(table)
         if table_text:
-            question_context = find_question_context_in_text(page_text, table_text)
+            question_context = find_question_context_in_text(page_text, table_text, table)
             if question_context:
                 questions.append(question_context)
             else:
@@ -334,7 +381,8 @@ def process_embedded_tables(tables, page_text, page_num):
                     if any(indicator in table_content for indicator in question_indicators):
                         questions.append({
                             "sl_no": f"T{page_num}_{table_idx + 1}",
-                            "question_text": f"Question with table data:\n\nTable:\n{table_text}",
+                            "question_text": "Question with table data:",
+                            "tables": [make_table(table)],
                             "co": "CO1",
                             "blooms_level": "L1",
                             "marks": 5,
@@ -343,8 +391,8 @@ def process_embedded_tables(tables, page_text, page_num):
     
     return questions
 
-def find_question_context_in_text(page_text, table_text):
-    """Find question context around a table in the page text"""
+def find_question_context_in_text(page_text, table_text, table=None):
+    """Find question context around a table (rows of cells, table_text its text) in the page text"""
     if not page_text or not table_text:
         return None
     
@@ -378,15 +426,13 @@ def find_question_context_in_text(page_text, table_text):
                     level_match = re.search(r'L\s*(\d+)', q_text, re.IGNORECASE)
                     level = level_match.group(0) if level_match else "L1"
                     
-                    # Combine question text with table - ensure proper formatting
-                    if table_text.strip():
-                        full_question = q_text + "\n\nTable:\n" + table_text
-                    else:
-                        full_question = q_text
+                    # The table goes into the tables field rather than the question text
+                    tables = [make_table(table)] if table and table_text.strip() else []
                     
                     return {
                         "sl_no": q_num,
-                        "question_text": clean_text(full_question),
+                        "question_text": clean_text(q_text),
+                        "tables": tables,
                         "co": co,
                         "blooms_level": level,
                         "marks": marks,
@@ -396,78 +442,144 @@ def find_question_context_in_text(page_text, table_text):
     return None
 
 def extract_questions_from_plain_text(text_content):
-    """Extract questions from plain text using various patterns"""
+    """
+    Extract questions from plain text in a single pass over its lines.
+    A line starting with 'Q.1', 'Question 1' or '1.' opens a question and the
+    lines after it continue it; bare '1.' lines inside a 'Q'/'Question'
+    numbered question are its sub-points, not new questions.
+    """
     questions = []
     
     if not text_content:
         return questions
     
-    # Pattern 1: Q.1, Q.2, etc.
-    pattern1 = re.findall(r'Q\.?\s*(\d+)\.?\s*(.*?)(?=Q\.?\s*\d+\.?\s*|$)', text_content, re.DOTALL | re.IGNORECASE)
-    for q_num, q_text in pattern1:
-        if q_text.strip():
-            marks = extract_marks_from_text(q_text)
-            co_match = re.search(r'CO\s*(\d+)', q_text, re.IGNORECASE)
-            co = co_match.group(0) if co_match else "CO1"
-            
-            level_match = re.search(r'L\s*(\d+)', q_text, re.IGNORECASE)
-            level = level_match.group(0) if level_match else "L1"
-            
-            questions.append({
-                "sl_no": q_num,
-                "question_text": clean_text(q_text),
-                "co": co,
-                "blooms_level": level,
-                "marks": marks if marks > 0 else 5,
-                "module": "1"
-            })
+    # (style, number, lines) of each numbered block, in reading order
+    blocks = []
+    for line in text_content.splitlines():
+        match = QUESTION_START_PATTERN.match(line)
+        style = None
+        if match:
+            style = STYLE_Q if match.group('q') else STYLE_QUESTION if match.group('question') else STYLE_NUMBER
+            if style == STYLE_NUMBER and blocks and blocks[-1][0] != STYLE_NUMBER:
+                style = None
+        
+        if style is not None:
+            number = match.group('q') or match.group('question') or match.group('number')
+            blocks.append((style, number, [match.group('text')]))
+        elif blocks:
+            blocks[-1][2].append(line)
     
-    # Pattern 2: Question 1, Question 2, etc.
-    pattern2 = re.findall(r'Question\s*(\d+)[:\.]?\s*(.*?)(?=Question\s*\d+[:\.]?\s*|$)', text_content, re.DOTALL | re.IGNORECASE)
-    for q_num, q_text in pattern2:
-        if q_text.strip():
-            marks = extract_marks_from_text(q_text)
-            co_match = re.search(r'CO\s*(\d+)', q_text, re.IGNORECASE)
-            co = co_match.group(0) if co_match else "CO1"
-            
-            level_match = re.search(r'L\s*(\d+)', q_text, re.IGNORECASE)
-            level = level_match.group(0) if level_match else "L1"
-            
-            questions.append({
-                "sl_no": q_num,
-                "question_text": clean_text(q_text),
-                "co": co,
-                "blooms_level": level,
-                "marks": marks if marks > 0 else 5,
-                "module": "1"
-            })
+    # Remove duplicates based on question number ('Q' numbering wins over 'Question', then bare numbers);
+    # fields are only worked out for the blocks that are kept
+    best = {}
+    for block_index, (style, number, lines) in enumerate(blocks):
+        q_text = "\n".join(lines).strip()
+        if not q_text or (style == STYLE_NUMBER and len(q_text) <= 20):
+            continue
+        if number not in best or style < best[number][0]:
+            best[number] = (style, block_index, q_text)
+    
+    for style, block_index, q_text in sorted(best.values(), key=lambda kept: kept[1]):
+        marks = extract_marks_from_text(q_text)
+        co_match = CO_PATTERN.search(q_text)
+        level_match = LEVEL_PATTERN.search(q_text)
+        
+        questions.append({
+            "sl_no": blocks[block_index][1],
+            "question_text": clean_text(q_text),
+            "co": co_match.group(0) if co_match else "CO1",
+            "blooms_level": level_match.group(0) if level_match else "L1",
+            "marks": marks if marks > 0 else 5,
+            "module": "1"
+        })
+    
+    return questions
+
+def parse_cie_module_file(filepath, filename, module_num, images_folder, page_workers=None):
+    """
+    Parses one module file of a CIE upload, or reuses the parse cache entry of
+    an earlier upload of the same bytes. Runs in a worker process when several
+    modules are parsed at once; page_workers bounds the page-level pool.
+    """
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    parsed_questions = []
+    cache_key = parse_cache.key_for_file(filepath, f'cie:{module_num}')
+    cached_questions = parse_cache.get(cache_key, images_folder)
     
-    # Pattern 3: Just numbers (1., 2., 3., etc.)
-    pattern3 = re.findall(r'^(\d+)\.\s*(.*?)(?=^\d+\.\s*|$)', text_content, re.MULTILINE | re.DOTALL)
-    for q_num, q_text in pattern3:
-        if q_text.strip() and len(q_text.strip()) > 20:  # Only if it looks like a real question
-            marks = extract_marks_from_text(q_text)
-            co_match = re.search(r'CO\s*(\d+)', q_text, re.IGNORECASE)
-            co = co_match.group(0) if co_match else "CO1"
+    if cached_questions is not None:
+        return cached_questions
+    elif file_extension == 'pdf':
+        # Read the PDF once; every strategy below works from this shared model
+        document = load_parsed_document(filepath, page_workers)
+        # Try Advanced Parser first for better results with images/tables
+        try:
+            # Lazy import
+            import sys
+            sys.path.append(os.path.dirname(os.path.dirname(__file__))) # Add backend to path
+            from advanced_parser import get_advanced_parser
             
-            level_match = re.search(r'L\s*(\d+)', q_text, re.IGNORECASE)
-            level = level_match.group(0) if level_match else "L1"
+            parser = get_advanced_parser()
+            # Create a subfolder for images
+            os.makedirs(images_folder, exist_ok=True) # Ensure images folder exists
             
-            questions.append({
-                "sl_no": q_num,
-                "question_text": clean_text(q_text),
-                "co": co,
-                "blooms_level": level,
-                "marks": marks if marks > 0 else 5,
-                "module": "1"
-            })
+            # Parse
+            raw_parsed_content = parser.parse_pdf(filepath, images_folder, document=document)
+            
+            # Convert to the format expected by Firestore/Frontend
+            for item in raw_parsed_content:
+                # Use extracted sl_no if available, otherwise "Auto"
+                sl_no = item.get("sl_no")
+                if not sl_no:
+                    sl_no = "Auto"
+                    
+                parsed_questions.append({
+                    "sl_no": sl_no,
+                    "question_text": item["question_text"],
+                    "tables": item.get("tables", []),
+                    "co": item.get("co", "CO1"), 
+                    "blooms_level": item.get("blooms_level", "L1"),
+                    "marks": item.get("marks", 10),
+                    "module": item.get("module", module_num), # Use extracted module if available, else form value
+                    "images": [img.replace('\\', '/') for img in item["images"]], # Normalize paths
+                    "formulas": item["formulas"] # New field
+                })
+                
+        except Exception as e:
+            print(f"Advanced parsing failed for {filename}, falling back to legacy: {e}")
+            # Fallback to legacy parsing
+            parsed_questions = parse_pdf_with_embedded_tables(filepath, document)
+            if not parsed_questions:
+                parsed_questions = parse_pdf_question_bank(filepath, document)
+    elif file_extension == 'docx':
+        parsed_questions = parse_docx_question_bank(filepath)
     
-    # Remove duplicates based on question number
-    seen_numbers = set()
-    unique_questions = []
-    for q in questions:
-        if q["sl_no"] not in seen_numbers:
-            seen_numbers.add(q["sl_no"])
-            unique_questions.append(q)
+    if parsed_questions:
+        parse_cache.put(cache_key, parsed_questions, images_folder)
+    return parsed_questions
+
+def parse_cie_module_files(module_files, workers=None):
+    """
+    Parses the (filepath, filename, module_num, images_folder) module files of
+    a CIE upload, up to CIE_PARSE_WORKERS (and no more than the CPUs) at a
+    time in worker processes. Returns one question list per file, in the
+    order given.
+    """
+    workers = CIE_PARSE_WORKERS if workers is None else workers
+    workers = min(workers, len(module_files), os.cpu_count() or 1)
+    if workers <= 1:
+        return [parse_cie_module_file(*module_file) for module_file in module_files]
     
-    return unique_questions
+    # Share the page-level workers between the modules instead of multiplying them
+    page_workers = max(1, PARSER_WORKERS // workers)
+    results = [None] * len(module_files)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(parse_cie_module_file, *module_file, page_workers) for module_file in module_files]
+            for index, future in enumerate(futures):
+                results[index] = future.result()
+    except (BrokenProcessPool, OSError) as e:
+        print(f"Parallel module parsing unavailable ({e}), parsing the remaining modules one after another.")
+        for index, module_file in enumerate(module_files):
+            if results[index] is None:
+                results[index] = parse_cie_module_file(*module_file)
+    return results
@@ -7,6 +7,40 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 
+from xml.sax.saxutils import escape
+
+from services.image_store import render_image_path
+from services.question_tables import question_tables, table_cells
+
+def question_table_flowables(tables, width, styles):
+    """
+    Native tables for a question's tables field, to go after its text in a
+    question cell: one grid per table, the first row as its header.
+    """
+    cell_style = ParagraphStyle('QuestionTableCell', parent=styles['Normal'], fontSize=8, leading=10)
+    header_style = ParagraphStyle('QuestionTableHeader', parent=cell_style, fontName='Helvetica-Bold')
+    flowables = []
+    for table in tables or []:
+        rows = table_cells(table)
+        columns = max((len(cells) for cells in rows), default=0)
+        if not columns:
+            continue
+        data = [
+            [Paragraph(escape(cells[c]) if c < len(cells) else "", header_style if r == 0 else cell_style) for c in range(columns)]
+            for r, cells in enumerate(rows)
+        ]
+        grid = Table(data, colWidths=[width / columns] * columns, hAlign='LEFT')
+        grid.setStyle(TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.whitesmoke),
+            ('TOPPADDING', (0, 0), (-1, -1), 1),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+        ]))
+        flowables.append(Spacer(1, 0.1*cm))
+        flowables.append(grid)
+    return flowables
+
 def generate_pdf_report(question_paper_data, metadata, output_path, logo_path=None, user_images_folder=None):
     """
     Generate a standardized PDF report for the question paper.
@@ -176,7 +210,10 @@ def generate_pdf_report(question_paper_data, metadata, output_path, logo_path=No
                 qno = str(main_q_idx + 1)
             
             sub_letter = chr(97 + sub_q_idx)
-            question_text = sub_q_data.get('question_text', sub_q_data.get('text', ''))
+            # Papers saved before the tables field carry their tables inline in the text
+            question_text, tables = question_tables(
+                sub_q_data.get('question_text', sub_q_data.get('text', '')), sub_q_data.get('tables')
+            )
             
             # Store images
             images = sub_q_data.get('images', [])
@@ -188,7 +225,8 @@ def generate_pdf_report(question_paper_data, metadata, output_path, logo_path=No
                 'co': sub_q_data.get('co', ''),
                 'level': sub_q_data.get('blooms_level', sub_q_data.get('level', '')),
                 'module': sub_q_data.get('module', ''),
-                'images': images
+                'images': images,
+                'tables': tables
             })
 
     # Questions table - with images INLINE in question cells
@@ -205,6 +243,9 @@ def generate_pdf_report(question_paper_data, metadata, output_path, logo_path=No
             # Add question text
             question_cell_content.append(Paragraph(str(q['question']), styles['Normal']))
             
+            # Add the question's tables as native tables
+            question_cell_content.extend(question_table_flowables(q.get('tables'), 11.5*cm, styles))
+            
             # Add images inline if present
             if q.get('images') and len(q['images']) > 0 and user_images_folder:
                 for img_name in q['images']:
@@ -219,7 +260,8 @@ def generate_pdf_report(question_paper_data, metadata, output_path, logo_path=No
                             # Add small spacer before image
                             question_cell_content.append(Spacer(1, 0.1*cm))
                             # Add image (smaller size for inline display)
-                            img = Image(full_img_path, width=4*cm, height=3*cm, kind='proportional')
+                            # Draw the render-sized derivative rather than the full-resolution original
+                            img = Image(render_image_path(full_img_path), width=4*cm, height=3*cm, kind='proportional')
                             question_cell_content.append(img)
                         except Exception as e:
                             print(f"Error loading image {full_img_path}: {e}")
@@ -0,0 +1,240 @@
+"""
+Per-user index of the question pool for paper generation.
+
+Choosing a paper needs only each question's module, marks, CO and Bloom's
+level; the text, tables and images are read afterwards for the chosen
+questions alone. The index keeps those fields, already normalized, in a few
+documents per user, one per (source_file, module):
+
+    users/{uid}/pool_index/{id}
+        {"source_file": "dbms.pdf", "module": "3",
+         "questions": {"<firestore_id>": {"marks": 10, "co": "CO2", "blooms_level": "L3"}}}
+
+Index writes go into the same batch as the pool writes they mirror (PoolSync,
+the CIE upload and the question bank add/update/delete routes), so the index
+follows every change without a scan. Pools written before the index existed
+are indexed on first use: load() finds no "_meta" document of the current
+INDEX_VERSION and rebuilds the index from one full read of the pool.
+
+Every staging method also bumps a "revision" counter in "_meta", so a pool
+write that leaves the index entries as they were (e.g. an edited question
+text) still changes the version load() reports.
+
+Documents whose id starts with "_" are not index entries: "_meta" and the
+usage ledger "_usage" (services/usage_ledger.py), whose sampling weights
+load() adds to the records.
+
+    index = PoolIndex(db, user_uid)
+    questions_by_module = index.load(source_file)   # {"3": [{"firestore_id", "marks", "co", "blooms_level", "weight"}, ...]}
+    questions = index.fetch(chosen_ids)             # full pool documents of the chosen questions
+
+Staging methods take a write(op, *args) callable that forwards to a batch,
+e.g. PoolSync._write, which keeps every write inside the batch size limit.
+"""
+
+import json
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from firebase_admin import firestore
+
+from services.usage_ledger import USAGE_DOC_ID
+from services.usage_weights import usage_weights
+
+# Bump to have every user's index rebuilt on its next load (e.g. when the entry fields change)
+INDEX_VERSION = 1
+META_DOC_ID = '_meta'
+# Firestore rejects batches with more than 500 writes
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def normalize_module(module) -> str:
+    """'Module 3', 'module3', 3 -> '3'"""
+    return str(module or '1').lower().replace('module', '').strip()
+
+
+def module_order(module: str):
+    """Sort key putting numbered modules first, in numeric order"""
+    return (0, int(module), '') if module.isdigit() else (1, 0, module)
+
+
+def parse_marks(marks) -> Optional[int]:
+    """Marks as a positive integer, or None for questions generation can't use"""
+    try:
+        marks = int(marks)
+    except (ValueError, TypeError):
+        return None
+    return marks if marks > 0 else None
+
+
+def index_entry(q_data: Dict) -> Optional[Tuple[str, Dict]]:
+    """(module, entry) of one pool question, or None if it has no usable marks"""
+    marks = parse_marks(q_data.get('marks', 0))
+    if marks is None:
+        return None
+    entry = {"marks": marks, "co": q_data.get('co', 'N/A'), "blooms_level": q_data.get('blooms_level', 'L2')}
+    return normalize_module(q_data.get('module', '1')), entry
+
+
+def unused_questions(questions_by_module: Dict[str, List[Dict]], used_ids) -> Dict[str, List[Dict]]:
+    """The index without the questions in used_ids (modules left empty are dropped)"""
+    if not used_ids:
+        return {module: list(questions) for module, questions in questions_by_module.items()}
+    unused = {}
+    for module, questions in questions_by_module.items():
+        remaining = [q for q in questions if q['firestore_id'] not in used_ids]
+        if remaining:
+            unused[module] = remaining
+    return unused
+
+
+class PoolIndex:
+    def __init__(self, db, user_uid: str):
+        self.db = db
+        self.user_uid = user_uid
+        user_ref = db.collection('users').document(user_uid)
+        self.pool_ref = user_ref.collection('question_bank_pool')
+        self.index_ref = user_ref.collection('pool_index')
+        self.version = None
+
+    def doc_ref(self, source_file: str, module: str):
+        # Hashed so any file name makes a valid, collision-free document id
+        key = hashlib.sha1(f"{source_file}\n{module}".encode()).hexdigest()[:24]
+        return self.index_ref.document(key)
+
+    def stage_revision(self, write):
+        """Stages a bump of the pool's content revision, part of the version load() reports"""
+        write('set', self.index_ref.document(META_DOC_ID), {"revision": firestore.Increment(1)}, True)
+
+    def stage_source(self, write, source_file: str, questions: Dict[str, Dict], old_modules: Iterable[str] = (), replace=True):
+        """
+        Stages the index documents of one source file from its pool questions
+        ({firestore_id: data}). With replace, the documents are rewritten whole
+        and those of old_modules the file no longer has are deleted; otherwise
+        the questions are merged into what is indexed already.
+        """
+        by_module = defaultdict(dict)
+        for question_id, q_data in questions.items():
+            indexed = index_entry(q_data)
+            if indexed:
+                by_module[indexed[0]][question_id] = indexed[1]
+
+        for module, entries in by_module.items():
+            doc = {"source_file": source_file, "module": module, "questions": entries}
+            if replace:
+                write('set', self.doc_ref(source_file, module), doc)
+            else:
+                write('set', self.doc_ref(source_file, module), doc, True)
+        if replace:
+            for module in set(old_modules) - set(by_module):
+                write('delete', self.doc_ref(source_file, module))
+        self.stage_revision(write)
+
+    def stage_question(self, write, question_id: str, q_data: Dict, old_data: Optional[Dict] = None):
+        """Stages the index change of one added or edited question (old_data: the document before the edit)"""
+        indexed = index_entry(q_data)
+        source_file = q_data.get('source_file', '')
+        if old_data is not None:
+            old_module = normalize_module(old_data.get('module', '1'))
+            old_source = old_data.get('source_file', '')
+            if indexed is None or (old_source, old_module) != (source_file, indexed[0]):
+                self._stage_remove_entry(write, question_id, old_data)
+        if indexed:
+            module, entry = indexed
+            doc = {"source_file": source_file, "module": module, "questions": {question_id: entry}}
+            write('set', self.doc_ref(source_file, module), doc, True)
+        self.stage_revision(write)
+
+    def stage_remove(self, write, question_id: str, q_data: Dict):
+        """Stages the removal of one question (its document before the delete) from the index"""
+        self._stage_remove_entry(write, question_id, q_data)
+        self.stage_revision(write)
+
+    def _stage_remove_entry(self, write, question_id: str, q_data: Dict):
+        module = normalize_module(q_data.get('module', '1'))
+        # A merge rather than an update, so a question missing from the index doesn't fail the batch
+        write('set', self.doc_ref(q_data.get('source_file', ''), module),
+              {"questions": {question_id: firestore.DELETE_FIELD}}, True)
+
+    def load(self, source_file: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """
+        Questions by module (sorted), as compact records with their firestore_id
+        and sampling weight, of one source file or of the whole pool. Builds the
+        index if it is missing.
+
+        Sets self.version, a digest of everything the result depends on: the
+        index and ledger documents, the pool's content revision, and the day
+        the weights were computed for (they age by whole days, so a pool gives
+        the same records all day).
+        """
+        docs = {doc.id: doc.to_dict() or {} for doc in self.index_ref.stream()}
+        if docs.get(META_DOC_ID, {}).get('version') != INDEX_VERSION:
+            docs = self.rebuild(docs)
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        weights = usage_weights(docs.get(USAGE_DOC_ID, {}), today)
+        content = json.dumps({doc_id: doc for doc_id, doc in docs.items() if doc_id != META_DOC_ID},
+                             sort_keys=True, default=str)
+        revision = docs.get(META_DOC_ID, {}).get('revision', 0)
+        self.version = hashlib.sha1(f"{today.date()}\n{revision}\n{content}".encode()).hexdigest()
+
+        questions_by_module = defaultdict(list)
+        for doc_id, doc in docs.items():
+            if doc_id.startswith('_') or (source_file is not None and doc.get('source_file') != source_file):
+                continue
+            for question_id, entry in (doc.get('questions') or {}).items():
+                record = dict(entry, firestore_id=question_id, weight=weights.get(question_id, 1.0))
+                questions_by_module[doc.get('module', '1')].append(record)
+        return {
+            module: sorted(questions_by_module[module], key=lambda q: q['firestore_id'])
+            for module in sorted(questions_by_module, key=module_order)
+        }
+
+    def rebuild(self, existing_docs: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """Rebuilds the whole index from the pool; returns the index documents by id"""
+        print(f"Building the question pool index for {self.user_uid}")
+        by_source = defaultdict(dict)
+        for doc in self.pool_ref.stream():
+            data = doc.to_dict() or {}
+            by_source[data.get('source_file', '')][doc.id] = data
+
+        docs = {}
+        writes = []
+        def write(op, ref, data=None, merge=False):
+            # The revision bumps of stage_source are left out: the rebuild writes the same content
+            if ref.id == META_DOC_ID:
+                return
+            writes.append((op, ref, data, merge))
+            if op == 'set':
+                docs[ref.id] = data
+        for source_file, questions in by_source.items():
+            self.stage_source(write, source_file, questions)
+        # Documents of files or modules no longer in the pool
+        for doc_id in set(existing_docs or ()) - set(docs):
+            if not doc_id.startswith('_'):
+                writes.append(('delete', self.index_ref.document(doc_id), None, False))
+        # Merged, so the content revision survives the rebuild
+        meta = {"version": INDEX_VERSION, "built_at": firestore.SERVER_TIMESTAMP}
+        writes.append(('set', self.index_ref.document(META_DOC_ID), meta, True))
+
+        for start in range(0, len(writes), FIRESTORE_BATCH_LIMIT):
+            batch = self.db.batch()
+            for op, ref, data, merge in writes[start:start + FIRESTORE_BATCH_LIMIT]:
+                if op == 'set':
+                    batch.set(ref, data, merge=merge)
+                else:
+                    batch.delete(ref)
+            batch.commit()
+
+        docs[META_DOC_ID] = dict((existing_docs or {}).get(META_DOC_ID) or {}, **meta)
+        if USAGE_DOC_ID in (existing_docs or {}):
+            docs[USAGE_DOC_ID] = existing_docs[USAGE_DOC_ID]
+        return docs
+
+    def fetch(self, question_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Full pool documents of the given questions, by id (missing ones left out)"""
+        refs = [self.pool_ref.document(question_id) for question_id in dict.fromkeys(question_ids)]
+        if not refs:
+            return {}
+        return {snap.id: snap.to_dict() for snap in self.db.get_all(refs) if snap.exists}
@@ -0,0 +1,159 @@
+"""
+Incremental sync of an uploaded bank into a user's question_bank_pool.
+
+Every pool question stores a content_hash of its normalized text, tables and
+images (services/question_hash.py). When a bank is uploaded again under the
+same source_file, its existing pool documents are loaded once and matched to
+the parsed questions by that hash:
+
+    no match                       -> added (new document)
+    match, parsed content differs  -> updated in place (PARSER_FIELDS only)
+    match, identical               -> unchanged, no write
+    existing document left over    -> deleted, with its usage ledger entry (also clears old duplicates)
+
+Writes go through Firestore batches, committed every FIRESTORE_BATCH_LIMIT
+operations, so a re-upload costs writes proportional to what changed. The
+bank's pool_index documents (see services/pool_index.py) are rewritten in the
+final batch, one write per module.
+
+    sync = PoolSync(db, user_uid, filename)
+    questions = [sync.stage(q) for q in parsed_questions]
+    sync.finish()          # deletions + final commit
+    sync.stats             # {'added', 'updated', 'deleted', 'unchanged'}
+"""
+
+import os
+from typing import Dict, List
+
+from firebase_admin import firestore
+
+from services.question_hash import question_content_hash
+from services.pool_index import PoolIndex, normalize_module
+from services.usage_ledger import stage_forget_questions
+
+# Firestore rejects batches with more than 500 writes
+FIRESTORE_BATCH_LIMIT = 500
+
+# The only fields a re-upload rewrites on a matched document; marks, module, CO and
+# Bloom's level may have been edited by the teacher since and are left as they are
+PARSER_FIELDS = ('question_text', 'tables', 'images', 'formulas')
+EDITABLE_FIELDS = ('marks', 'module', 'co', 'blooms_level')
+
+# Written by the sync itself rather than taken from the parser
+BOOKKEEPING_FIELDS = ('user_uid', 'source_file', 'uploaded_at', 'is_pre_selected', 'last_used_date', 'content_hash')
+
+
+class BatchWriter:
+    """Stages writes into Firestore batches, committing one every FIRESTORE_BATCH_LIMIT writes"""
+
+    def __init__(self, db):
+        self.db = db
+        self._batch = None
+        self._pending_writes = 0
+
+    def write(self, op, *args):
+        """Stages batch.<op>(*args): 'set', 'update' or 'delete'"""
+        if self._batch is None:
+            self._batch = self.db.batch()
+        getattr(self._batch, op)(*args)
+        self._pending_writes += 1
+        if self._pending_writes >= FIRESTORE_BATCH_LIMIT:
+            self.commit()
+
+    def commit(self):
+        """Commits the staged writes (if any)"""
+        if self._batch is not None and self._pending_writes:
+            self._batch.commit()
+        self._batch = None
+        self._pending_writes = 0
+
+
+class PoolSync:
+    def __init__(self, db, user_uid: str, source_file: str):
+        self.db = db
+        self.user_uid = user_uid
+        self.source_file = source_file
+        self.pool_ref = db.collection('users').document(user_uid).collection('question_bank_pool')
+        self.stats = {'added': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        self._writer = BatchWriter(db)
+        self._write = self._writer.write
+        self._first_matched_ref = None
+        self._index = PoolIndex(db, user_uid)
+        self._indexed_questions: Dict[str, Dict] = {}
+        self._old_modules = set()
+
+        # Existing documents of this bank, grouped by content hash (several if the bank was uploaded before
+        # without syncing); each one can be matched by a single parsed question
+        self._existing: Dict[str, List] = {}
+        for doc in self.pool_ref.where('source_file', '==', source_file).stream():
+            data = doc.to_dict() or {}
+            content_hash = data.get('content_hash') or question_content_hash(data)
+            self._existing.setdefault(content_hash, []).append((doc.reference, data))
+            self._old_modules.add(normalize_module(data.get('module', '1')))
+
+    def commit(self):
+        """Commits the staged writes (if any)"""
+        self._writer.commit()
+
+    def stage(self, q_data: Dict) -> Dict:
+        """Stages the write (if any) for one parsed question and returns it ready for the frontend"""
+        q_firestore = q_data.copy()
+        if 'images' in q_firestore: q_firestore['images'] = [os.path.basename(p) for p in q_firestore['images']]
+        for field in BOOKKEEPING_FIELDS:
+            q_firestore.pop(field, None)
+        content_hash = question_content_hash(q_firestore)
+
+        matches = self._existing.get(content_hash)
+        if matches:
+            doc_ref, existing = matches.pop(0)
+            if self._first_matched_ref is None:
+                self._first_matched_ref = doc_ref
+            changed = {
+                field: q_firestore[field] for field in PARSER_FIELDS
+                if field in q_firestore and existing.get(field) != q_firestore[field]
+            }
+            # The frontend gets the stored (possibly edited) values, not the parser's defaults
+            q_data.update({field: value for field, value in existing.items() if field in EDITABLE_FIELDS})
+            q_firestore = {**existing, **changed}
+            if changed or existing.get('content_hash') != content_hash:
+                changed.update({'content_hash': content_hash, 'uploaded_at': firestore.SERVER_TIMESTAMP})
+                self._write('update', doc_ref, changed)
+                self.stats['updated'] += 1
+            else:
+                self.stats['unchanged'] += 1
+        else:
+            doc_ref = self.pool_ref.document()
+            q_firestore.update({
+                'user_uid': self.user_uid, 'source_file': self.source_file, 'content_hash': content_hash,
+                'uploaded_at': firestore.SERVER_TIMESTAMP, 'is_pre_selected': False, 'last_used_date': None
+            })
+            self._write('set', doc_ref, q_firestore)
+            self.stats['added'] += 1
+
+        self._indexed_questions[doc_ref.id] = q_firestore
+        q_data['firestore_id'] = doc_ref.id
+        if 'uploaded_at' in q_data: del q_data['uploaded_at']
+        if 'last_used_date' in q_data: del q_data['last_used_date']
+        return q_data
+
+    def finish(self):
+        """Deletes questions that are no longer in the bank and commits everything staged"""
+        deleted_ids = []
+        for matches in self._existing.values():
+            for doc_ref, _ in matches:
+                self._write('delete', doc_ref)
+                deleted_ids.append(doc_ref.id)
+                self.stats['deleted'] += 1
+        self._existing = {}
+        stage_forget_questions(self._write, self.db, self.user_uid, deleted_ids)
+        self._index.stage_source(self._write, self.source_file, self._indexed_questions, self._old_modules)
+
+        # generate_question_paper takes the pool's newest uploaded_at as the latest bank,
+        # so an unchanged re-upload still touches one of its questions
+        if not (self.stats['added'] or self.stats['updated']) and self._first_matched_ref is not None:
+            self._write('update', self._first_matched_ref, {'uploaded_at': firestore.SERVER_TIMESTAMP})
+        self.commit()
+
+        print(f"Synced {self.source_file} for {self.user_uid}: " +
+              ", ".join(f"{count} {kind}" for kind, count in self.stats.items()))
+        return self.stats
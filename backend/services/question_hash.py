@@ -0,0 +1,32 @@
+"""
+Content hashes of pool questions.
+
+PoolSync (services/pool_sync.py) stores a content_hash on every pool question
+and matches re-uploaded questions to their documents by it. The hash covers
+the normalized text (tables included) and the image file names, so it is the
+same however a bank's whitespace, letter case or image order changes.
+Kept apart from pool_sync so it imports without Firebase.
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict
+
+from services.question_tables import table_as_text
+
+
+def normalize_question_text(text) -> str:
+    return " ".join(str(text or "").split()).casefold()
+
+
+def question_content_hash(q_data: Dict) -> str:
+    """Hash of the question's normalized text, tables and image files (order-insensitive)"""
+    # Tables are hashed as the "Table:" text they used to be stored as inside question_text,
+    # so documents saved before the tables field still match their re-parsed questions
+    text = " ".join([str(q_data.get('question_text') or "")] + [table_as_text(t) for t in q_data.get('tables') or []])
+    content = {
+        "text": normalize_question_text(text),
+        "images": sorted(os.path.basename(str(img)) for img in q_data.get('images') or [])
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
@@ -0,0 +1,109 @@
+"""
+Structured tables of question records.
+
+Tables that belong to a question (nested tables in a PDF question cell,
+datasets typed into a DOCX cell, table-like lines in the text) are stored on
+the question record itself, next to a question_text that no longer repeats
+them:
+
+    "tables": [{"rows": [{"cells": ["S.NO", "CGPA", "Result"]},
+                         {"cells": ["1", "9.2", "Pass"]}]}]
+
+Rows are maps because Firestore cannot store an array directly inside an
+array. Renderers draw native tables from this field and show them after the
+question text.
+
+Records saved before the field existed carry their tables inline as
+"Table:\\n a | b" blocks; question_tables() splits those with
+split_table_text(), so every renderer handles the same shape.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+TABLE_MARKER = "Table:"
+
+
+def make_table(rows) -> Dict:
+    """Table field entry from rows of cells (newlines in cells flattened, empty rows dropped)"""
+    table_rows = []
+    for row in rows or []:
+        cells = [" ".join(str(cell).split()) if cell is not None else "" for cell in row]
+        if any(cells):
+            table_rows.append({"cells": cells})
+    return {"rows": table_rows}
+
+
+def table_cells(table: Dict) -> List[List[str]]:
+    """Rows of cell strings of one table field entry"""
+    return [list(row.get("cells", [])) for row in table.get("rows", [])]
+
+
+def table_as_text(table: Dict) -> str:
+    """The legacy "Table:\\n a | b" text of one table, for plain-text outputs"""
+    return TABLE_MARKER + "\n" + "\n".join(" | ".join(cells) for cells in table_cells(table))
+
+
+def split_table_text(question_text: str) -> Tuple[str, List[Dict]]:
+    """
+    Splits legacy "Table:" blocks out of a question text. A block runs from
+    the marker to the next blank line, or to the first line without a pipe
+    once its rows have pipes.
+    """
+    if not question_text or TABLE_MARKER not in question_text:
+        return question_text, []
+
+    text_lines = []
+    tables = []
+    rows = None     # rows of the open block
+    piped = False   # the open block's rows are pipe-delimited
+    for line in question_text.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith(TABLE_MARKER):
+            if rows:
+                tables.append(make_table(rows))
+            rows, piped = [], False
+            stripped = stripped[len(TABLE_MARKER):].strip()
+            if not stripped:
+                continue
+            line = stripped
+        if rows is not None:
+            if stripped and ('|' in stripped or not piped):
+                if '|' in stripped:
+                    piped = True
+                    rows.append([cell.strip() for cell in stripped.split('|')])
+                else:
+                    rows.append([stripped])
+                continue
+            tables.append(make_table(rows))
+            rows = None
+            if not stripped:
+                continue
+        text_lines.append(line)
+    if rows:
+        tables.append(make_table(rows))
+
+    return "\n".join(text_lines).strip(), [table for table in tables if table["rows"]]
+
+
+def question_tables(question_text: str, tables: Optional[List[Dict]] = None) -> Tuple[str, List[Dict]]:
+    """(text, tables) of a question record: its tables field, or tables split from a legacy text"""
+    if tables is not None:
+        return question_text or "", tables
+    text, legacy_tables = split_table_text(question_text or "")
+    return text, legacy_tables
+
+
+def add_docx_tables(document, tables: List[Dict]) -> None:
+    """Adds a question's tables to a python-docx document as native grids, the first row bold as a header"""
+    for table in tables or []:
+        rows = table_cells(table)
+        columns = max((len(cells) for cells in rows), default=0)
+        if not columns:
+            continue
+        grid = document.add_table(rows=len(rows), cols=columns)
+        grid.style = 'Table Grid'
+        for r, cells in enumerate(rows):
+            for c, value in enumerate(cells):
+                paragraph = grid.cell(r, c).paragraphs[0]
+                paragraph.add_run(value).bold = r == 0
+        document.add_paragraph('')
@@ -0,0 +1,84 @@
+"""
+Per-page spatial index over bounding boxes.
+
+Boxes use pdfplumber's (x0, top, x1, bottom) order. The index keeps the
+boxes sorted by top (and by bottom, and by vertical centre) so the layout
+queries the parser needs are binary searches instead of scans over every
+table, row or question on the page:
+
+    containers(bbox)        boxes that contain bbox (nested tables)
+    centers_between(a, b)   boxes whose vertical centre lies in [a, b] (row -> nested table)
+    first_covering(y)       first box, in top order, spanning y (image inside a question row)
+    nearest_above(y)        box with the greatest bottom <= y (image below a question)
+
+Results refer to positions in the list the index was built from.
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+class BBoxIndex:
+    """Sorted-interval index; build once per page, query many times."""
+
+    def __init__(self, bboxes):
+        self.bboxes = [tuple(b) for b in bboxes]
+
+        # Top order (stable, so equal tops keep their input order)
+        self._by_top = sorted(range(len(self.bboxes)), key=lambda i: self.bboxes[i][1])
+        self._tops = [self.bboxes[i][1] for i in self._by_top]
+        # Running max of bottoms in top order: the first position where it reaches y
+        # is the first box (in top order) whose bottom is >= y
+        self._max_bottoms = []
+        running = float('-inf')
+        for i in self._by_top:
+            running = max(running, self.bboxes[i][3])
+            self._max_bottoms.append(running)
+
+        # Bottom order; among equal bottoms the box that comes first in top order sorts last
+        rank = {i: r for r, i in enumerate(self._by_top)}
+        self._by_bottom = sorted(range(len(self.bboxes)), key=lambda i: (self.bboxes[i][3], -rank[i]))
+        self._bottoms = [self.bboxes[i][3] for i in self._by_bottom]
+
+        self._by_center = sorted(range(len(self.bboxes)), key=lambda i: (self.bboxes[i][1] + self.bboxes[i][3]) / 2)
+        self._centers = [(self.bboxes[i][1] + self.bboxes[i][3]) / 2 for i in self._by_center]
+
+    def __len__(self):
+        return len(self.bboxes)
+
+    def containers(self, bbox, tolerance=0.0, exclude=None):
+        """Positions of boxes containing bbox (within tolerance), in ascending order."""
+        x0, top, x1, bottom = bbox
+        found = []
+        # Only boxes starting at or above bbox's top can contain it, and the run of
+        # boxes before the running max bottom reaches bbox's bottom all end too early
+        limit = bisect_right(self._tops, top + tolerance)
+        start = bisect_left(self._max_bottoms, bottom - tolerance, 0, limit)
+        for i in self._by_top[start:limit]:
+            if i == exclude:
+                continue
+            c_x0, _, c_x1, c_bottom = self.bboxes[i]
+            if x0 >= c_x0 - tolerance and x1 <= c_x1 + tolerance and bottom <= c_bottom + tolerance:
+                found.append(i)
+        found.sort()
+        return found
+
+    def centers_between(self, top, bottom):
+        """Positions of boxes whose vertical centre lies in [top, bottom], in ascending order."""
+        lo = bisect_left(self._centers, top)
+        hi = bisect_right(self._centers, bottom)
+        return sorted(self._by_center[lo:hi])
+
+    def first_covering(self, y):
+        """Position of the first box in top order with top <= y <= bottom, or None."""
+        # Boxes starting below y cannot cover it
+        limit = bisect_right(self._tops, y)
+        k = bisect_left(self._max_bottoms, y, 0, limit)
+        return self._by_top[k] if k < limit else None
+
+    def nearest_above(self, y, tolerance=0.0):
+        """
+        Position of the box whose bottom is closest to y from above
+        (bottom <= y + tolerance); ties go to the first box in top order.
+        """
+        k = bisect_right(self._bottoms, y + tolerance)
+        return self._by_bottom[k - 1] if k else None
@@ -0,0 +1,97 @@
+"""
+Usage ledger of pool questions, for recency-aware selection.
+
+One document per user, next to the pool index (so PoolIndex.load() reads it
+in the same query), counts how often each question went into a saved or
+approved paper and when it last did:
+
+    users/{uid}/pool_index/_usage
+        {"questions": {"<firestore_id>": {"uses": 3, "last_used": <timestamp>}},
+         "papers": {"<paper id>": <timestamp>}}
+
+record_paper_usage() updates it in a transaction per paper; a paper already
+in "papers" (saved, then approved) is not counted twice. Papers recorded more
+than USAGE_PAPER_RETENTION_DAYS ago are dropped from "papers" on the way, and
+a question's entry goes when the question leaves the pool
+(stage_forget_questions), so the document stays about the size of the pool.
+
+The entries become sampling weights in services/usage_weights.py.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List
+
+from firebase_admin import firestore
+
+USAGE_DOC_ID = '_usage'
+# Long enough that a paper saved and approved later is still recognised
+USAGE_PAPER_RETENTION_DAYS = float(os.getenv('USAGE_PAPER_RETENTION_DAYS', '365'))
+
+
+def paper_question_ids(questions: Iterable[Dict]) -> List[str]:
+    """Pool question ids of a paper's main questions (generated or saved from the dashboard)"""
+    ids = []
+    for main in questions or []:
+        for sub in main.get('sub_questions') or main.get('subQuestions') or []:
+            question_id = sub.get('firestore_id')
+            if question_id:
+                ids.append(str(question_id))
+    return list(dict.fromkeys(ids))
+
+
+def ledger_ref(db, user_uid: str):
+    return db.collection('users').document(user_uid).collection('pool_index').document(USAGE_DOC_ID)
+
+
+def expired_papers(papers: Dict, now: datetime = None) -> List[str]:
+    """Ids of the recorded papers older than USAGE_PAPER_RETENTION_DAYS"""
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=USAGE_PAPER_RETENTION_DAYS)
+    expired = []
+    for paper_id, recorded_at in (papers or {}).items():
+        if isinstance(recorded_at, datetime):
+            if recorded_at.tzinfo is None:
+                recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+            if recorded_at < cutoff:
+                expired.append(paper_id)
+    return expired
+
+
+@firestore.transactional
+def _record_in_transaction(transaction, ref, paper_id: str, question_ids: List[str]) -> int:
+    # Read and write in one transaction, so a paper saved and approved at the same time is counted once
+    snapshot = ref.get(transaction=transaction)
+    papers = ((snapshot.to_dict() or {}).get('papers') or {}) if snapshot.exists else {}
+    if paper_id in papers:
+        return 0
+
+    recorded_papers = {old_id: firestore.DELETE_FIELD for old_id in expired_papers(papers)}
+    recorded_papers[paper_id] = firestore.SERVER_TIMESTAMP
+    transaction.set(ref, {
+        "questions": {
+            question_id: {"uses": firestore.Increment(1), "last_used": firestore.SERVER_TIMESTAMP}
+            for question_id in question_ids
+        },
+        "papers": recorded_papers
+    }, merge=True)
+    return len(question_ids)
+
+
+def record_paper_usage(db, user_uid: str, paper_id: str, questions: Iterable[Dict]) -> int:
+    """Counts one use of every pool question of a paper; returns how many were recorded"""
+    question_ids = paper_question_ids(questions)
+    if not question_ids or not paper_id:
+        return 0
+    recorded = _record_in_transaction(db.transaction(), ledger_ref(db, user_uid), str(paper_id), question_ids)
+    if recorded:
+        print(f"Recorded usage of {recorded} questions from paper {paper_id} for {user_uid}")
+    return recorded
+
+
+def stage_forget_questions(write, db, user_uid: str, question_ids: Iterable[str]):
+    """Stages the removal of deleted pool questions from the ledger (write(op, *args) as in PoolIndex)"""
+    question_ids = list(question_ids)
+    if question_ids:
+        # A merge, so questions that were never used (or no ledger at all) don't fail the batch
+        write('set', ledger_ref(db, user_uid),
+              {"questions": {question_id: firestore.DELETE_FIELD for question_id in question_ids}}, True)
@@ -0,0 +1,39 @@
+"""
+Sampling weights of pool questions from their usage ledger entries.
+
+Kept apart from services/usage_ledger.py (which reads and writes the ledger
+in Firestore) so the weighting imports without Firebase. Every question gets
+a weight from its entry {"uses": 3, "last_used": <datetime>}:
+
+    recent_uses = uses * 0.5 ** (days since last use / USAGE_HALF_LIFE_DAYS)
+    weight      = 1 / (1 + USAGE_PENALTY * recent_uses)
+
+An unused question weighs 1; one used once this week with the default
+penalty weighs about 0.25, and recovers as the use ages. The generators draw
+heavier questions more often, roughly in proportion to the weight
+(services/marks_combos.weighted_sample), so rarely and long-unused questions
+come first without ever ruling the others out.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Dict
+
+USAGE_HALF_LIFE_DAYS = float(os.getenv('USAGE_HALF_LIFE_DAYS', '120'))
+USAGE_PENALTY = float(os.getenv('USAGE_PENALTY', '3'))
+
+
+def usage_weights(ledger: Dict, now: datetime = None) -> Dict[str, float]:
+    """Sampling weight of every question in the ledger document (questions not in it weigh 1)"""
+    now = now or datetime.now(timezone.utc)
+    weights = {}
+    for question_id, entry in (ledger.get('questions') or {}).items():
+        uses = entry.get('uses') or 0
+        last_used = entry.get('last_used')
+        if isinstance(last_used, datetime):
+            if last_used.tzinfo is None:
+                last_used = last_used.replace(tzinfo=timezone.utc)
+            age_days = max(0.0, (now - last_used).total_seconds() / 86400)
+            uses *= 0.5 ** (age_days / USAGE_HALF_LIFE_DAYS)
+        weights[question_id] = 1.0 / (1.0 + USAGE_PENALTY * uses)
+    return weights
@@ -453,35 +453,64 @@ document.addEventListener('DOMContentLoaded', async () => {
             const idToken = await user.getIdToken();
 
             try {
-                const response = await fetch('/upload_and_parse', {
+                // Streamed endpoint: one NDJSON event per parsed page, so the first
+                // questions show up while the rest of the bank is still parsing
+                const response = await fetch('/upload_and_parse_stream', {
                     method: 'POST',
                     body: formData,
                     headers: {
-                        'Authorization': `Bearer ${idToken}`
+                        'Authorization': `Bearer ${idToken}`,
+                        'Accept': 'application/x-ndjson'
                     }
                 });
 
-                const data = await response.json();
-
-                if (response.ok) {
-                    uploadStatus.textContent = `Success: ${data.message} Found ${data.parsed_questions_count} questions.`;
-                    uploadStatus.className = 'mt-3 text-sm font-medium text-green-600';
-                    console.log('Parsed data:', data.parsed_data);
+                if (!response.ok || !response.body) {
+                    const data = await response.json();
+                    uploadStatus.textContent = `Error: ${data.error || data.message}`;
+                    uploadStatus.className = 'mt-3 text-sm font-medium text-red-600';
+                    console.error('Upload error:', data);
+                    return;
+                }
 
-                    showContent(qpEditorCanvas, 'Question Paper Editor');
-                    // Store the parsed questions globally for the left pane
-                    currentParsedQuestions = data.parsed_data;
-                    populateLeftPane(currentParsedQuestions);
-                    renderQPPreview();
+                currentParsedQuestions = [];
 
-                    // Update the latest upload info display
-                    updateLatestUploadInfo(data.filename, data.parsed_questions_count);
+                const handleUploadEvent = (data) => {
+                    if (data.event === 'questions') {
+                        if (currentParsedQuestions.length === 0) {
+                            showContent(qpEditorCanvas, 'Question Paper Editor');
+                        }
+                        // Store the parsed questions globally for the left pane
+                        currentParsedQuestions.push(...data.questions);
+                        populateLeftPane(currentParsedQuestions);
+                        renderQPPreview();
+
+                        uploadStatus.textContent = `Parsing... ${currentParsedQuestions.length} questions so far.`;
+                    } else if (data.event === 'done') {
+                        uploadStatus.textContent = `Success: ${data.message} Found ${data.parsed_questions_count} questions.`;
+                        uploadStatus.className = 'mt-3 text-sm font-medium text-green-600';
+                        console.log('Parsed data:', currentParsedQuestions);
+
+                        // Update the latest upload info display
+                        updateLatestUploadInfo(data.filename, data.parsed_questions_count);
+                    } else if (data.event === 'error') {
+                        uploadStatus.textContent = `Error: ${data.error}`;
+                        uploadStatus.className = 'mt-3 text-sm font-medium text-red-600';
+                        console.error('Upload error:', data);
+                    }
+                };
 
-                } else {
-                    uploadStatus.textContent = `Error: ${data.error}`;
-                    uploadStatus.className = 'mt-3 text-sm font-medium text-red-600';
-                    console.error('Upload error:', data);
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffered = '';
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffered += decoder.decode(value, { stream: true });
+                    const lines = buffered.split('\n');
+                    buffered = lines.pop();
+                    lines.filter(line => line.trim()).forEach(line => handleUploadEvent(JSON.parse(line)));
                 }
+                if (buffered.trim()) handleUploadEvent(JSON.parse(buffered));
             } catch (error) {
                 console.error('Upload error:', error);
                 let errorMessage = '❌ Upload failed. ';
@@ -641,16 +670,47 @@ document.addEventListener('DOMContentLoaded', async () => {
         });
     }
 
-    // Function to format question text for proper display
-    function formatQuestionText(questionText) {
-        if (!questionText) return '';
-
-        // Escape HTML characters first
-        let formatted = questionText.replace(/&/g, '&amp;')
+    function escapeHtml(text) {
+        return String(text).replace(/&/g, '&amp;')
             .replace(/</g, '&lt;')
             .replace(/>/g, '&gt;')
             .replace(/"/g, '&quot;')
             .replace(/'/g, '&#39;');
+    }
+
+    // Renders a question's tables field ([{rows: [{cells: [...]}]}]) as tables, the first row as header
+    function renderQuestionTables(tables) {
+        if (!Array.isArray(tables) || tables.length === 0) return '';
+
+        let result = '';
+        tables.forEach(table => {
+            const rows = (table.rows || []).filter(row => row.cells && row.cells.length > 0);
+            if (rows.length === 0) return;
+
+            result += '<div class="mt-2 overflow-x-auto"><table class="min-w-full text-sm border-collapse border border-gray-300 bg-white shadow-sm">';
+            rows.forEach((row, index) => {
+                const cellClass = index === 0 ? 'bg-gray-100 font-semibold text-gray-700' : 'text-gray-600';
+                result += '<tr>';
+                row.cells.forEach(cell => {
+                    result += `<td class="border border-gray-300 px-3 py-2 ${cellClass}">${escapeHtml(cell)}</td>`;
+                });
+                result += '</tr>';
+            });
+            result += '</table></div>';
+        });
+        return result;
+    }
+
+    // Function to format question text for proper display
+    function formatQuestionText(questionText, tables) {
+        // Questions parsed since the tables field was added keep their tables out of the text
+        if (Array.isArray(tables)) {
+            return escapeHtml(questionText || '').replace(/\n/g, '<br>') + renderQuestionTables(tables);
+        }
+        if (!questionText) return '';
+
+        // Escape HTML characters first
+        let formatted = escapeHtml(questionText);
 
         // Check if the text contains explicit "Table:" marker
         if (formatted.includes('Table:')) {
@@ -706,7 +766,7 @@ document.addEventListener('DOMContentLoaded', async () => {
 
 
             // Format question text to handle tables properly
-            const formattedQuestionText = formatQuestionText(q.question_text);
+            const formattedQuestionText = formatQuestionText(q.question_text, q.tables);
 
             // Render images if available
             let imagesHtml = '';
@@ -1088,6 +1148,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                         <span contenteditable="true" class="qp-question-text text-gray-800">${qData.question_text}</span>
                         <input type="number" value="${qData.marks}" class="qp-marks-input ml-2" min="0" max="25" data-sub-q-index="${subQIndex}">
                     </div>
+                    ${qData.tables && qData.tables.length > 0 ? `<div class="ml-6">${renderQuestionTables(qData.tables)}</div>` : ''}
                     ${imagesHtml}
                     <div class="text-xs text-gray-600 flex flex-wrap gap-2 mt-1 ml-6">
                         <span>CO: <span class="font-medium">${qData.co || 'N/A'}</span></span>
@@ -1553,8 +1614,9 @@ document.addEventListener('DOMContentLoaded', async () => {
                         displayNum: mainQuestionCounter,
                         maxMarks: 25,
                         subQuestions: mainQ.sub_questions.map(subQ => ({
-                            firestore_id: `generated-${Date.now()}-${Math.random()}`,
+                            firestore_id: subQ.firestore_id || `generated-${Date.now()}-${Math.random()}`,
                             question_text: subQ.text || subQ.question_text, // Handle both field names
+                            tables: subQ.tables || [],
                             marks: subQ.marks,
                             co: subQ.co || 'N/A',
                             blooms_level: subQ.blooms_level || 'L2',
@@ -437,6 +437,28 @@ async function viewPdf(approvalId) {
     }
 }
 
+// A sub-question's tables field ([{rows: [{cells: [...]}]}]) as simple bordered tables
+function escapeHtml(text) {
+    return String(text).replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
+// Cells hold raw text from the uploaded bank, so they are escaped
+function renderQuestionTables(tables) {
+    if (!Array.isArray(tables)) return '';
+    return tables.map(table => {
+        const rows = (table.rows || []).map((row, index) => {
+            const tag = index === 0 ? 'th' : 'td';
+            return '<tr>' + (row.cells || []).map(cell =>
+                `<${tag} style="border: 1px solid #cbd5e1; padding: 2px 6px;">${escapeHtml(cell ?? '')}</${tag}>`).join('') + '</tr>';
+        }).join('');
+        return `<table style="border-collapse: collapse; margin-top: 6px; font-size: 0.8rem;">${rows}</table>`;
+    }).join('');
+}
+
 function renderQuestionContent(q) {
     // Handle both snake_case and camelCase for sub_questions
     const subQuestions = q.sub_questions || q.subQuestions;
@@ -448,6 +470,7 @@ function renderQuestionContent(q) {
             return `
             <div style="margin-left: 16px; margin-top: 8px; font-size: 0.9rem;">
                 <div>${text}</div>
+                ${renderQuestionTables(sq.tables)}
                 <div style="font-size: 0.75rem; color: #64748b; margin-top: 4px;">
                     Marks: ${sq.marks} | CO: ${sq.co} | Level: ${sq.blooms_level}
                 </div>
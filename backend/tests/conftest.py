@@ -0,0 +1,32 @@
+import os
+import sys
+
+# Tests import the backend packages (services, advanced_parser, ...) as the app does, from backend/
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+TEST_BANKS_DIR = os.path.join(REPO_DIR, 'test qustion')
+QUESTION_BANKS_DIR = os.path.join(REPO_DIR, 'question banks')
+
+QUESTION_TABLE_HEADER = ['Sl No', 'Question', 'Marks', 'CO', 'Level']
+
+
+def build_question_bank_pdf(path, pages):
+    """
+    Writes a ruled-table question bank PDF: pages is a list of pages, each a
+    list of tables, each a list of rows of cell strings (five columns).
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import PageBreak, SimpleDocTemplate, Table, TableStyle
+
+    story = []
+    for page_index, tables in enumerate(pages):
+        if page_index:
+            story.append(PageBreak())
+        for rows in tables:
+            table = Table(rows, colWidths=[40, 300, 45, 40, 45])
+            table.setStyle(TableStyle([('GRID', (0, 0), (-1, -1), 0.5, 'black')]))
+            story.append(table)
+    SimpleDocTemplate(str(path), pagesize=A4).build(story)
+    return str(path)
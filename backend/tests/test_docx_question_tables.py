@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from conftest import TEST_BANKS_DIR
+from services.formatting_service import split_question_tables
+from services.parsing_service import parse_docx_question_bank
+
+DOCX_BANKS = ['Cc_QB_Module 3,4&5.docx', 'Cc_QB_Module_3,4&5[1][1].docx', 'try1.docx']
+
+
+@pytest.mark.parametrize('filename', DOCX_BANKS)
+def test_docx_questions_keep_their_text(filename):
+    path = os.path.join(TEST_BANKS_DIR, filename)
+    if not os.path.exists(path):
+        pytest.skip(f"{filename} not bundled")
+    questions = parse_docx_question_bank(path)
+
+    assert questions
+    assert all(q['question_text'].strip() for q in questions)
+    pia = [q for q in questions if 'Privacy Impact Assessment' in q['question_text']]
+    assert pia and pia[0]['question_text'] == 'Define the principles of Privacy Impact Assessment (PIA).'
+    assert pia[0]['tables'] == []
+
+
+def test_split_keeps_text_without_a_real_table():
+    text = 'Define the principles of Privacy Impact Assessment (PIA).'
+    assert split_question_tables(text) == (text, [])
+
+
+def test_split_extracts_a_multi_row_table():
+    text = 'Consider the data\nX Y Class\n1 2 A\n3 4 B'
+    question_text, tables = split_question_tables(text)
+
+    assert question_text == 'Consider the data'
+    assert [[row['cells'] for row in table['rows']] for table in tables] == [
+        [['X', 'Y', 'Class'], ['1', '2', 'A'], ['3', '4', 'B']]
+    ]
@@ -0,0 +1,40 @@
+import json
+
+import services.parsed_document as parsed_document
+from advanced_parser import AdvancedParser
+from conftest import QUESTION_TABLE_HEADER, build_question_bank_pdf
+from services.layout_profiles import LayoutProfileStore
+
+
+def test_profile_match_still_finds_a_header_of_another_layout(tmp_path, monkeypatch):
+    profiles_path = tmp_path / 'profiles.json'
+    monkeypatch.setattr(parsed_document, 'layout_profiles', LayoutProfileStore(str(profiles_path)))
+    part_a = [QUESTION_TABLE_HEADER] + [[str(n), f'Explain topic {n}', '5', 'CO1', 'L2'] for n in range(1, 4)]
+    # Part B: a caption row, then a header with the columns in another order
+    part_b = [['Part B', '', '', '', ''], ['Q No', 'Question', 'CO', 'RBT Level', 'Marks']] + [
+        [str(n), f'Derive result {n}', 'CO3', 'L4', '10'] for n in range(4, 7)
+    ]
+    pdf_path = build_question_bank_pdf(tmp_path / 'bank.pdf', [[part_a], [part_b]])
+
+    parser = AdvancedParser()
+    learned = parser.parse_pdf(pdf_path, str(tmp_path / 'images'), workers=1)
+    assert len(json.loads(profiles_path.read_text())) == 1
+    matched = parser.parse_pdf(pdf_path, str(tmp_path / 'images'), workers=1)
+
+    assert matched == learned
+    assert [q['question_text'] for q in matched[:3]] == ['Explain topic 1', 'Explain topic 2', 'Explain topic 3']
+    assert [(q['marks'], q['co'], q['blooms_level']) for q in matched[3:]] == [('10', 'CO3', 'L4')] * 3
+
+
+def test_matches_do_not_rewrite_the_profiles_file(tmp_path, monkeypatch):
+    profiles_path = tmp_path / 'profiles.json'
+    monkeypatch.setattr(parsed_document, 'layout_profiles', LayoutProfileStore(str(profiles_path)))
+    rows = [QUESTION_TABLE_HEADER] + [[str(n), f'Explain topic {n}', '5', 'CO1', 'L2'] for n in range(1, 4)]
+    pdf_path = build_question_bank_pdf(tmp_path / 'bank.pdf', [[rows]])
+
+    parser = AdvancedParser()
+    parser.parse_pdf(pdf_path, str(tmp_path / 'images'), workers=1)
+    learned_at = profiles_path.stat().st_mtime_ns
+    parser.parse_pdf(pdf_path, str(tmp_path / 'images'), workers=1)
+
+    assert profiles_path.stat().st_mtime_ns == learned_at
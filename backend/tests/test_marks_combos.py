@@ -0,0 +1,51 @@
+import random
+
+from services.marks_combos import bucket_weight_table, find_marks_combo, weighted_sample
+
+
+def make_questions(marks):
+    return [{'firestore_id': f'q{i}', 'marks': m} for i, m in enumerate(marks)]
+
+
+def test_combo_is_as_close_to_the_target_as_any():
+    questions = make_questions([5, 8, 12, 13, 20, 24])
+    for seed in range(20):
+        combo = find_marks_combo(questions, target_marks=25, tolerance=5, rng=random.Random(seed))
+        # 5 + 20, 12 + 13 and 5 + 8 + 12 hit 25 exactly, so nothing 24 or 26 is ever picked
+        assert sum(q['marks'] for q in combo) == 25
+        assert len({q['firestore_id'] for q in combo}) == len(combo)
+
+
+def test_combo_skips_used_questions_and_gives_up_outside_tolerance():
+    questions = make_questions([10, 15, 12, 13])
+    combo = find_marks_combo(questions, used_ids={'q0', 'q1'}, rng=random.Random(1))
+    assert {q['firestore_id'] for q in combo} == {'q2', 'q3'}
+
+    assert find_marks_combo(make_questions([2, 3]), rng=random.Random(1)) is None
+
+
+def test_same_seed_gives_the_same_combo():
+    questions = make_questions([5, 5, 6, 7, 8, 10, 10, 12, 12, 15] * 3)
+    picks = [
+        [q['firestore_id'] for q in find_marks_combo(questions, rng=random.Random(7))]
+        for _ in range(2)
+    ]
+    assert picks[0] == picks[1]
+
+
+def test_bucket_weight_table_is_the_elementary_symmetric_polynomials():
+    unweighted = [{'firestore_id': str(i)} for i in range(5)]
+    assert bucket_weight_table(unweighted, 3) == [1, 5, 10, 10]
+
+    weighted = [{'weight': w} for w in (1.0, 2.0, 3.0)]
+    # e_0..e_3 of (1, 2, 3)
+    assert bucket_weight_table(weighted, 3) == [1.0, 6.0, 11.0, 6.0]
+
+
+def test_weighted_sample_favours_heavier_questions():
+    questions = [{'firestore_id': 'fresh', 'weight': 1.0}, {'firestore_id': 'used', 'weight': 0.01}]
+    rng = random.Random(3)
+    picks = [weighted_sample(questions, 1, rng)[0]['firestore_id'] for _ in range(500)]
+
+    assert picks.count('fresh') > 450
+    assert sorted(q['firestore_id'] for q in weighted_sample(questions, 2, rng)) == ['fresh', 'used']
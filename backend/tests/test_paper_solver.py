@@ -0,0 +1,49 @@
+import random
+
+from services.paper_solver import level_counts, solve_paper
+
+CIE1_LAYOUT = [['1', '1', '1'], ['1', '1', '1'], ['2', '2', '3'], ['2', '2', '3']]
+
+
+def make_pool(size=30, seed=5):
+    rng = random.Random(seed)
+    return {
+        module: [
+            {'firestore_id': f'm{module}q{i}', 'marks': rng.choice([5, 6, 7, 8, 10, 12]),
+             'co': f'CO{rng.randint(1, 4)}', 'blooms_level': f'L{rng.randint(1, 4)}'}
+            for i in range(size)
+        ]
+        for module in ('1', '2', '3')
+    }
+
+
+def paper_ids(paper):
+    return [q['firestore_id'] for parts in paper for q in parts]
+
+
+def test_paper_meets_the_layout_and_marks_target():
+    paper = solve_paper(CIE1_LAYOUT, make_pool(), rng=random.Random(1))
+
+    assert [len(parts) for parts in paper] == [3, 3, 3, 3]
+    for layout_parts, parts in zip(CIE1_LAYOUT, paper):
+        assert [q['firestore_id'].split('q')[0] for q in parts] == [f'm{module}' for module in layout_parts]
+        assert abs(sum(q['marks'] for q in parts) - 25) <= 5
+    assert len(set(paper_ids(paper))) == 12
+
+
+def test_same_seed_gives_the_same_paper():
+    pool = make_pool()
+    first = solve_paper(CIE1_LAYOUT, pool, rng=random.Random(42))
+    second = solve_paper(CIE1_LAYOUT, pool, rng=random.Random(42))
+    assert paper_ids(first) == paper_ids(second)
+
+
+def test_too_few_questions_gives_no_paper():
+    pool = make_pool(size=3)
+    assert solve_paper(CIE1_LAYOUT, pool, rng=random.Random(1)) is None
+
+
+def test_level_counts_add_up_to_the_parts():
+    counts = level_counts({'L1': 0.1, 'L2': 0.3, 'L3': 0.4, 'L4': 0.2}, 12)
+    assert sum(counts.values()) == 12
+    assert counts == {'L1': 1, 'L2': 4, 'L3': 5, 'L4': 2}
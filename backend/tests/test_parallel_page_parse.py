@@ -0,0 +1,46 @@
+import pytest
+
+import services.parsed_document as parsed_document
+from advanced_parser import AdvancedParser
+from conftest import QUESTION_TABLE_HEADER, build_question_bank_pdf
+from services.layout_profiles import LayoutProfileStore
+
+
+@pytest.fixture
+def bank_pdf(tmp_path, monkeypatch):
+    # No learned layout profiles: both parses must see the same table settings
+    monkeypatch.setattr(parsed_document, 'layout_profiles', LayoutProfileStore(''))
+    first_page = [QUESTION_TABLE_HEADER] + [
+        [str(n), f'Explain topic {n} in detail', '5', 'CO1', 'L2'] for n in range(1, 6)
+    ]
+    pages = [[first_page]]
+    for page_index in range(4):
+        # Later pages repeat no header; the first row of page 2 has no SL and continues question 5
+        rows = [['', 'continued part of question 5', '', '', '']] if page_index == 0 else []
+        start = 6 + page_index * 5
+        rows += [[str(n), f'Describe concept {n}', '6', 'CO2', 'L3'] for n in range(start, start + 5)]
+        pages.append([rows])
+    return build_question_bank_pdf(tmp_path / 'bank.pdf', pages)
+
+
+def test_worker_pool_and_serial_parse_give_the_same_questions(bank_pdf, tmp_path, capsys):
+    parser = AdvancedParser()
+    serial = parser.parse_pdf(bank_pdf, str(tmp_path / 'serial_images'), workers=1)
+    parallel = parser.parse_pdf(bank_pdf, str(tmp_path / 'parallel_images'), workers=2)
+
+    assert 'with 2 worker processes' in capsys.readouterr().out
+    assert parallel == serial
+    assert [q['sl_no'] for q in parallel] == [str(n) for n in range(1, 26)]
+    # The SL-less row at the top of page 2 continues the last question of page 1
+    assert parallel[4]['question_text'] == 'Explain topic 5 in detail\ncontinued part of question 5'
+    assert parallel[5]['question_text'] == 'Describe concept 6'
+
+
+def test_streamed_pages_hold_back_the_last_question_of_a_page(bank_pdf, tmp_path):
+    yielded = list(AdvancedParser().iter_parse_pdf(bank_pdf, str(tmp_path / 'images'), workers=2))
+
+    # Question 5 is only final once page 2 has been seen, so it comes out with page 2
+    assert [(page, [q['sl_no'] for q in questions]) for page, questions in yielded][:2] == [
+        (1, ['1', '2', '3', '4']), (2, ['5', '6', '7', '8', '9'])
+    ]
+    assert yielded[1][1][0]['question_text'].endswith('continued part of question 5')
@@ -0,0 +1,32 @@
+from services.parsing_service import extract_questions_from_plain_text
+
+
+def test_numbered_questions_keep_their_continuation_lines():
+    text = 'Q.1 Explain the working of a stack. CO1 L2\nwith an example\nQ.2 What is a queue? CO2\nL3'
+    questions = extract_questions_from_plain_text(text)
+
+    assert [q['sl_no'] for q in questions] == ['1', '2']
+    assert questions[0]['question_text'] == 'Explain the working of a stack. CO1 L2 with an example'
+    # A level wrapped onto the next line still belongs to its question
+    assert (questions[1]['co'], questions[1]['blooms_level']) == ('CO2', 'L3')
+
+
+def test_bare_numbers_inside_a_question_are_sub_points():
+    text = 'Question 1 Define a tree\n1. list its types\nq = 0.4 here'
+    questions = extract_questions_from_plain_text(text)
+
+    assert len(questions) == 1
+    assert questions[0]['question_text'] == 'Define a tree 1. list its types q = 0.4 here'
+
+
+def test_bare_numbered_questions_and_duplicates():
+    text = '1. Define an algorithm CO3 L1\n2. Explain sorting\n2. Explain sorting again\n1.5 is not a question'
+    questions = extract_questions_from_plain_text(text)
+
+    assert [q['sl_no'] for q in questions] == ['1', '2']
+    assert (questions[0]['co'], questions[0]['blooms_level']) == ('CO3', 'L1')
+
+
+def test_text_without_numbering_gives_no_questions():
+    assert extract_questions_from_plain_text('') == []
+    assert extract_questions_from_plain_text('no numbering here') == []
@@ -0,0 +1,20 @@
+from services.question_hash import question_content_hash
+from services.question_tables import make_table
+
+
+def test_hash_ignores_whitespace_case_and_image_order():
+    a = {'question_text': 'Explain  the\nstack.', 'images': ['img/b.png', 'a.png']}
+    b = {'question_text': 'explain the stack.', 'images': ['a.png', 'other/dir/b.png'], 'marks': 10}
+    assert question_content_hash(a) == question_content_hash(b)
+
+
+def test_hash_changes_with_the_content():
+    base = {'question_text': 'Explain the stack.'}
+    assert question_content_hash(base) != question_content_hash({'question_text': 'Explain the queue.'})
+    assert question_content_hash(base) != question_content_hash(dict(base, images=['a.png']))
+
+
+def test_table_field_hashes_like_the_legacy_inline_table():
+    structured = {'question_text': 'Consider', 'tables': [make_table([['X', 'Y'], ['1', '2']])]}
+    legacy = {'question_text': 'Consider\nTable:\nX | Y\n1 | 2'}
+    assert question_content_hash(structured) == question_content_hash(legacy)
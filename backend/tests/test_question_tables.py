@@ -0,0 +1,20 @@
+from services.question_tables import make_table, split_table_text, table_as_text
+
+
+def test_text_without_a_table_marker_is_left_alone():
+    assert split_table_text('Define a tree.') == ('Define a tree.', [])
+    assert split_table_text('') == ('', [])
+
+
+def test_table_block_ends_at_a_blank_line():
+    text = 'Consider the data\nTable:\nX | Y\n1 | 2\n\nFind the mean'
+    question_text, tables = split_table_text(text)
+
+    assert question_text == 'Consider the data\nFind the mean'
+    assert tables == [make_table([['X', 'Y'], ['1', '2']])]
+
+
+def test_table_text_round_trips():
+    table = make_table([['S.NO', 'CGPA'], ['1', '9.2']])
+    question_text, tables = split_table_text('Classify\n' + table_as_text(table))
+    assert (question_text, tables) == ('Classify', [table])
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta, timezone
+
+from services.usage_weights import USAGE_HALF_LIFE_DAYS, USAGE_PENALTY, usage_weights
+
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def test_questions_outside_the_ledger_are_left_out():
+    assert usage_weights({}, NOW) == {}
+    assert usage_weights({'questions': {}}, NOW) == {}
+
+
+def test_weight_falls_with_uses_and_recovers_with_age():
+    ledger = {'questions': {
+        'today': {'uses': 1, 'last_used': NOW},
+        'twice': {'uses': 2, 'last_used': NOW},
+        'half_life_ago': {'uses': 1, 'last_used': NOW - timedelta(days=USAGE_HALF_LIFE_DAYS)},
+    }}
+    weights = usage_weights(ledger, NOW)
+
+    assert weights['today'] == 1 / (1 + USAGE_PENALTY)
+    assert weights['twice'] < weights['today']
+    assert abs(weights['half_life_ago'] - 1 / (1 + USAGE_PENALTY * 0.5)) < 1e-9
+
+
+def test_naive_timestamps_count_as_utc_and_missing_ones_as_recent():
+    ledger = {'questions': {
+        'naive': {'uses': 1, 'last_used': NOW.replace(tzinfo=None)},
+        'undated': {'uses': 1},
+    }}
+    weights = usage_weights(ledger, NOW)
+    assert weights['naive'] == weights['undated'] == 1 / (1 + USAGE_PENALTY)
@@ -0,0 +1,13 @@
+"""
+Background job worker: runs the parse jobs the web processes queue
+(services/job_queue.py).
+
+    cd backend && python worker.py        # Procfile: worker
+"""
+
+# Importing the app initializes Firebase and registers the job handlers
+from app import app  # noqa: F401
+from services.job_queue import job_queue
+
+if __name__ == '__main__':
+    job_queue.run_forever()